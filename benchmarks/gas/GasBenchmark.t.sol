@@ -0,0 +1,364 @@
+// SPDX-License-Identifier: BUSL-1.1
+pragma solidity ^0.8.0;
+
+import "../../tests/foundry/Common.sol";
+import {MintableERC20} from "contracts/mocks/tokens/MintableERC20.sol";
+
+/**
+ * @title GasBenchmark
+ * @dev Gas cost of the LendingPool and MiniPool hot paths as the number of reserves grows.
+ * Everything runs on the local EVM (mock tokens and price feeds, no fork). Each concrete contract
+ * lists `reserveCount()` reserves in both pools; the benchmarked user supplies all of them and
+ * borrows half of them, so its `UserConfiguration` bitmap grows with the reserve count and every
+ * health factor check loops over all reserves.
+ * Each test measures one call and logs `GAS <pool.operation> <reserves> <gas>`, parsed by
+ * `gasBenchmark.py`.
+ */
+abstract contract GasBenchmark is Common {
+    uint256 constant LIQUIDITY_USD = 1_000_000;
+    uint256 constant COLLATERAL_USD = 1_000;
+    uint256 constant BORROW_USD = 1_500;
+
+    DeployedContracts deployedContracts;
+    ConfigAddresses configAddresses;
+    DeployedMiniPoolContracts miniPoolContracts;
+    address miniPool;
+
+    address provider = makeAddr("benchmarkProvider");
+    address borrower = makeAddr("benchmarkBorrower");
+    address liquidator = makeAddr("benchmarkLiquidator");
+
+    function reserveCount() internal pure virtual returns (uint256);
+
+    function setUp() public {
+        fixture_deployBenchmarkTokens();
+        deployedContracts = fixture_deployProtocol();
+        fixture_addBenchmarkReserves(reserveCount() - tokens.length);
+        configAddresses = ConfigAddresses(
+            address(deployedContracts.asteraDataProvider),
+            address(deployedContracts.stableStrategy),
+            address(deployedContracts.volatileStrategy),
+            address(deployedContracts.treasury),
+            address(deployedContracts.rewarder),
+            address(deployedContracts.aTokensAndRatesHelper)
+        );
+        fixture_configureProtocol(
+            address(deployedContracts.lendingPool),
+            address(commonContracts.aToken),
+            configAddresses,
+            deployedContracts.lendingPoolConfigurator,
+            deployedContracts.lendingPoolAddressesProvider
+        );
+        fixture_deployBenchmarkMiniPool();
+
+        fixture_openPositions(false);
+        fixture_openPositions(true);
+        /* Measured calls accrue one day of interest */
+        skip(1 days);
+    }
+
+    /* ----------- fixtures ----------- */
+
+    /**
+     * @dev Replaces the fork tokens of `Common` by local mocks (same decimals), so the protocol
+     * fixtures deploy and price them without any RPC.
+     */
+    function fixture_deployBenchmarkTokens() public {
+        string[4] memory symbols = ["USDC", "WBTC", "WETH", "DAI"];
+        uint8[4] memory decimals = [6, 8, 18, 18];
+        for (uint256 idx = 0; idx < symbols.length; idx++) {
+            tokens[idx] = address(new MintableERC20(symbols[idx], symbols[idx], decimals[idx]));
+        }
+    }
+
+    /**
+     * @dev Adds `count` 18 decimals reserves priced at 1 USD, with alternating strategies.
+     */
+    function fixture_addBenchmarkReserves(uint256 count) public {
+        address[] memory assets = new address[](count);
+        address[] memory sources = new address[](count);
+        uint256[] memory timeouts = new uint256[](count);
+        for (uint256 idx = 0; idx < count; idx++) {
+            string memory symbol = string.concat("BENCH", uintToString(idx));
+            assets[idx] = address(new MintableERC20(symbol, symbol, 18));
+            sources[idx] = address(new MockAggregator(int256(1 * 10 ** PRICE_FEED_DECIMALS), 18));
+            tokens.push(assets[idx]);
+            isStableStrategy.push(idx % 2 == 0);
+            reserveTypes.push(true);
+        }
+        commonContracts.oracle.setAssetSources(assets, sources, timeouts);
+    }
+
+    function fixture_deployBenchmarkMiniPool() public {
+        (miniPoolContracts,) = fixture_deployMiniPoolSetup(
+            address(deployedContracts.lendingPoolAddressesProvider),
+            address(deployedContracts.lendingPool),
+            address(deployedContracts.asteraDataProvider),
+            miniPoolContracts
+        );
+        ConfigAddresses memory miniPoolAddresses = configAddresses;
+        miniPoolAddresses.asteraDataProvider = address(miniPoolContracts.miniPoolAddressesProvider);
+        miniPoolAddresses.stableStrategy = address(miniPoolContracts.stableStrategy);
+        miniPoolAddresses.volatileStrategy = address(miniPoolContracts.volatileStrategy);
+        miniPool = fixture_configureMiniPoolReserves(
+            tokens, miniPoolAddresses, miniPoolContracts, 0
+        );
+        vm.prank(miniPoolContracts.miniPoolAddressesProvider.getMainPoolAdmin());
+        miniPoolContracts.miniPoolConfigurator.setMinDebtThreshold(0, IMiniPool(miniPool));
+        vm.label(miniPool, "MiniPool");
+    }
+
+    /**
+     * @dev The provider supplies liquidity to every reserve, the borrower supplies collateral to
+     * every reserve and borrows from the first half of them (health factor ~1.13 at 4 reserves).
+     */
+    function fixture_openPositions(bool mini) public {
+        for (uint256 idx = 0; idx < tokens.length; idx++) {
+            fixture_supply(mini, provider, idx, usdToAmount(idx, LIQUIDITY_USD));
+            fixture_supply(mini, borrower, idx, usdToAmount(idx, COLLATERAL_USD));
+        }
+        vm.startPrank(borrower);
+        for (uint256 idx = 0; idx < tokens.length / 2; idx++) {
+            borrow(mini, tokens[idx], usdToAmount(idx, BORROW_USD), borrower);
+        }
+        vm.stopPrank();
+    }
+
+    function fixture_supply(bool mini, address user, uint256 idx, uint256 amount) public {
+        deal(tokens[idx], user, amount);
+        vm.startPrank(user);
+        ERC20(tokens[idx]).approve(pool(mini), amount);
+        deposit(mini, tokens[idx], amount, user);
+        vm.stopPrank();
+    }
+
+    /* ----------- pool calls ----------- */
+
+    function usdToAmount(uint256 idx, uint256 usd) internal view returns (uint256) {
+        return usd * 10 ** ERC20(tokens[idx]).decimals() * BASE_CURRENCY_UNIT
+            / commonContracts.oracle.getAssetPrice(tokens[idx]);
+    }
+
+    function pool(bool mini) internal view returns (address) {
+        return mini ? miniPool : address(deployedContracts.lendingPool);
+    }
+
+    function deposit(bool mini, address asset, uint256 amount, address onBehalfOf) internal {
+        if (mini) {
+            IMiniPool(miniPool).deposit(asset, false, amount, onBehalfOf);
+        } else {
+            deployedContracts.lendingPool.deposit(asset, true, amount, onBehalfOf);
+        }
+    }
+
+    function borrow(bool mini, address asset, uint256 amount, address onBehalfOf) internal {
+        if (mini) {
+            IMiniPool(miniPool).borrow(asset, false, amount, onBehalfOf);
+        } else {
+            deployedContracts.lendingPool.borrow(asset, true, amount, onBehalfOf);
+        }
+    }
+
+    function report(bool mini, string memory operation, uint256 gasUsed) internal view {
+        string memory name = string.concat(mini ? "miniPool." : "lendingPool.", operation);
+        console2.log(string.concat("GAS ", name), tokens.length, gasUsed);
+    }
+
+    function executeOperation(
+        address[] calldata assets,
+        uint256[] calldata amounts,
+        uint256[] calldata premiums,
+        address,
+        bytes calldata
+    ) external returns (bool) {
+        for (uint256 idx = 0; idx < assets.length; idx++) {
+            IERC20(assets[idx]).approve(msg.sender, amounts[idx] + premiums[idx]);
+        }
+        return true;
+    }
+
+    /* ----------- benchmarks ----------- */
+
+    function benchmarkDeposit(bool mini) internal {
+        uint256 amount = usdToAmount(0, COLLATERAL_USD);
+        deal(tokens[0], borrower, amount);
+        vm.startPrank(borrower);
+        ERC20(tokens[0]).approve(pool(mini), amount);
+        uint256 gasBefore = gasleft();
+        deposit(mini, tokens[0], amount, borrower);
+        uint256 gasUsed = gasBefore - gasleft();
+        vm.stopPrank();
+        report(mini, "deposit", gasUsed);
+    }
+
+    function benchmarkWithdraw(bool mini) internal {
+        /* Last reserve: collateral only, the health factor check goes through every reserve.
+         * A tenth of it keeps the LendingPool health factor above 1 at 4 reserves
+         * ((4000 - 100) * 0.85 > 3000), half of it would not. */
+        address asset = tokens[tokens.length - 1];
+        uint256 amount = usdToAmount(tokens.length - 1, COLLATERAL_USD / 10);
+        vm.startPrank(borrower);
+        uint256 gasBefore = gasleft();
+        if (mini) {
+            IMiniPool(miniPool).withdraw(asset, false, amount, borrower);
+        } else {
+            deployedContracts.lendingPool.withdraw(asset, true, amount, borrower);
+        }
+        uint256 gasUsed = gasBefore - gasleft();
+        vm.stopPrank();
+        report(mini, "withdraw", gasUsed);
+    }
+
+    function benchmarkBorrow(bool mini) internal {
+        uint256 amount = usdToAmount(0, COLLATERAL_USD / 10);
+        vm.startPrank(borrower);
+        uint256 gasBefore = gasleft();
+        borrow(mini, tokens[0], amount, borrower);
+        uint256 gasUsed = gasBefore - gasleft();
+        vm.stopPrank();
+        report(mini, "borrow", gasUsed);
+    }
+
+    function benchmarkRepay(bool mini) internal {
+        uint256 amount = usdToAmount(0, BORROW_USD / 3);
+        vm.startPrank(borrower);
+        ERC20(tokens[0]).approve(pool(mini), amount);
+        uint256 gasBefore = gasleft();
+        if (mini) {
+            IMiniPool(miniPool).repay(tokens[0], false, amount, borrower);
+        } else {
+            deployedContracts.lendingPool.repay(tokens[0], true, amount, borrower);
+        }
+        uint256 gasUsed = gasBefore - gasleft();
+        vm.stopPrank();
+        report(mini, "repay", gasUsed);
+    }
+
+    function benchmarkLiquidationCall(bool mini) internal {
+        /* Doubling the price of the borrowed reserves brings the health factor below 1 */
+        uint256 debtToCover = usdToAmount(0, BORROW_USD) / 2;
+        for (uint256 idx = 0; idx < tokens.length / 2; idx++) {
+            MockAggregator agg =
+                MockAggregator(commonContracts.oracle.getSourceOfAsset(tokens[idx]));
+            agg.setLastAnswer(agg.latestAnswer() * 2);
+        }
+        address collateral = tokens[tokens.length - 1];
+        deal(tokens[0], liquidator, debtToCover);
+        vm.startPrank(liquidator);
+        ERC20(tokens[0]).approve(pool(mini), debtToCover);
+        uint256 gasBefore = gasleft();
+        if (mini) {
+            IMiniPool(miniPool)
+                .liquidationCall(collateral, false, tokens[0], false, borrower, debtToCover, false);
+        } else {
+            deployedContracts.lendingPool
+                .liquidationCall(collateral, true, tokens[0], true, borrower, debtToCover, false);
+        }
+        uint256 gasUsed = gasBefore - gasleft();
+        vm.stopPrank();
+        report(mini, "liquidationCall", gasUsed);
+    }
+
+    function benchmarkFlashloan(bool mini) internal {
+        address[] memory assets = new address[](1);
+        uint256[] memory amounts = new uint256[](1);
+        uint256[] memory modes = new uint256[](1);
+        assets[0] = tokens[0];
+        amounts[0] = usdToAmount(0, LIQUIDITY_USD / 100);
+        /* Premium */
+        deal(tokens[0], address(this), amounts[0] / 100);
+        uint256 gasBefore = gasleft();
+        if (mini) {
+            IMiniPool(miniPool)
+                .flashLoan(
+                    IMiniPool.FlashLoanParams(address(this), assets, address(this)),
+                    amounts,
+                    modes,
+                    ""
+                );
+        } else {
+            bool[] memory types = new bool[](1);
+            types[0] = true;
+            deployedContracts.lendingPool
+                .flashLoan(
+                    ILendingPool.FlashLoanParams(address(this), assets, types, address(this)),
+                    amounts,
+                    modes,
+                    ""
+                );
+        }
+        report(mini, "flashLoan", gasBefore - gasleft());
+    }
+
+    function testGas_LendingPoolDeposit() public {
+        benchmarkDeposit(false);
+    }
+
+    function testGas_LendingPoolWithdraw() public {
+        benchmarkWithdraw(false);
+    }
+
+    function testGas_LendingPoolBorrow() public {
+        benchmarkBorrow(false);
+    }
+
+    function testGas_LendingPoolRepay() public {
+        benchmarkRepay(false);
+    }
+
+    function testGas_LendingPoolLiquidationCall() public {
+        benchmarkLiquidationCall(false);
+    }
+
+    function testGas_LendingPoolFlashloan() public {
+        benchmarkFlashloan(false);
+    }
+
+    function testGas_MiniPoolDeposit() public {
+        benchmarkDeposit(true);
+    }
+
+    function testGas_MiniPoolWithdraw() public {
+        benchmarkWithdraw(true);
+    }
+
+    function testGas_MiniPoolBorrow() public {
+        benchmarkBorrow(true);
+    }
+
+    function testGas_MiniPoolRepay() public {
+        benchmarkRepay(true);
+    }
+
+    function testGas_MiniPoolLiquidationCall() public {
+        benchmarkLiquidationCall(true);
+    }
+
+    function testGas_MiniPoolFlashloan() public {
+        benchmarkFlashloan(true);
+    }
+}
+
+contract GasBenchmarkReserves4 is GasBenchmark {
+    function reserveCount() internal pure override returns (uint256) {
+        return 4;
+    }
+}
+
+contract GasBenchmarkReserves16 is GasBenchmark {
+    function reserveCount() internal pure override returns (uint256) {
+        return 16;
+    }
+}
+
+contract GasBenchmarkReserves64 is GasBenchmark {
+    function reserveCount() internal pure override returns (uint256) {
+        return 64;
+    }
+}
+
+contract GasBenchmarkReserves128 is GasBenchmark {
+    function reserveCount() internal pure override returns (uint256) {
+        return 128;
+    }
+}
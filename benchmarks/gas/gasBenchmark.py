@@ -0,0 +1,267 @@
+"""
+Gas benchmark history of the LendingPool / MiniPool hot paths.
+
+Runs the `GasBenchmark.t.sol` test set (one contract per reserve count) with `forge test --json`
+on the local EVM under the `gas` foundry profile (`benchmarks/` is outside the default test
+root, so a plain `forge test` does not run it), reads the `GAS <pool.operation> <reserves> <gas>`
+lines logged by every test and stores them in a SQLite history keyed by git commit
+(`<sha>+dirty` for a modified tree, a new run of the same commit replaces the previous one).
+
+The run is compared with a baseline, by default the closest ancestor of HEAD found in the
+history, and every operation costing more than `--threshold` above it is flagged (exit code 1).
+`--plot` draws gas against the reserve count, so per reserve loops (`GenericLogic`,
+`MiniPoolGenericLogic`) show up as slopes (a straight line is linear in the reserve count).
+
+cmd :: python3 benchmarks/gas/gasBenchmark.py --plot gas.png
+cmd :: python3 benchmarks/gas/gasBenchmark.py --reserves 4,16 --threshold 0.005
+"""
+import argparse
+import json
+import os
+import re
+import sqlite3
+import subprocess
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(os.path.dirname(BENCH_DIR))
+TEST_FILE = os.path.join(BENCH_DIR, "GasBenchmark.t.sol")
+DEFAULT_DB = os.path.join(BENCH_DIR, "gas-history.sqlite")
+CONTRACT_PREFIX = "GasBenchmarkReserves"
+FOUNDRY_PROFILE = "gas"
+
+_MEASURE = re.compile(r"^GAS (\S+) (\d+) (\d+)$")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    commit_sha TEXT PRIMARY KEY,
+    timestamp INTEGER NOT NULL,
+    forge_version TEXT
+);
+CREATE TABLE IF NOT EXISTS measurements (
+    commit_sha TEXT NOT NULL REFERENCES runs(commit_sha) ON DELETE CASCADE,
+    operation TEXT NOT NULL,
+    reserves INTEGER NOT NULL,
+    gas INTEGER NOT NULL,
+    PRIMARY KEY (commit_sha, operation, reserves)
+);
+"""
+
+
+# ----------- git / forge -----------
+
+
+def git(*args):
+    return subprocess.run(["git", *args], cwd=ROOT_DIR, capture_output=True, text=True, check=True).stdout
+
+
+def current_commit():
+    """HEAD sha, suffixed with `+dirty` when tracked files are modified."""
+    sha = git("rev-parse", "HEAD").strip()
+    return sha + "+dirty" if git("status", "--porcelain", "--untracked-files=no").strip() else sha
+
+
+def ancestors(limit=200):
+    return git("rev-list", "--max-count={}".format(limit), "HEAD").split()
+
+
+def forge_version(forge):
+    try:
+        return subprocess.run([forge, "--version"], capture_output=True, text=True).stdout.split("\n")[0]
+    except OSError:
+        return None
+
+
+def run_forge(forge="forge", reserves=None):
+    """Runs the benchmark contracts offline, returns the parsed `forge test --json` report."""
+    command = [forge, "test", "--offline", "--json", "--match-path", os.path.relpath(TEST_FILE, ROOT_DIR)]
+    if reserves:
+        command += ["--match-contract", "^{}({})$".format(CONTRACT_PREFIX, "|".join(map(str, reserves)))]
+    # `Common` reads the fork RPC at construction, the benchmark never forks.
+    env = dict(os.environ, FOUNDRY_PROFILE=FOUNDRY_PROFILE)
+    env.setdefault("RPC_PROVIDER", "offline")
+    proc = subprocess.run(command, cwd=ROOT_DIR, capture_output=True, text=True, env=env)
+    output = [line for line in proc.stdout.splitlines() if line.startswith("{")]
+    if not output:
+        raise RuntimeError("forge test did not report any result:\n" + proc.stderr + proc.stdout)
+    return json.loads(output[-1])
+
+
+def parse_report(report):
+    """`({(operation, reserves): gas}, [failed tests])` of a `forge test --json` report."""
+    measurements, failures = {}, []
+    for suite, result in report.items():
+        if not suite.split(":")[-1].startswith(CONTRACT_PREFIX):
+            continue
+        for name, test in result["test_results"].items():
+            if test["status"] != "Success":
+                failures.append("{} {}: {}".format(suite.split(":")[-1], name, test.get("reason") or test["status"]))
+                continue
+            for line in test.get("decoded_logs") or []:
+                match = _MEASURE.match(line.strip())
+                if match:
+                    measurements[(match.group(1), int(match.group(2)))] = int(match.group(3))
+    return measurements, failures
+
+
+# ----------- history -----------
+
+
+def connect(path):
+    db = sqlite3.connect(path)
+    db.execute("PRAGMA foreign_keys = ON")
+    db.executescript(SCHEMA)
+    return db
+
+
+def store(db, commit, measurements, version=None):
+    with db:
+        db.execute("DELETE FROM runs WHERE commit_sha = ?", (commit,))
+        db.execute("INSERT INTO runs VALUES (?, ?, ?)", (commit, int(time.time()), version))
+        db.executemany(
+            "INSERT INTO measurements VALUES (?, ?, ?, ?)",
+            [(commit, operation, reserves, gas) for (operation, reserves), gas in measurements.items()],
+        )
+
+
+def load(db, commit):
+    rows = db.execute("SELECT operation, reserves, gas FROM measurements WHERE commit_sha = ?", (commit,))
+    return {(operation, reserves): gas for operation, reserves, gas in rows}
+
+
+def find_baseline(db, commit):
+    """Closest ancestor of HEAD with a recorded run (HEAD itself for a dirty tree)."""
+    recorded = {row[0] for row in db.execute("SELECT commit_sha FROM runs")}
+    for sha in ancestors():
+        if sha in recorded and sha != commit:
+            return sha
+    return None
+
+
+def resolve(db, ref):
+    """Full recorded commit of a ref or sha prefix."""
+    if ref is None:
+        return None
+    try:
+        ref = git("rev-parse", ref).strip()
+    except subprocess.CalledProcessError:
+        pass
+    rows = db.execute("SELECT commit_sha FROM runs WHERE commit_sha LIKE ?", (ref + "%",)).fetchall()
+    if len(rows) != 1:
+        raise ValueError("{} matches {} recorded runs".format(ref, len(rows)))
+    return rows[0][0]
+
+
+# ----------- comparison / plot -----------
+
+
+def compare(current, baseline, threshold):
+    """`[(operation, reserves, base gas, gas, relative change, regression)]` of the common measurements."""
+    rows = []
+    for key in sorted(set(current) & set(baseline)):
+        base, gas = baseline[key], current[key]
+        change = (gas - base) / base if base else 0.0
+        rows.append((*key, base, gas, change, change > threshold))
+    return rows
+
+
+def print_table(current, rows):
+    if rows:
+        print("  {:<32} {:>8} {:>10} {:>10} {:>9}".format("operation", "reserves", "baseline", "gas", "change"))
+        for operation, reserves, base, gas, change, regression in rows:
+            print("  {:<32} {:>8} {:>10} {:>10} {:>+8.2%}{}".format(
+                operation, reserves, base, gas, change, "  REGRESSION" if regression else ""
+            ))
+    else:
+        print("  {:<32} {:>8} {:>10}".format("operation", "reserves", "gas"))
+        for (operation, reserves), gas in sorted(current.items()):
+            print("  {:<32} {:>8} {:>10}".format(operation, reserves, gas))
+
+
+def plot(path, current, baseline=None, title=""):
+    """Gas against reserve count, one panel per pool, the baseline dashed."""
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    pools = sorted({operation.split(".")[0] for operation, _ in current})
+    fig, axes = plt.subplots(1, len(pools), figsize=(7 * len(pools), 5), squeeze=False)
+    for ax, pool in zip(axes[0], pools):
+        operations = sorted({o for o, _ in current if o.split(".")[0] == pool})
+        for k, operation in enumerate(operations):
+            color = "C{}".format(k % 10)
+            for data, style, label in [(current, "-o", operation.split(".", 1)[1]), (baseline or {}, "--", None)]:
+                points = sorted((r, g) for (o, r), g in data.items() if o == operation)
+                if points:
+                    ax.plot(*zip(*points), style, color=color, label=label)
+        ax.set_xticks(sorted({r for _, r in current}))
+        ax.set_xlabel("Reserves")
+        ax.set_ylabel("Gas")
+        ax.set_title(pool)
+        ax.grid(True)
+        ax.legend(fontsize="small")
+    fig.suptitle(title)
+    fig.tight_layout()
+    fig.savefig(path)
+    plt.close(fig)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gas benchmark of the pools hot paths with history.")
+    parser.add_argument("--db", default=DEFAULT_DB, help="SQLite history")
+    parser.add_argument("--forge", default="forge", help="forge executable")
+    parser.add_argument(
+        "--reserves", type=lambda s: [int(r) for r in s.split(",")], default=None,
+        help="comma separated reserve counts to run (default: every benchmark contract)",
+    )
+    parser.add_argument("--report", default=None, help="read this saved `forge test --json` output instead of running forge")
+    parser.add_argument("--save-report", default=None, help="also write the `forge test --json` output of the run here")
+    parser.add_argument("--no-run", action="store_true", help="only compare / plot the recorded run of HEAD")
+    parser.add_argument("--baseline", default=None, help="commit to compare with (default: closest recorded ancestor)")
+    parser.add_argument("--threshold", type=float, default=0.01, help="relative increase flagged as a regression")
+    parser.add_argument("--plot", default=None, help="write the gas / reserves plot to this PNG")
+    args = parser.parse_args(argv)
+
+    db = connect(args.db)
+    commit = current_commit()
+    if args.no_run:
+        current = load(db, commit)
+    else:
+        if args.report:
+            with open(args.report, "r", encoding="utf-8") as f:
+                report = json.loads([line for line in f if line.startswith("{")][-1])
+        else:
+            report = run_forge(args.forge, args.reserves)
+            if args.save_report:
+                with open(args.save_report, "w", encoding="utf-8") as f:
+                    json.dump(report, f)
+        current, failures = parse_report(report)
+        for failure in failures:
+            print("Failed: " + failure)
+        if failures:
+            return 1
+        store(db, commit, current, None if args.report else forge_version(args.forge))
+    if not current:
+        print("No measurement for {}.".format(commit))
+        return 1
+
+    baseline_commit = resolve(db, args.baseline) if args.baseline else find_baseline(db, commit)
+    baseline = load(db, baseline_commit) if baseline_commit else {}
+    print("{}: {} measurements, baseline {}".format(commit, len(current), baseline_commit or "none"))
+    rows = compare(current, baseline, args.threshold)
+    print_table(current, rows)
+
+    if args.plot:
+        plot(args.plot, current, baseline, "{} vs {}".format(commit[:10], (baseline_commit or "-")[:10]))
+        print("Plot written to {}".format(args.plot))
+    regressions = [row for row in rows if row[-1]]
+    if regressions:
+        print("{} regression(s) above {:.2%}".format(len(regressions), args.threshold))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
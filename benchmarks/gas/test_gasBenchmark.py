@@ -0,0 +1,36 @@
+import json
+import os
+
+import gasBenchmark as bench
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def _report():
+    # `forge test --json` layout, trimmed (see fixtures/README.md).
+    with open(os.path.join(FIXTURES, "forge-report.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_parse_report():
+    measurements, failures = bench.parse_report(_report())
+    assert measurements == {
+        ("lendingPool.deposit", 4): 182031,
+        ("miniPool.borrow", 4): 311877,
+        ("lendingPool.deposit", 16): 190544,
+    }
+    assert failures == ["GasBenchmarkReserves16 testGas_MiniPoolBorrow(): revert: 35"]
+
+
+def test_history_and_regressions(tmp_path):
+    db = bench.connect(str(tmp_path / "history.sqlite"))
+    measurements, _ = bench.parse_report(_report())
+    bench.store(db, "base", measurements)
+    bench.store(db, "head", {**measurements, ("lendingPool.deposit", 16): 200000})
+    bench.store(db, "head", {**measurements, ("lendingPool.deposit", 16): 193000})
+    assert bench.load(db, "head")[("lendingPool.deposit", 16)] == 193000
+
+    rows = bench.compare(bench.load(db, "head"), bench.load(db, "base"), 0.01)
+    assert [row for row in rows if row[-1]] == [
+        ("lendingPool.deposit", 16, 190544, 193000, (193000 - 190544) / 190544, True)
+    ]
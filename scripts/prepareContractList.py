@@ -1,127 +1,202 @@
-import json
+"""
+Builds the deployed contracts registry (`scripts/outputs/<network>/contracts.csv`).
+
+Rows come from the JSON files written by the deployment scripts in `scripts/outputs/<network>`
+and from the forge broadcasts `broadcast/<script>/<chainId>/run-latest.json` (helpers and
+local fork scripts excluded). Both are read in one pass, deduplicated by address in memory
+(script outputs first, so their names win) and the CSV is written atomically, only when its
+content changes.
+
+Parsed rows are cached per source file in `scripts/outputs/<network>/.registry-cache.json`
+(git ignored) and a file is parsed again only when its mtime or size changed, so regenerating
+registries for many networks / forks only reads what was redeployed.
+
+cmd :: python3 scripts/prepareContractList.py mainnet testnet
+cmd :: python3 scripts/prepareContractList.py fork --chain-id fork=8453 --explorer fork=https://basescan.org/address/
+"""
+import argparse
 import csv
+import glob
+import io
+import json
 import os
+import sys
 
-## CONFIG
-testnet = False
-
-explorer = ""
-csv_file = ""
-if(testnet):
-    explorer = "https://lineascan.build/address/" 
-    csv_file = os.getcwd() + "/scripts/outputs/testnet/contracts.csv"
-    chain_id = "84532"
-    path_to_walk = "/scripts/outputs/testnet"
-else:
-    explorer = "https://lineascan.build/address/"
-    csv_file = os.getcwd() + "/scripts/outputs/mainnet/contracts.csv"
-    chain_id = "8453"
-    path_to_walk = "/scripts/outputs/mainnet"
-
-def createFromScriptOut():
-    rows_data = []
-    for root, dirs, files in os.walk(os.getcwd() + path_to_walk):
-        for file in files:
-            print("File: ", file)
-            if file.endswith('.json'):
-                # Read and parse the JSON file
-                try:
-                    with open(os.path.join(root, file), 'r', encoding='utf-8') as json_file:
-                        data = json.load(json_file)
-                        
-                        # Write all key-value pairs to CSV
-                        for key, value in data.items():
-                            if(isinstance(value, list)):
-                                for atr in value:
-                                    explorer_url = explorer + atr + "#code"
-                                    rows_data.append([file.split(".")[0], key, atr, explorer_url]) 
-                            else:
-                                explorer_url = explorer + value + "#code"
-                                rows_data.append([file.split(".")[0], key, value, explorer_url])
-                
-                except json.JSONDecodeError as e:
-                    print(f"Error reading {file}: {e}")
-    return rows_data
-
-
-def createFromForgeOut():
-    # Walk through the directory
-    for root, dirs, files in os.walk(os.getcwd() + "/scripts"):
-        # Exclude specific folders
-        print("1.DIRS: ", dirs)
-        if "helpers" in dirs:
-            dirs.remove("helpers")
-        if "localFork" in dirs:
-            dirs.remove("localFork")
-        print("2.DIRS: ", dirs)
-
-        for file in files:
-            if file.endswith('.s.sol'):
-                fileName = file.split("/")[-1]
-                print("FILE NAME: ", fileName)
-                # Path to the JSON file
-                json_file_path = os.getcwd() + "/broadcast/" + fileName + "/" + chain_id + "/run-latest.json"
-
-                print(json_file_path)
-
-                # Open and load the JSON data
-                with open(json_file_path, 'r', encoding='utf-8') as file:
-                    data = json.load(file)
-
-                # print(data)
-
-                # Create a set to track unique addresses
-                unique_addresses = set()
-
-                for transaction in data.get("transactions", []):
-                    contract_name = transaction.get("contractName")
-                    contract_address = transaction.get("contractAddress")
-                    explorer_url = explorer + contract_address + "#code"
-                    
-                    # Only write if contract name exists and address is unique
-                    if contract_name and contract_address not in unique_addresses:
-                        writer.writerow([contract_name, contract_address, explorer_url])
-                        unique_addresses.add(contract_address)  # Add address to the set
-
-                print(f"Data successfully written to {csv_file}")
-
-
-def filter_repeating_values(input_file, output_file):
-    with open(input_file, 'r') as infile:
-        reader = csv.reader(infile)
-        filtered_rows = []
-        seen = set()
-        for row in reader:
-            # Use a set to track seen values
-            print("Row", row)
-            if row[2] not in seen and row[2] != "0x0000000000000000000000000000000000000000" and "0x" in row[2]:
-                print(row[2])
-                seen.add(row[2])
-                filtered_rows.append(row)
-
-
-    with open(output_file, 'w', newline='') as outfile:
-        writer = csv.writer(outfile)
-        writer.writerow([])  # Writing an empty row (optional)
-        print("FILTERED ROWS", filtered_rows)
-        writer.writerows(filtered_rows)
-
-def sort_csv_alphabetically(input_rows, output_file):
-    # Sort the rows alphabetically based on the first column, excluding the header
-    sorted_rows = sorted(input_rows, key=lambda x: x[0].lower())  # Using .lower() for case-insensitive sorting
-
-    # Write the header and sorted rows to the output file
-    with open(output_file, 'w', newline='') as outfile:
-        writer = csv.writer(outfile)
-        writer.writerows(sorted_rows)  # Write the sorted rows
-
-# Write to the CSV file
-with open(csv_file, mode='w', newline='', encoding='utf-8') as file:
-    writer = csv.writer(file)
-    writer.writerow(["file" ,"contractName", "contractAddress","explorerUrl"])  # Header row
-    rows_data = createFromScriptOut()
-    sort_csv_alphabetically(rows_data, csv_file)
-    filter_repeating_values(csv_file, csv_file)
-
-
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OUTPUTS = os.path.join(ROOT, "scripts", "outputs")
+BROADCAST = os.path.join(ROOT, "broadcast")
+EXCLUDED_SCRIPT_DIRS = ["helpers", "localFork"]
+CACHE = ".registry-cache.json"
+CACHE_VERSION = 1
+HEADER = ["file", "contractName", "contractAddress", "explorerUrl"]
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
 
+## CONFIG
+NETWORKS = {
+    "mainnet": {"chainId": "8453", "explorer": "https://lineascan.build/address/"},
+    "testnet": {"chainId": "84532", "explorer": "https://lineascan.build/address/"},
+}
+
+
+# ----------- sources -----------
+
+
+def rows_from_script_output(path):
+    """`(file, contractName, address)` rows of a JSON written by a deployment script."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    name = os.path.basename(path).split(".")[0]
+    rows = []
+    for key, value in data.items():
+        for address in value if isinstance(value, list) else [value]:
+            if isinstance(address, str):
+                rows.append([name, key, address])
+    return rows
+
+
+def rows_from_broadcast(path):
+    """`(script, contractName, address)` rows of a forge `run-latest.json`."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    script = os.path.basename(os.path.dirname(os.path.dirname(path)))
+    rows = []
+    for transaction in data.get("transactions", []):
+        name, address = transaction.get("contractName"), transaction.get("contractAddress")
+        if name and address:
+            rows.append([script, name, address])
+    return rows
+
+
+def excluded_scripts():
+    """Script file names whose broadcasts are not deployments (helpers, local fork)."""
+    names = set()
+    for folder in EXCLUDED_SCRIPT_DIRS:
+        names.update(os.path.basename(p) for p in glob.glob(os.path.join(ROOT, "scripts", folder, "*.s.sol")))
+    return names
+
+
+def sources(network, chain_id):
+    """`(kind, path)` of every registry input of a network, script outputs first."""
+    found = []
+    output_dir = os.path.join(OUTPUTS, network)
+    for root, dirs, files in os.walk(output_dir):
+        dirs.sort()
+        found += [
+            ("script", os.path.join(root, f)) for f in sorted(files) if f.endswith(".json") and not f.startswith(".")
+        ]
+    excluded = excluded_scripts()
+    for path in sorted(glob.glob(os.path.join(BROADCAST, "*", chain_id, "run-latest.json"))):
+        if os.path.basename(os.path.dirname(os.path.dirname(path))) not in excluded:
+            found.append(("broadcast", path))
+    return found
+
+
+# ----------- registry -----------
+
+
+def load_cache(path):
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+        if cache.get("version") == CACHE_VERSION:
+            return cache
+    return {"version": CACHE_VERSION, "files": {}}
+
+
+def write_atomic(path, content):
+    """Writes `content` through a temporary file; returns False when the file was already up to date."""
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            if f.read() == content:
+                return False
+    with open(path + ".tmp", "w", encoding="utf-8", newline="") as f:
+        f.write(content)
+    os.replace(path + ".tmp", path)
+    return True
+
+
+def collect_rows(inputs, cache):
+    """Rows of every input (parsing only the changed ones), returns `(rows, parsed, errors)`."""
+    entries, rows, parsed, errors = {}, [], 0, []
+    for kind, path in inputs:
+        key = os.path.relpath(path, ROOT)
+        stat = os.stat(path)
+        entry = cache["files"].get(key)
+        if entry is None or (entry["mtime"], entry["size"]) != (stat.st_mtime_ns, stat.st_size):
+            try:
+                found = rows_from_script_output(path) if kind == "script" else rows_from_broadcast(path)
+            except (json.JSONDecodeError, AttributeError) as e:
+                errors.append("Error reading {}: {}".format(key, e))
+                continue
+            entry = {"mtime": stat.st_mtime_ns, "size": stat.st_size, "rows": found}
+            parsed += 1
+        entries[key] = entry
+        rows += entry["rows"]
+    cache["files"] = entries
+    return rows, parsed, errors
+
+
+def dedup(rows):
+    """Keeps the first row of every valid, non zero address (case insensitive)."""
+    seen, unique = set(), []
+    for row in rows:
+        address = row[2]
+        if not address.startswith("0x") or address.lower() == ZERO_ADDRESS or address.lower() in seen:
+            continue
+        seen.add(address.lower())
+        unique.append(row)
+    return unique
+
+
+def build_registry(network, chain_id, explorer):
+    """Updates `scripts/outputs/<network>/contracts.csv`, returns a one line summary."""
+    output_dir = os.path.join(OUTPUTS, network)
+    os.makedirs(output_dir, exist_ok=True)
+    cache_path = os.path.join(output_dir, CACHE)
+    cache = load_cache(cache_path)
+
+    rows, parsed, errors = collect_rows(sources(network, chain_id), cache)
+    rows = dedup(rows)
+    rows.sort(key=lambda row: row[0].lower())
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(HEADER)
+    writer.writerows([*row, explorer + row[2] + "#code"] for row in rows)
+    csv_file = os.path.join(output_dir, "contracts.csv")
+    changed = write_atomic(csv_file, buffer.getvalue())
+    write_atomic(cache_path, json.dumps(cache, sort_keys=True))
+
+    for error in errors:
+        print(error)
+    return "{} (chain {}): {} contracts, {} files parsed, {} {}".format(
+        network, chain_id, len(rows), parsed, csv_file, "written" if changed else "up to date"
+    )
+
+
+def _mapping(values):
+    return dict(v.split("=", 1) for v in values)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Builds the deployed contracts registries.")
+    parser.add_argument(
+        "networks", nargs="*", default=["mainnet"], help="folders of scripts/outputs (default: mainnet)"
+    )
+    parser.add_argument("--chain-id", action="append", default=[], help="network=chainId override")
+    parser.add_argument("--explorer", action="append", default=[], help="network=explorer address URL override")
+    args = parser.parse_args(argv)
+
+    chain_ids, explorers = _mapping(args.chain_id), _mapping(args.explorer)
+    for network in args.networks:
+        config = NETWORKS.get(network, {})
+        chain_id = chain_ids.get(network, config.get("chainId"))
+        if chain_id is None:
+            print("Unknown chain id for {}, use --chain-id {}=<id>".format(network, network))
+            return 1
+        print(build_registry(network, chain_id, explorers.get(network, config.get("explorer", ""))))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+import json
+
+import pytest
+
+import prepareContractList as registry
+
+LENDING_POOL = "0x" + "1a" * 20
+MINI_POOL = "0x" + "2b" * 20
+ORACLE = "0x" + "3C" * 20
+
+
+@pytest.fixture
+def tree(tmp_path, monkeypatch):
+    """A fake repository root with script outputs, broadcasts and a helper script."""
+    monkeypatch.setattr(registry, "ROOT", str(tmp_path))
+    monkeypatch.setattr(registry, "OUTPUTS", str(tmp_path / "scripts" / "outputs"))
+    monkeypatch.setattr(registry, "BROADCAST", str(tmp_path / "broadcast"))
+
+    def write(relative, data):
+        path = tmp_path / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(data))
+
+    (tmp_path / "scripts" / "helpers").mkdir(parents=True)
+    (tmp_path / "scripts" / "helpers" / "MocksHelper.s.sol").write_text("")
+    write("scripts/outputs/mainnet/1_LendingPoolContracts.json",
+          {"lendingPool": LENDING_POOL, "oracle": ORACLE.lower(), "unset": registry.ZERO_ADDRESS})
+    write("scripts/outputs/mainnet/2_MiniPoolContracts.json", {"miniPools": [MINI_POOL, "not an address"]})
+    write("broadcast/1_DeployLendingPool.s.sol/8453/run-latest.json", {"transactions": [
+        {"contractName": "LendingPool", "contractAddress": LENDING_POOL},
+        {"contractName": "Oracle", "contractAddress": ORACLE},
+        {"contractName": "ReserveLogic", "contractAddress": "0x" + "4d" * 20},
+        {"contractName": None, "contractAddress": "0x" + "5e" * 20},
+    ]})
+    write("broadcast/MocksHelper.s.sol/8453/run-latest.json", {"transactions": [
+        {"contractName": "MintableERC20", "contractAddress": "0x" + "6f" * 20},
+    ]})
+    return tmp_path
+
+
+def _rows(tree):
+    with open(tree / "scripts" / "outputs" / "mainnet" / "contracts.csv", "r", encoding="utf-8") as f:
+        return [line.split(",")[:3] for line in f.read().splitlines()]
+
+
+def test_dedup_keeps_the_first_valid_address():
+    rows = [
+        ["a", "First", ORACLE],
+        ["b", "Second", ORACLE.lower()],
+        ["c", "Zero", registry.ZERO_ADDRESS],
+        ["d", "Invalid", "1a" * 20],
+    ]
+    assert registry.dedup(rows) == [["a", "First", ORACLE]]
+
+
+def test_build_registry(tree):
+    summary = registry.build_registry("mainnet", "8453", "https://explorer/")
+    assert summary.startswith("mainnet (chain 8453): 4 contracts, 3 files parsed")
+    # Script outputs win over the broadcasts, helper broadcasts are excluded.
+    assert _rows(tree) == [
+        registry.HEADER[:3],
+        ["1_DeployLendingPool.s.sol", "ReserveLogic", "0x" + "4d" * 20],
+        ["1_LendingPoolContracts", "lendingPool", LENDING_POOL],
+        ["1_LendingPoolContracts", "oracle", ORACLE.lower()],
+        ["2_MiniPoolContracts", "miniPools", MINI_POOL],
+    ]
+
+    # Nothing changed: the cache avoids parsing and the CSV is left alone.
+    assert registry.build_registry("mainnet", "8453", "https://explorer/").endswith(
+        "0 files parsed, {} up to date".format(tree / "scripts" / "outputs" / "mainnet" / "contracts.csv")
+    )
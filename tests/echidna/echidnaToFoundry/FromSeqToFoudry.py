@@ -1,76 +1,48 @@
-import re
+from sequenceParser import emit_statement, parse_lines
 
 # cmd :: python3 tests/echidna/echidnaToFoundry/FromSeqToFoudry.py
-def transform_text(input_text):
+def contract_header(contract_name="FoundryTestSequence", import_dir="..", command="forge t --mt testCallSequence -vvvv"):
     output = []
     output.append("// SPDX-License-Identifier: MIT")
     output.append("pragma solidity ^0.8.13;")
     output.append("")
-    output.append("import \"../PropertiesMain.sol\";")
-    output.append("import \"../PropertiesBase.sol\";") 
+    output.append(f"import \"{import_dir}/PropertiesMain.sol\";")
+    output.append(f"import \"{import_dir}/PropertiesBase.sol\";") 
     output.append("import \"forge-std/Test.sol\";")
     output.append("")
-    output.append("// cmd :: forge t --mt testCallSequence -vvvv")
+    output.append(f"// cmd :: {command}")
     output.append("/// @notice This is a foudry test contract to test failing properties echidna fuzzing found.")
-    output.append("contract FoundryTestSequence is Test {")
+    output.append(f"contract {contract_name} is Test {{")
     output.append("    PropertiesMain public propertiesMain;")
     output.append("")
     output.append("    constructor() {")
     output.append("        propertiesMain = new PropertiesMain();")
     output.append("    }")
-    output.append("")
-    output.append("    function testCallSequence() public {")
+    return output
 
-    # Remove leading whitespace (spaces and tabs) from each line and join them back with newlines
-    # lstrip() removes all leading whitespace characters from the beginning of each line
-    # This normalizes the indentation by removing inconsistent leading spaces/tabs
-    lines = [line.lstrip() for line in input_text.split("\n")]
-    for line in lines:
-        if not line.strip():
-            continue
-            
-        # Handle wait lines
-        if line.startswith("*wait*"):
-            match = re.search(r"Time delay: (\d+)", line)
-            if match:
-                output.append(f"        skip({match.group(1)});")
-            continue
-            
-        # Handle function calls
-        if line.startswith("PropertiesMain."):
-            # Extract the main part before any time delay info
-            main_part = line.split(" Time delay:")[0]
-            
-            # Remove the "from: 0x..." part if present
-            main_part = main_part.split(" from:")[0]   
-
-            # Extract time delay if present
-            time_delay_match = re.search(r"Time delay: (\d+)", line)
-            time_delay = time_delay_match.group(1) if time_delay_match else None
-            
-            # Check if there's a tuple in the function call
-            tuple_match = re.search(r"\(([\d, ]+(?:, true|false))\)", main_part)
-            if tuple_match:
-                # Extract tuple values
-                tuple_str = tuple_match.group(1)
-                # Always wrap tuples with PropertiesBase.LocalVars_UPTL
-                main_part = main_part.replace(f"({tuple_str})", f"(PropertiesBase.LocalVars_UPTL({tuple_str}))")
-            
-            # Convert to lowercase for the first word
-            main_part = "propertiesMain" + main_part[14:]
-            
-            # Add semicolon and skip if there's a time delay
-            if time_delay:
-                output.append(f"        {main_part}; skip({time_delay});")
-            else:
-                output.append(f"        {main_part};")
 
+def transform_text(input_text):
+    output = contract_header()
+    output.append("")
+    output.append("    function testCallSequence() public {")
+    output += transform_calls(input_text)
     output.append("    }")
     output.append("}")
     output.append("")
 
     return "\n".join(output)
 
+
+def transform_calls(input_text):
+    """Converts an Echidna call sequence into the (indented) Solidity statements of a test body."""
+    output = []
+    # Each line is parsed into a Call / Wait node (see `sequenceParser.py`): delays become
+    # `skip()` + `vm.roll()` before the call, the sender a `vm.prank()`, tuples the struct
+    # the function signature expects.
+    for node in parse_lines(input_text.split("\n")):
+        output += ["        " + statement for statement in emit_statement(node)]
+    return output
+
 # Example usage
 input_text = """    PropertiesMain.randForceFeedAssetLP((5, 152, 128, 48, 100, 9, 2, 40, 34, 8, 34, 1501, false),121,54226010652114989114253842279358793987,181,52)
     PropertiesMain.randRehypothecationRebalanceLP((0, 97, 131, 3, 114, 9, 18, 69, 14, 12, 0, 644146345200320509442638598, false),0)
@@ -129,8 +101,9 @@ input_text = """    PropertiesMain.randForceFeedAssetLP((5, 152, 128, 48, 100, 9
     PropertiesMain.userDebtIntegrityMP() Time delay: 1949 seconds Block delay: 757
 """
 
-string = 'tests/echidna/echidnaToFoundry/FoundryTestSequence.sol'
-with open(string, 'w') as f:
-    f.write(transform_text(input_text))
+if __name__ == "__main__":
+    string = 'tests/echidna/echidnaToFoundry/FoundryTestSequence.sol'
+    with open(string, 'w') as f:
+        f.write(transform_text(input_text))
 
-print("Done ::: the %s file has been generated." % string)
\ No newline at end of file
+    print("Done ::: the %s file has been generated." % string)
\ No newline at end of file
@@ -0,0 +1,272 @@
+"""
+Coverage and corpus statistics over Echidna campaigns.
+
+A campaign is a `corpusDir` (one per config, e.g. `echidna-corpus-fast`). Each Echidna run
+leaves a `covered.<timestamp>.txt` report there and grows the corpus (`coverage/`,
+`reproducers/`). For every campaign this tool reports:
+- the lines of `contracts/protocol/core/**` covered by each run and the delta with the
+  previous run (lines gained / lost, per file),
+- the union coverage of the campaign, the lines no other campaign reaches and, given
+  `--cpu-hours`, the covered lines per CPU-hour,
+- how often each `PropertiesMain` entry point appears in the corpus (and the ones never
+  called).
+
+Reports and corpus files are streamed one at a time and indexed in `<corpusDir>/.stats.json`
+(covered lines as ranges, call counts), keyed by mtime and size: a later run only parses the
+new files. Memory is bounded by the size of the covered code, not by the number of runs.
+
+cmd :: python3 tests/echidna/echidnaToFoundry/campaignStats.py fast=echidna-corpus-fast \
+           inDepth=echidna-corpus-inDepth --cpu-hours fast=10 --cpu-hours inDepth=200
+"""
+import argparse
+import json
+import os
+import re
+import sys
+from collections import Counter
+
+from sequenceParser import load_signatures
+
+SCOPE = "contracts/protocol/core/"
+MANIFEST = ".stats.json"
+FORMAT_VERSION = 1
+
+_REPORT = re.compile(r"covered\.(\d+)\.txt$")
+_LINE = re.compile(r"\s*(\d+)\s*\|([^|]*)\|")
+
+
+# ----------- parsing -----------
+
+
+def to_ranges(lines):
+    """`{1, 2, 3, 7}` -> `"1-3,7"`."""
+    ranges, start, previous = [], None, None
+    for line in sorted(lines):
+        if start is None:
+            start = previous = line
+        elif line == previous + 1:
+            previous = line
+        else:
+            ranges.append((start, previous))
+            start = previous = line
+    if start is not None:
+        ranges.append((start, previous))
+    return ",".join(str(a) if a == b else "{}-{}".format(a, b) for a, b in ranges)
+
+
+def from_ranges(text):
+    lines = set()
+    for part in filter(None, text.split(",")):
+        a, _, b = part.partition("-")
+        lines.update(range(int(a), int(b or a) + 1))
+    return lines
+
+
+def scoped_path(path, scope=SCOPE):
+    """Repository relative path of a covered source, `None` when it is outside `scope`."""
+    path = path.strip().replace("\\", "/")
+    idx = path.find(scope)
+    return path[idx:] if idx >= 0 else None
+
+
+def parse_coverage(path, scope=SCOPE):
+    """
+    Streams a txt coverage report: `{source: set of covered lines}` for the sources in
+    `scope`. A line is covered when Echidna put any marker on it (`*` executed, `r` reverted...).
+    """
+    covered, current = {}, None
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            match = _LINE.match(line)
+            if match is None:
+                if line.strip():
+                    current = scoped_path(line, scope)
+                continue
+            if current is not None and match.group(2).strip():
+                covered.setdefault(current, set()).add(int(match.group(1)))
+    return covered
+
+
+def count_calls(path):
+    """Entry point call counts of one JSON corpus file."""
+    with open(path, "r", encoding="utf-8") as f:
+        txs = json.load(f)
+    return Counter(tx["call"]["contents"][0] for tx in txs if tx["call"]["tag"] == "SolCall")
+
+
+def find_reports(corpus_dir):
+    """Coverage reports of a campaign, oldest run first."""
+    reports = []
+    for filename in os.listdir(corpus_dir):
+        match = _REPORT.match(filename)
+        if match:
+            reports.append((int(match.group(1)), filename))
+    return [filename for _, filename in sorted(reports)]
+
+
+def find_corpus(corpus_dir):
+    files = []
+    for sub in ("coverage", "reproducers"):
+        root = os.path.join(corpus_dir, sub)
+        if os.path.isdir(root):
+            files += [os.path.join(sub, f) for f in sorted(os.listdir(root)) if f.endswith(".txt")]
+    return files
+
+
+# ----------- index -----------
+
+
+def load_manifest(corpus_dir, scope=SCOPE):
+    path = os.path.join(corpus_dir, MANIFEST)
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") == FORMAT_VERSION and manifest.get("scope") == scope:
+            return manifest
+    return {"version": FORMAT_VERSION, "scope": scope, "reports": {}, "corpus": {}}
+
+
+def save_manifest(corpus_dir, manifest):
+    path = os.path.join(corpus_dir, MANIFEST)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def _stale(entry, stat):
+    return entry is None or (entry["mtime"], entry["size"]) != (stat.st_mtime_ns, stat.st_size)
+
+
+def index_campaign(corpus_dir, scope=SCOPE):
+    """Brings the campaign index up to date, parsing only new or changed files."""
+    manifest = load_manifest(corpus_dir, scope)
+    parsed = 0
+
+    reports = find_reports(corpus_dir)
+    manifest["reports"] = {k: v for k, v in manifest["reports"].items() if k in reports}
+    for filename in reports:
+        stat = os.stat(os.path.join(corpus_dir, filename))
+        if _stale(manifest["reports"].get(filename), stat):
+            covered = parse_coverage(os.path.join(corpus_dir, filename), scope)
+            manifest["reports"][filename] = {
+                "mtime": stat.st_mtime_ns,
+                "size": stat.st_size,
+                "files": {source: to_ranges(lines) for source, lines in covered.items()},
+            }
+            parsed += 1
+
+    corpus = find_corpus(corpus_dir)
+    manifest["corpus"] = {k: v for k, v in manifest["corpus"].items() if k in set(corpus)}
+    for name in corpus:
+        stat = os.stat(os.path.join(corpus_dir, name))
+        if _stale(manifest["corpus"].get(name), stat):
+            try:
+                calls = count_calls(os.path.join(corpus_dir, name))
+            except (ValueError, KeyError, TypeError):
+                calls = Counter()
+            manifest["corpus"][name] = {"mtime": stat.st_mtime_ns, "size": stat.st_size, "calls": calls}
+            parsed += 1
+
+    save_manifest(corpus_dir, manifest)
+    return manifest, parsed
+
+
+# ----------- statistics -----------
+
+
+def iter_runs(manifest):
+    """Yields `(report, {source: covered lines})` in run order, one run in memory at a time."""
+    for filename in sorted(manifest["reports"], key=lambda f: int(_REPORT.match(f).group(1))):
+        files = manifest["reports"][filename]["files"]
+        yield filename, {source: from_ranges(text) for source, text in files.items()}
+
+
+def coverage_delta(previous, current):
+    """`{source: (gained lines, lost lines)}` between two runs (changed sources only)."""
+    delta = {}
+    for source in set(previous) | set(current):
+        before, after = previous.get(source, set()), current.get(source, set())
+        gained, lost = after - before, before - after
+        if gained or lost:
+            delta[source] = (gained, lost)
+    return delta
+
+
+def total(covered):
+    return sum(len(lines) for lines in covered.values())
+
+
+def campaign_stats(manifest, log=print):
+    """Prints the runs of one campaign, returns its union coverage and call counts."""
+    union, previous = {}, None
+    for filename, covered in iter_runs(manifest):
+        line = "  {:<28} {:>6} lines".format(filename, total(covered))
+        if previous is not None:
+            delta = coverage_delta(previous, covered)
+            gained = sum(len(g) for g, _ in delta.values())
+            lost = sum(len(l) for _, l in delta.values())
+            line += "  +{} -{}".format(gained, lost)
+            for source, (g, l) in sorted(delta.items()):
+                log(line)
+                line = "      {:<60} +{} -{}".format(source, len(g), len(l))
+        log(line)
+        for source, lines in covered.items():
+            union.setdefault(source, set()).update(lines)
+        previous = covered
+
+    calls = Counter()
+    for entry in manifest["corpus"].values():
+        calls.update(entry["calls"])
+    return union, calls
+
+
+def parse_campaign(spec):
+    """`name=dir` or `dir`."""
+    name, sep, path = spec.partition("=")
+    return (name, path) if sep else (os.path.basename(os.path.normpath(spec)), spec)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Coverage and corpus statistics of Echidna campaigns.")
+    parser.add_argument("campaigns", nargs="+", help="corpus directories, as dir or name=dir")
+    parser.add_argument("--scope", default=SCOPE, help="path prefix of the sources to report")
+    parser.add_argument(
+        "--cpu-hours", action="append", default=[], help="name=hours (workers x wall clock hours)"
+    )
+    parser.add_argument("--top", type=int, default=20, help="entry points listed per campaign")
+    args = parser.parse_args(argv)
+
+    cpu_hours = {name: float(h) for name, h in (s.split("=") for s in args.cpu_hours)}
+    unions, calls = {}, {}
+    for name, corpus_dir in map(parse_campaign, args.campaigns):
+        manifest, parsed = index_campaign(corpus_dir, args.scope)
+        print("{} ({}): {} runs, {} corpus files, {} files parsed".format(
+            name, corpus_dir, len(manifest["reports"]), len(manifest["corpus"]), parsed
+        ))
+        unions[name], calls[name] = campaign_stats(manifest)
+
+    print("\nCoverage of {}".format(args.scope))
+    print("  {:<20} {:>8} {:>8} {:>14}".format("campaign", "lines", "unique", "lines/CPU-h"))
+    for name, union in unions.items():
+        others = {}
+        for other, lines in unions.items():
+            if other != name:
+                for source, covered in lines.items():
+                    others.setdefault(source, set()).update(covered)
+        unique = sum(len(lines - others.get(source, set())) for source, lines in union.items())
+        per_hour = "{:.1f}".format(total(union) / cpu_hours[name]) if cpu_hours.get(name) else "-"
+        print("  {:<20} {:>8} {:>8} {:>14}".format(name, total(union), unique, per_hour))
+
+    entry_points = sorted(load_signatures().functions)
+    for name, counter in calls.items():
+        print("\nEntry points of {} ({} calls)".format(name, sum(counter.values())))
+        for function, count in counter.most_common(args.top):
+            print("  {:<48} {:>8}".format(function, count))
+        never = [f for f in entry_points if f not in counter]
+        if never and counter:
+            print("  never called: {}".format(", ".join(never)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,271 @@
+"""
+Batch version of `FromSeqToFoudry.py`: converts a whole Echidna corpus into Foundry tests.
+
+Inputs are the files Echidna leaves behind, found recursively in the given paths:
+- `reproducers/*.txt` (and `coverage/*.txt` with `--include-coverage`): JSON lists of
+  transactions, as written in `corpusDir`,
+- any other text file (e.g. a saved `echidna ... > run.log`): every "Call sequence" block.
+
+Files are parsed and converted concurrently in a process pool. Every sequence becomes one
+`test_<hash>()` function, named after the hash of its Solidity statements, so the same
+sequence found twice (several workers, several runs) is only emitted once. Tests are spread
+by hash over `CorpusShard<k>.sol` contracts, so forge compiles the shards in parallel and a
+sequence stays in the same shard from one run to the next. The shards go to `replays/corpus/`,
+outside the default test root (a corpus holds known failures), and run under the `replay`
+foundry profile.
+
+cmd :: python3 tests/echidna/echidnaToFoundry/corpusToFoundry.py echidna-corpus
+cmd :: FOUNDRY_PROFILE=replay forge t --mc CorpusShard
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from FromSeqToFoudry import contract_header, transform_calls
+from sequenceParser import show_string
+
+ECHIDNA_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROOT_DIR = os.path.dirname(os.path.dirname(ECHIDNA_DIR))
+DEFAULT_OUT = os.path.join(ROOT_DIR, "replays", "corpus")
+CONTRACT = "PropertiesMain"
+SHARD_PREFIX = "CorpusShard"
+
+
+# ----------- Echidna formats -----------
+
+
+def _int(value):
+    """Decimal or `0x` hex; `int(value, 0)` would reject decimals with leading zeros."""
+    if not isinstance(value, str):
+        return int(value)
+    value = value.strip()
+    if value.lower().lstrip("-").startswith("0x"):
+        return int(value, 16)
+    return int(value, 10)
+
+
+def format_abi(value):
+    """Formats a JSON encoded `AbiValue` the way Echidna prints it in a call sequence."""
+    tag, contents = value["tag"], value.get("contents")
+    if tag in ("AbiUInt", "AbiInt"):
+        return str(_int(contents[1]))
+    if tag == "AbiBool":
+        return "true" if contents else "false"
+    if tag == "AbiAddress":
+        return "0x{:040x}".format(_int(contents))
+    if tag == "AbiTuple":
+        return "(" + ", ".join(format_abi(v) for v in contents) + ")"
+    if tag == "AbiArray":
+        return "[" + ", ".join(format_abi(v) for v in contents[2]) + "]"
+    if tag == "AbiArrayDynamic":
+        return "[" + ", ".join(format_abi(v) for v in contents[1]) + "]"
+    if tag in ("AbiString", "AbiBytesDynamic"):
+        return show_string(contents)
+    if tag == "AbiBytes":
+        return show_string(contents[1])
+    raise ValueError("unsupported ABI value {}".format(tag))
+
+
+def tx_to_line(tx, contract=CONTRACT):
+    """One JSON `Tx` of the corpus as an Echidna call sequence line."""
+    time_delay, block_delay = (_int(d) for d in tx.get("delay", (0, 0)))
+    delay = ""
+    if time_delay or block_delay:
+        delay = " Time delay: {} seconds Block delay: {}".format(time_delay, block_delay)
+
+    call = tx["call"]
+    if call["tag"] == "NoCall":
+        return "*wait*" + delay if delay else None
+    if call["tag"] != "SolCall":
+        raise ValueError("unsupported call {}".format(call["tag"]))
+    name, args = call["contents"]
+    line = "{}.{}({})".format(contract, name, ",".join(format_abi(a) for a in args))
+    if "src" in tx:
+        line += " from: 0x{:040x}".format(_int(tx["src"]))
+    return line + delay
+
+
+def read_corpus_file(path, contract=CONTRACT):
+    """JSON transaction list -> one sequence (text)."""
+    with open(path, "r", encoding="utf-8") as f:
+        txs = json.load(f)
+    lines = [tx_to_line(tx, contract) for tx in txs]
+    return "\n".join(line for line in lines if line)
+
+
+def read_log(path, contract=CONTRACT):
+    """Every "Call sequence" block of an Echidna text output -> list of sequences (text)."""
+    sequences, current, in_block = [], [], False
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            stripped = line.strip()
+            if "Call sequence" in stripped:
+                if current:
+                    sequences.append("\n".join(current))
+                current, in_block = [], True
+            elif in_block and (stripped.startswith(contract + ".") or stripped.startswith("*wait*")):
+                current.append(stripped)
+            elif in_block and (stripped or current):
+                if current:
+                    sequences.append("\n".join(current))
+                current, in_block = [], False
+    if current:
+        sequences.append("\n".join(current))
+    return sequences
+
+
+def read_sequences(path, contract=CONTRACT):
+    """Sequences (text) of one corpus or log file."""
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        first = f.read(1)
+    if first == "[":
+        return [read_corpus_file(path, contract)]
+    sequences = read_log(path, contract)
+    if not sequences:
+        # a bare sequence, as pasted in `FromSeqToFoudry.py`.
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            lines = [l.strip() for l in f if l.strip().startswith((contract + ".", "*wait*"))]
+        sequences = ["\n".join(lines)] if lines else []
+    return sequences
+
+
+def find_inputs(paths, include_coverage=False):
+    """Corpus/log files given directly or found (recursively, in name order) in directories."""
+    files = []
+    for path in paths:
+        if not os.path.isdir(path):
+            files.append(path)
+            continue
+        for root, dirs, filenames in os.walk(path):
+            dirs[:] = sorted(d for d in dirs if include_coverage or d != "coverage")
+            for filename in sorted(filenames):
+                # `covered.<time>.txt` are the annotated sources, not sequences.
+                if filename.startswith("covered.") or not filename.endswith((".txt", ".log")):
+                    continue
+                files.append(os.path.join(root, filename))
+    return files
+
+
+# ----------- conversion -----------
+
+
+def sequence_digest(statements):
+    return hashlib.sha256("\n".join(s.strip() for s in statements).encode()).hexdigest()
+
+
+def convert_file(path, contract=CONTRACT):
+    """
+    Worker: returns `(path, tests, error)` where `tests` is a list of `(digest, statements)`
+    for every sequence found in `path`.
+    """
+    try:
+        tests = []
+        for sequence in read_sequences(path, contract):
+            statements = transform_calls(sequence)
+            if statements:
+                tests.append((sequence_digest(statements), statements))
+        return path, tests, None
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        return path, [], "{}: {}".format(type(e).__name__, e)
+
+
+def convert_all(files, workers=None, contract=CONTRACT):
+    """
+    Converts `files` in a process pool, returns `(tests, errors)` with `tests` mapping each
+    digest to `(statements, sources)`.
+    """
+    tests, errors = {}, []
+    with ProcessPoolExecutor(workers) as pool:
+        futures = [pool.submit(convert_file, path, contract) for path in files]
+        for future in as_completed(futures):
+            path, found, error = future.result()
+            if error:
+                errors.append((path, error))
+            for digest, statements in found:
+                tests.setdefault(digest, (statements, []))[1].append(path)
+    for _, sources in tests.values():
+        sources.sort()
+    return tests, errors
+
+
+# ----------- output -----------
+
+
+def shard_of(digest, shards):
+    return int(digest[:8], 16) % shards
+
+
+def render_shard(contract_name, tests, import_dir, command="FOUNDRY_PROFILE=replay forge t --mc {} -vvvv"):
+    """Solidity source of one shard, `tests` being a list of `(digest, statements, sources)`."""
+    output = contract_header(contract_name, import_dir, command.format(contract_name))
+    for digest, statements, sources in tests:
+        output.append("")
+        for source in sources[:3]:
+            output.append("    // {}".format(source))
+        if len(sources) > 3:
+            output.append("    // ... and {} other files".format(len(sources) - 3))
+        output.append("    function test_{}() public {{".format(digest[:12]))
+        output += statements
+        output.append("    }")
+    output.append("}")
+    output.append("")
+    return "\n".join(output)
+
+
+def write_shards(tests, out_dir, shards):
+    """Replaces the shards of `out_dir` by the given tests, returns the written files."""
+    os.makedirs(out_dir, exist_ok=True)
+    for stale in glob.glob(os.path.join(out_dir, SHARD_PREFIX + "*.sol")):
+        os.remove(stale)
+
+    import_dir = os.path.relpath(ECHIDNA_DIR, os.path.abspath(out_dir)).replace(os.sep, "/")
+    by_shard = {}
+    for digest in sorted(tests):
+        statements, sources = tests[digest]
+        by_shard.setdefault(shard_of(digest, shards), []).append((digest, statements, sources))
+
+    written = []
+    for shard, shard_tests in sorted(by_shard.items()):
+        name = "{}{}".format(SHARD_PREFIX, shard)
+        path = os.path.join(out_dir, name + ".sol")
+        with open(path, "w") as f:
+            f.write(render_shard(name, shard_tests, import_dir))
+        written.append(path)
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Converts an Echidna corpus into Foundry tests.")
+    parser.add_argument("paths", nargs="+", help="corpus directories, corpus files or Echidna logs")
+    parser.add_argument("--out", default=DEFAULT_OUT, help="output directory of the shards")
+    parser.add_argument("--shards", type=int, default=8, help="number of test contracts")
+    parser.add_argument("--include-coverage", action="store_true", help="also convert coverage/*.txt")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args(argv)
+
+    files = find_inputs(args.paths, args.include_coverage)
+    if not files:
+        print("No corpus file found.")
+        return 1
+    tests, errors = convert_all(files, args.workers)
+    for path, error in errors:
+        print("Skipped {} ({})".format(path, error))
+    if not tests:
+        print("No sequence found.")
+        return 1
+
+    written = write_shards(tests, args.out, max(args.shards, 1))
+    print(
+        "Done ::: {} unique sequences from {} files written to {} shards in {}".format(
+            len(tests), len(files), len(written), args.out
+        )
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
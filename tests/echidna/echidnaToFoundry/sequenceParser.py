@@ -0,0 +1,449 @@
+"""
+Tokenizer, parser and Solidity emitter for Echidna call sequences.
+
+Each line of a sequence is tokenized in a single pass and parsed into a typed AST:
+
+    PropertiesMain.fn((1, 2, false),3) from: 0x...30000 Time delay: 60 seconds Block delay: 5
+    -> Call("PropertiesMain", "fn", [Tuple([Number(1), Number(2), Bool(False)]), Number(3)],
+            sender=0x30000, time_delay=60, block_delay=5)
+
+    *wait* Time delay: 60 seconds Block delay: 5  ->  Wait(time_delay=60, block_delay=5)
+
+Arguments are typed against the public function signatures read from `PropertiesMain.sol`,
+`PropertiesBase.sol` and `properties/*.sol`, so every tuple becomes the struct the function
+actually takes (`PropertiesBase.LocalVars_UPTL(...)`, or any other struct, nested or not).
+A delay is applied before its transaction like Echidna does (`skip()` + `vm.roll()`) and
+the call is sent from its sender with `vm.prank()`. String literals are read and written with
+the Haskell `show` escapes Echidna prints (`\\233`, `\\DEL`, `\\&`...).
+"""
+import glob
+import os
+import re
+from functools import lru_cache
+from typing import List, NamedTuple, Optional
+
+ECHIDNA_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCES = ["PropertiesMain.sol", "PropertiesBase.sol", "properties/*.sol"]
+
+
+class ParseError(ValueError):
+    pass
+
+
+# ----------- AST -----------
+
+
+class Number(NamedTuple):
+    value: int
+
+
+class Bool(NamedTuple):
+    value: bool
+
+
+class String(NamedTuple):
+    value: str
+
+
+class Tuple(NamedTuple):
+    items: list
+
+
+class Array(NamedTuple):
+    items: list
+
+
+class Call(NamedTuple):
+    contract: Optional[str]
+    function: str
+    args: list
+    sender: Optional[int] = None
+    time_delay: int = 0
+    block_delay: int = 0
+
+
+class Wait(NamedTuple):
+    time_delay: int = 0
+    block_delay: int = 0
+
+
+# ----------- tokenizer / parser -----------
+
+_TOKENS = re.compile(
+    r"""
+    (?P<space>\s+)
+    |(?P<string>"(?:[^"\\]|\\.)*")
+    |(?P<number>-?(?:0x[0-9a-fA-F]+|\d+))
+    |(?P<wait>\*wait\*)
+    |(?P<name>[A-Za-z_$][\w$]*(?:\.[A-Za-z_$][\w$]*)*)
+    |(?P<punct>[(),\[\]:])
+    """,
+    re.VERBOSE,
+)
+
+
+def _number(text):
+    """Decimal or `0x` hex literal (`int(text, 0)` rejects decimals with leading zeros)."""
+    return int(text, 16) if text.lstrip("-")[:2].lower() == "0x" else int(text, 10)
+
+
+_ASCII_NAMES = [
+    "NUL", "SOH", "STX", "ETX", "EOT", "ENQ", "ACK", "BEL", "BS", "HT", "LF", "VT", "FF", "CR", "SO", "SI",
+    "DLE", "DC1", "DC2", "DC3", "DC4", "NAK", "SYN", "ETB", "CAN", "EM", "SUB", "ESC", "FS", "GS", "RS", "US",
+]
+_NAMED = dict({name: i for i, name in enumerate(_ASCII_NAMES)}, SP=32, DEL=127)
+_SHORT = {"a": 7, "b": 8, "t": 9, "n": 10, "v": 11, "f": 12, "r": 13, "\\": 92, '"': 34, "'": 39}
+_ESCAPE = re.compile(
+    r"""\\(?:
+    (?P<short>[abtnvfr\\"'])
+    |(?P<dec>\d+)
+    |o(?P<oct>[0-7]+)
+    |x(?P<hex>[0-9a-fA-F]+)
+    |\^(?P<ctrl>[@A-Z\[\\\]^_])
+    |(?P<name>{})
+    |(?P<empty>&)
+    )""".format("|".join(sorted(_NAMED, key=len, reverse=True))),
+    re.VERBOSE,
+)
+
+
+def read_string(text, column=0):
+    """Decodes a Haskell `show`n string literal (quotes included) starting at `column`."""
+    out, pos, body = [], 1, text[:-1]
+    while pos < len(body):
+        if body[pos] != "\\":
+            out.append(body[pos])
+            pos += 1
+            continue
+        match = _ESCAPE.match(body, pos)
+        if match is None:
+            raise ParseError("invalid escape {!r} at column {}".format(body[pos : pos + 2], column + pos))
+        kind, value = match.lastgroup, match.group(match.lastgroup)
+        if kind == "short":
+            code = _SHORT[value]
+        elif kind in ("dec", "oct", "hex"):
+            code = int(value, {"dec": 10, "oct": 8, "hex": 16}[kind])
+        elif kind == "ctrl":
+            code = ord(value) - 64
+        elif kind == "name":
+            code = _NAMED[value]
+        else:
+            code = None
+        if code is not None:
+            if code > 0x10FFFF:
+                raise ParseError("character out of range {!r} at column {}".format(match.group(), column + pos))
+            out.append(chr(code))
+        pos = match.end()
+    return "".join(out)
+
+
+def show_string(value):
+    """Haskell `show` of a string, as Echidna prints it."""
+    out = []
+    for k, char in enumerate(value):
+        code, following = ord(char), value[k + 1 : k + 2]
+        if char in ('"', "\\"):
+            out.append("\\" + char)
+        elif 32 <= code < 127:
+            out.append(char)
+        elif 7 <= code <= 13:
+            out.append("\\" + "abtnvfr"[code - 7])
+        elif code < 32 or code == 127:
+            out.append("\\" + (_ASCII_NAMES[code] if code < 32 else "DEL"))
+            if code == 14 and following == "H":
+                out.append("\\&")
+        else:
+            out.append("\\{}".format(code))
+            if following.isdigit():
+                out.append("\\&")
+    return '"' + "".join(out) + '"'
+
+
+def solidity_string(value):
+    """Solidity literal of a string read from Echidna: characters up to 255 are single bytes."""
+    out = []
+    for char in value:
+        if char in ('"', "\\"):
+            out.append("\\" + char)
+        elif 32 <= ord(char) < 127:
+            out.append(char)
+        else:
+            data = bytes([ord(char)]) if ord(char) < 256 else char.encode("utf-8")
+            out += ["\\x{:02x}".format(b) for b in data]
+    return '"' + "".join(out) + '"'
+
+
+def tokenize(line):
+    """Yields `(kind, text, column)` tokens of one line."""
+    pos = 0
+    for match in _TOKENS.finditer(line):
+        if match.start() != pos:
+            break
+        pos = match.end()
+        if match.lastgroup != "space":
+            yield match.lastgroup, match.group(), match.start()
+    if pos != len(line):
+        raise ParseError("unexpected character {!r} at column {} of {!r}".format(line[pos], pos, line))
+
+
+class _Parser:
+    def __init__(self, line):
+        self.line = line
+        self.tokens = list(tokenize(line))
+        self.pos = 0
+
+    def peek(self, offset=0):
+        pos = self.pos + offset
+        return self.tokens[pos] if pos < len(self.tokens) else (None, None, len(self.line))
+
+    def next(self, kind=None, text=None):
+        token = self.peek()
+        if (kind and token[0] != kind) or (text and token[1] != text):
+            raise ParseError("expected {} in {!r}, got {!r}".format(text or kind, self.line, token[1]))
+        self.pos += 1
+        return token[1]
+
+    def accept(self, text):
+        if self.peek()[1] == text:
+            self.pos += 1
+            return True
+        return False
+
+    def values(self, close):
+        items = []
+        if self.accept(close):
+            return items
+        items.append(self.value())
+        while self.accept(","):
+            items.append(self.value())
+        self.next("punct", close)
+        return items
+
+    def value(self):
+        kind, text, column = self.peek()
+        if kind == "number":
+            self.pos += 1
+            return Number(_number(text))
+        if kind == "name" and text in ("true", "false"):
+            self.pos += 1
+            return Bool(text == "true")
+        if kind == "string":
+            self.pos += 1
+            try:
+                return String(read_string(text, column))
+            except ParseError as e:
+                raise ParseError("{} of {!r}".format(e, self.line)) from None
+        if self.accept("("):
+            return Tuple(self.values(")"))
+        if self.accept("["):
+            return Array(self.values("]"))
+        raise ParseError("unexpected {!r} in {!r}".format(text, self.line))
+
+    def delays(self):
+        time_delay = block_delay = 0
+        while self.peek()[1] in ("Time", "Block"):
+            which = self.next("name")
+            self.next("name", "delay")
+            self.next("punct", ":")
+            value = _number(self.next("number"))
+            if which == "Time":
+                time_delay = value
+                self.accept("seconds")
+            else:
+                block_delay = value
+        return time_delay, block_delay
+
+    def statement(self):
+        if self.peek()[0] == "wait":
+            self.pos += 1
+            node = Wait(*self.delays())
+        else:
+            target = self.next("name")
+            contract, _, function = target.rpartition(".")
+            self.next("punct", "(")
+            args = self.values(")")
+            sender = None
+            if self.accept("from"):
+                self.next("punct", ":")
+                sender = _number(self.next("number"))
+            node = Call(contract or None, function, args, sender, *self.delays())
+        if self.peek()[0] is not None:
+            raise ParseError("trailing {!r} in {!r}".format(self.peek()[1], self.line))
+        return node
+
+
+def parse_line(line):
+    """Parses one call (or `*wait*`) line of a sequence."""
+    return _Parser(line.strip()).statement()
+
+
+def is_statement(line, contract="PropertiesMain"):
+    line = line.lstrip()
+    return line.startswith("*wait*") or line.startswith(contract + ".")
+
+
+def parse_lines(lines, contract="PropertiesMain"):
+    """Lazily parses the sequence lines of an iterable (other lines are ignored)."""
+    for line in lines:
+        if is_statement(line, contract):
+            yield parse_line(line)
+
+
+def parse_sequence(text, contract="PropertiesMain"):
+    return list(parse_lines(text.split("\n"), contract))
+
+
+def format_value(node):
+    """Echidna text of a value node."""
+    if isinstance(node, Number):
+        return str(node.value)
+    if isinstance(node, Bool):
+        return "true" if node.value else "false"
+    if isinstance(node, String):
+        return show_string(node.value)
+    if isinstance(node, Tuple):
+        return "(" + ", ".join(format_value(v) for v in node.items) + ")"
+    return "[" + ", ".join(format_value(v) for v in node.items) + "]"
+
+
+def format_statement(node):
+    """Echidna text of a statement node (inverse of `parse_line()`)."""
+    delay = ""
+    if node.time_delay or node.block_delay:
+        delay = " Time delay: {} seconds Block delay: {}".format(node.time_delay, node.block_delay)
+    if isinstance(node, Wait):
+        return "*wait*" + delay
+    target = node.function if node.contract is None else node.contract + "." + node.function
+    line = "{}({})".format(target, ",".join(format_value(a) for a in node.args))
+    if node.sender is not None:
+        line += " from: 0x{:040x}".format(node.sender)
+    return line + delay
+
+
+# ----------- signatures -----------
+
+
+class Struct(NamedTuple):
+    contract: str
+    name: str
+    field_types: List[str]
+
+
+class Signatures(NamedTuple):
+    functions: dict  # name -> list of parameter type lists (overloads)
+    structs: dict  # name -> Struct
+
+
+_COMMENTS = re.compile(r"//[^\n]*|/\*.*?\*/", re.DOTALL)
+_CONTRACT = re.compile(r"\b(?:abstract\s+)?(?:contract|library|interface)\s+(\w+)")
+_STRUCT = re.compile(r"\bstruct\s+(\w+)\s*\{([^}]*)\}")
+_FUNCTION = re.compile(r"\bfunction\s+(\w+)\s*\(([^)]*)\)([^{;]*)")
+_INTEGER = re.compile(r"u?int\d*")
+_BYTES = re.compile(r"bytes\d+")
+
+
+def _param_type(declaration):
+    return declaration.split()[0]
+
+
+def parse_signatures(sources):
+    """Public/external functions and structs declared in the given Solidity sources."""
+    functions, structs = {}, {}
+    for source in sources:
+        source = _COMMENTS.sub("", source)
+        contracts = [(m.start(), m.group(1)) for m in _CONTRACT.finditer(source)]
+        for match in _STRUCT.finditer(source):
+            owner = [name for start, name in contracts if start < match.start()][-1]
+            fields = [f.strip() for f in match.group(2).split(";") if f.strip()]
+            structs[match.group(1)] = Struct(owner, match.group(1), [_param_type(f) for f in fields])
+        for match in _FUNCTION.finditer(source):
+            if not re.search(r"\b(public|external)\b", match.group(3)):
+                continue
+            params = [p.strip() for p in match.group(2).split(",") if p.strip()]
+            types = [_param_type(p) for p in params]
+            if types not in functions.setdefault(match.group(1), []):
+                functions[match.group(1)].append(types)
+    return Signatures(functions, structs)
+
+
+@lru_cache(maxsize=None)
+def load_signatures(echidna_dir=ECHIDNA_DIR):
+    sources = []
+    for pattern in SOURCES:
+        for path in sorted(glob.glob(os.path.join(echidna_dir, pattern))):
+            with open(path, "r", encoding="utf-8") as f:
+                sources.append(f.read())
+    return parse_signatures(sources)
+
+
+# ----------- Solidity emitter -----------
+
+
+def _address(value):
+    return "address(uint160(0x{:x}))".format(value)
+
+
+def emit_value(node, type_, signatures):
+    """Solidity expression of a value node passed as a `type_` parameter."""
+    struct = signatures.structs.get(type_.split(".")[-1])
+    if struct is not None:
+        if not isinstance(node, Tuple) or len(node.items) != len(struct.field_types):
+            raise ParseError("{} does not match struct {}".format(format_value(node), struct.name))
+        fields = [emit_value(v, t, signatures) for v, t in zip(node.items, struct.field_types)]
+        return "{}.{}({})".format(struct.contract, struct.name, ", ".join(fields))
+    if type_.endswith("]"):
+        element, size = type_[:-1].rsplit("[", 1)
+        if not size or not isinstance(node, Array) or len(node.items) != int(size):
+            raise ParseError("{} cannot be passed as {}".format(format_value(node), type_))
+        items = [emit_value(v, element, signatures) for v in node.items]
+        if items:
+            items[0] = "{}({})".format(element, items[0])
+        return "[" + ", ".join(items) + "]"
+    if type_ == "bool" and isinstance(node, Bool):
+        return "true" if node.value else "false"
+    if _INTEGER.fullmatch(type_) and isinstance(node, Number):
+        return str(node.value)
+    if type_ in ("address", "address payable") and isinstance(node, Number):
+        return _address(node.value)
+    if type_ == "string" and isinstance(node, String):
+        return solidity_string(node.value)
+    if type_ == "bytes" and isinstance(node, String):
+        return "bytes({})".format(solidity_string(node.value))
+    if _BYTES.fullmatch(type_) and isinstance(node, Number):
+        return "{}(uint{}(0x{:x}))".format(type_, int(type_[5:]) * 8, node.value)
+    if isinstance(node, Number) and type_[:1].isupper():
+        # contract / interface typed parameter
+        return "{}({})".format(type_, _address(node.value))
+    raise ParseError("{} cannot be passed as {}".format(format_value(node), type_))
+
+
+def _instance(contract):
+    contract = contract or "PropertiesMain"
+    return contract[0].lower() + contract[1:]
+
+
+def emit_statement(node, signatures=None):
+    """Solidity statements (without indentation) of one parsed line."""
+    signatures = signatures or load_signatures()
+    statements = []
+    if node.time_delay:
+        statements.append("skip({});".format(node.time_delay))
+    if node.block_delay:
+        statements.append("vm.roll(block.number + {});".format(node.block_delay))
+    if isinstance(node, Wait):
+        return statements
+
+    args = None
+    for types in signatures.functions.get(node.function, []):
+        if len(types) == len(node.args):
+            try:
+                args = [emit_value(a, t, signatures) for a, t in zip(node.args, types)]
+                break
+            except ParseError:
+                continue
+    if args is None:
+        raise ParseError("no public {}() matching {}".format(node.function, format_statement(node)))
+    if node.sender is not None:
+        statements.append("vm.prank({});".format(_address(node.sender)))
+    statements.append("{}.{}({});".format(_instance(node.contract), node.function, ", ".join(args)))
+    return statements
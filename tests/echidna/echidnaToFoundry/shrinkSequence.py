@@ -0,0 +1,336 @@
+"""
+Delta-debugging shrinker for failing Echidna sequences, replayed through Foundry.
+
+The sequence is reduced in three passes, each candidate being converted with the
+`FromSeqToFoudry.py` transform and run with `forge test`:
+1. ddmin over the calls (and `*wait*` lines) of the sequence,
+2. removal of the time delays left on the calls,
+3. fields of the `LocalVars_UPTL` (first tuple) argument shrunk toward zero (ints halved
+   down to 0, `true` -> `false`).
+
+A candidate is kept when it still fails with the same reason as the original sequence.
+All candidates of a round are written as test functions of one contract, so forge compiles
+them once and runs them in parallel. The contract is written to `replays/shrink/` (one file per
+process) and run under the `replay` foundry profile, so a file left by an interrupted run never
+reaches the default `forge test`. Verdicts are cached on disk by the hash of the generated
+statements, so a sequence is never replayed twice (across rounds and across runs). The cache is
+dropped when the sources it was computed against (`contracts/`, the Echidna properties) change.
+
+cmd :: python3 tests/echidna/echidnaToFoundry/shrinkSequence.py echidna.log --out shrunk.sol
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import subprocess
+import sys
+
+from FromSeqToFoudry import transform_calls, transform_text
+from corpusToFoundry import ECHIDNA_DIR, read_sequences, render_shard, sequence_digest
+from sequenceParser import Call, Tuple, format_statement, format_value, parse_line
+
+ROOT_DIR = os.path.dirname(os.path.dirname(ECHIDNA_DIR))
+SCRATCH_DIR = os.path.join(ROOT_DIR, "replays", "shrink")
+CANDIDATES = "ShrinkCandidates"
+FOUNDRY_PROFILE = "replay"
+SOURCE_PATTERNS = [
+    "contracts/**/*.sol",
+    "tests/echidna/*.sol",
+    "tests/echidna/mock/**/*.sol",
+    "tests/echidna/properties/**/*.sol",
+    "tests/echidna/util/**/*.sol",
+]
+
+
+# ----------- sequence edits -----------
+
+
+def split_lines(sequence):
+    return [line.strip() for line in sequence.split("\n") if line.strip()]
+
+
+def _first_tuple(node):
+    if isinstance(node, Call):
+        for k, arg in enumerate(node.args):
+            if isinstance(arg, Tuple):
+                return k
+    return None
+
+
+def tuple_fields(line):
+    """Fields (Echidna text) of the first tuple argument of a call line, `None` when there is none."""
+    node = parse_line(line)
+    k = _first_tuple(node)
+    return None if k is None else [format_value(v) for v in node.args[k].items]
+
+
+def set_tuple_field(line, index, value):
+    node = parse_line(line)
+    k = _first_tuple(node)
+    items = list(node.args[k].items)
+    items[index] = parse_line("f({})".format(value)).args[0]
+    args = list(node.args)
+    args[k] = Tuple(items)
+    return format_statement(node._replace(args=args))
+
+
+def drop_delay(line):
+    return format_statement(parse_line(line)._replace(time_delay=0, block_delay=0))
+
+
+def smaller_values(value):
+    """Candidate replacements of a tuple field, smallest first."""
+    if value == "true":
+        return ["false"]
+    if not value.isdigit() or int(value) == 0:
+        return []
+    v = int(value)
+    return [str(c) for c in sorted({0} | {v >> s for s in (64, 32, 16, 8, 4, 2, 1)}) if c < v]
+
+
+def apply_edits(lines, edits):
+    """Applies `(line index, field index or None, value)` edits; a `None` field drops the delay."""
+    lines = list(lines)
+    for i, field, value in edits:
+        lines[i] = drop_delay(lines[i]) if field is None else set_tuple_field(lines[i], field, value)
+    return lines
+
+
+def delay_edits(lines):
+    groups = []
+    for i, line in enumerate(lines):
+        node = parse_line(line)
+        if isinstance(node, Call) and (node.time_delay or node.block_delay):
+            groups.append([(i, None, None)])
+    return groups
+
+
+def field_edits(lines):
+    groups = []
+    for i, line in enumerate(lines):
+        for j, value in enumerate(tuple_fields(line) or []):
+            edits = [(i, j, v) for v in smaller_values(value.strip())]
+            if edits:
+                groups.append(edits)
+    return groups
+
+
+# ----------- forge oracle -----------
+
+
+def sources_digest(root_dir=ROOT_DIR):
+    """Hash of the Solidity sources a verdict depends on (contracts and Echidna properties)."""
+    digest = hashlib.sha256()
+    paths = set()
+    for pattern in SOURCE_PATTERNS:
+        paths.update(glob.glob(os.path.join(root_dir, pattern), recursive=True))
+    for path in sorted(paths):
+        digest.update(os.path.relpath(path, root_dir).replace(os.sep, "/").encode() + b"\0")
+        with open(path, "rb") as f:
+            digest.update(hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()
+
+
+class Oracle:
+    """
+    Tells whether candidate sequences still reproduce the failure, running them in batches
+    through `forge test` and caching the verdicts by statements hash. Cached verdicts are only
+    reused while `sources` (the `sources_digest()` of the tree by default) is unchanged.
+    Candidates are written to `scratch_dir`, which must be under the `replay` profile test root
+    for forge to compile them.
+    """
+
+    def __init__(
+        self, forge="forge", batch_size=200, cache_path=None, same_reason=True, sources=None, scratch_dir=SCRATCH_DIR
+    ):
+        self.forge = forge
+        self.batch_size = batch_size
+        self.scratch_dir = scratch_dir
+        self.cache_path = cache_path or os.path.join(scratch_dir, "verdicts.json")
+        self.same_reason = same_reason
+        self.sources = sources or sources_digest()
+        self.reason = None
+        self.runs = 0
+        self.cache = {}
+        if os.path.exists(self.cache_path):
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+            if stored.get("sources") == self.sources:
+                self.cache = stored["verdicts"]
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        with open(self.cache_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"sources": self.sources, "verdicts": self.cache}, f)
+        os.replace(self.cache_path + ".tmp", self.cache_path)
+
+    def _run(self, tests):
+        """Runs `{digest: statements}` in one forge invocation, returns `{digest: (failed, reason)}`."""
+        os.makedirs(self.scratch_dir, exist_ok=True)
+        # One file per process, written whole before forge can see it (parallel shrinks).
+        path = os.path.join(self.scratch_dir, "{}{}.sol".format(CANDIDATES, os.getpid()))
+        import_dir = os.path.relpath(ECHIDNA_DIR, self.scratch_dir).replace(os.sep, "/")
+        with open(path + ".tmp", "w") as f:
+            candidates = [(d, s, []) for d, s in sorted(tests.items())]
+            f.write(render_shard(CANDIDATES, candidates, import_dir))
+        os.replace(path + ".tmp", path)
+
+        command = [self.forge, "test", "--match-path", os.path.relpath(path, ROOT_DIR), "--json"]
+        try:
+            env = dict(os.environ, FOUNDRY_PROFILE=FOUNDRY_PROFILE)
+            proc = subprocess.run(command, cwd=ROOT_DIR, capture_output=True, text=True, env=env)
+        finally:
+            os.remove(path)
+        self.runs += 1
+        output = [line for line in proc.stdout.splitlines() if line.startswith("{")]
+        if not output:
+            raise RuntimeError("forge test did not report any result:\n" + proc.stderr + proc.stdout)
+        results = {}
+        for suite, report in json.loads(output[-1]).items():
+            if suite.endswith(":" + CANDIDATES):
+                for name, result in report["test_results"].items():
+                    results[name.split("(")[0]] = (result["status"] == "Failure", result.get("reason") or "")
+        verdicts = {}
+        for digest in tests:
+            if "test_" + digest[:12] not in results:
+                raise RuntimeError("no forge result for test_{}".format(digest[:12]))
+            verdicts[digest] = results["test_" + digest[:12]]
+        return verdicts
+
+    def verdicts(self, candidates):
+        """`(failed, reason)` of every candidate sequence (list of lines)."""
+        digests = []
+        pending = {}
+        for lines in candidates:
+            statements = transform_calls("\n".join(lines))
+            digest = sequence_digest(statements)
+            digests.append(digest)
+            if digest not in self.cache and statements:
+                pending[digest] = statements
+
+        todo = sorted(pending)
+        for i in range(0, len(todo), self.batch_size):
+            batch = {d: pending[d] for d in todo[i : i + self.batch_size]}
+            self.cache.update({d: list(v) for d, v in self._run(batch).items()})
+            self.save()
+        return [tuple(self.cache.get(d, (False, ""))) for d in digests]
+
+    def reproduces(self, candidates):
+        """Whether every candidate still fails (with the original reason unless disabled)."""
+        return [
+            failed and (not self.same_reason or reason == self.reason)
+            for failed, reason in self.verdicts(candidates)
+        ]
+
+
+# ----------- shrinking -----------
+
+
+def _chunks(lines, n):
+    size, extra = divmod(len(lines), n)
+    out, start = [], 0
+    for k in range(n):
+        end = start + size + (k < extra)
+        out.append(lines[start:end])
+        start = end
+    return out
+
+
+def ddmin(lines, test, log=print):
+    """Classic ddmin where every round (subsets and complements) is tested as one batch."""
+    n = 2
+    while len(lines) >= 2:
+        chunks = _chunks(lines, n)
+        subsets = sorted(chunks, key=len)
+        complements = [] if n == 2 else [
+            [line for k, c in enumerate(chunks) if k != skip for line in c] for skip in range(n)
+        ]
+        verdicts = test(subsets + complements)
+        if any(verdicts[: len(subsets)]):
+            lines, n = subsets[verdicts.index(True)], 2
+        elif any(verdicts[len(subsets) :]):
+            lines, n = complements[verdicts[len(subsets) :].index(True)], max(n - 1, 2)
+        elif n >= len(lines):
+            break
+        else:
+            n = min(len(lines), 2 * n)
+            continue
+        log("ddmin: {} lines".format(len(lines)))
+    return lines
+
+
+def shrink_edits(lines, propose, test, max_rounds=64):
+    """
+    Greedy edit pass. `propose(lines)` returns groups of alternative edits (best first) for
+    independent slots; the best reproducing edit of each slot is kept, then as many of them as
+    possible are applied together.
+    """
+    for _ in range(max_rounds):
+        groups = propose(lines)
+        flat = [(g, edit) for g, group in enumerate(groups) for edit in group]
+        verdicts = test([apply_edits(lines, [edit]) for _, edit in flat])
+        best = {}
+        for (g, edit), ok in zip(flat, verdicts):
+            if ok and g not in best:
+                best[g] = edit
+        if not best:
+            break
+        best = [best[g] for g in sorted(best)]
+        prefixes = [apply_edits(lines, best[:k]) for k in range(len(best), 1, -1)]
+        verdicts = test(prefixes)
+        lines = prefixes[verdicts.index(True)] if any(verdicts) else apply_edits(lines, best[:1])
+    return lines
+
+
+def shrink(sequence, oracle, max_rounds=64, log=print):
+    """Returns the minimal reproducer (Echidna text) of a failing `sequence`."""
+    lines = split_lines(sequence)
+    failed, reason = oracle.verdicts([lines])[0]
+    if not failed:
+        raise ValueError("the sequence does not fail under forge")
+    oracle.reason = reason
+    log("Original: {} lines, failing with {!r}".format(len(lines), reason))
+
+    previous = None
+    while previous != lines:
+        previous = lines
+        lines = ddmin(lines, oracle.reproduces, log)
+        lines = shrink_edits(lines, delay_edits, oracle.reproduces, max_rounds)
+        lines = shrink_edits(lines, field_edits, oracle.reproduces, max_rounds)
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Shrinks a failing Echidna sequence with forge.")
+    parser.add_argument("input", help="Echidna log / sequence text or JSON reproducer")
+    parser.add_argument("--index", type=int, default=-1, help="sequence to shrink when the input has several")
+    parser.add_argument("--out", default=None, help="write the minimal reproducer as a Foundry test")
+    parser.add_argument("--forge", default="forge", help="forge executable")
+    parser.add_argument("--batch-size", type=int, default=200, help="candidates per forge run")
+    parser.add_argument("--cache", default=None, help="verdict cache (JSON, default: <scratch-dir>/verdicts.json)")
+    parser.add_argument(
+        "--scratch-dir", default=SCRATCH_DIR, help="where candidates are written, under the replay profile test root"
+    )
+    parser.add_argument("--any-failure", action="store_true", help="accept candidates failing for another reason")
+    parser.add_argument("--max-rounds", type=int, default=64)
+    args = parser.parse_args(argv)
+
+    sequences = read_sequences(args.input)
+    if not sequences:
+        print("No sequence found in {}.".format(args.input))
+        return 1
+    oracle = Oracle(args.forge, args.batch_size, args.cache, not args.any_failure, scratch_dir=args.scratch_dir)
+    minimal = shrink(sequences[args.index], oracle, args.max_rounds)
+
+    print("Minimal reproducer ({} forge runs):".format(oracle.runs))
+    print(minimal)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(transform_text(minimal))
+        print("Done ::: the %s file has been generated." % args.out)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
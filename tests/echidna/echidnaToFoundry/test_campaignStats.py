@@ -0,0 +1,64 @@
+import os
+import shutil
+
+import campaignStats as stats
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+RUN_1 = """/work/astera/contracts/protocol/core/lendingpool/LendingPool.sol
+  1 |     | // SPDX-License-Identifier: BUSL-1.1
+  2 | *   | pragma solidity 0.8.23;
+  3 | *r  | contract LendingPool {
+  4 | r   |     function deposit() external {}
+  5 |     | }
+
+/work/astera/tests/echidna/PropertiesMain.sol
+  1 | *   | contract PropertiesMain {}
+"""
+
+RUN_2 = """/work/astera/contracts/protocol/core/lendingpool/LendingPool.sol
+  2 | *   | pragma solidity 0.8.23;
+  5 | *   | }
+/work/astera/contracts/protocol/core/minipool/MiniPool.sol
+  10 | *  | contract MiniPool {
+  11 | *  |     uint256 a;
+"""
+
+
+def _campaign(tmp_path):
+    corpus_dir = tmp_path / "corpus"
+    (corpus_dir / "reproducers").mkdir(parents=True)
+    (corpus_dir / "covered.200.txt").write_text(RUN_2)
+    (corpus_dir / "covered.100.txt").write_text(RUN_1)
+    shutil.copy(os.path.join(FIXTURES, "reproducer.txt"), str(corpus_dir / "reproducers" / "1.txt"))
+    return str(corpus_dir)
+
+
+def test_ranges_round_trip():
+    assert stats.to_ranges({7, 1, 2, 3, 9, 10}) == "1-3,7,9-10"
+    assert stats.from_ranges("1-3,7,9-10") == {1, 2, 3, 7, 9, 10}
+    assert stats.to_ranges(set()) == "" and stats.from_ranges("") == set()
+
+
+def test_campaign_index_and_statistics(tmp_path):
+    corpus_dir = _campaign(tmp_path)
+    manifest, parsed = stats.index_campaign(corpus_dir)
+    assert parsed == 3
+    runs = list(stats.iter_runs(manifest))
+    assert [name for name, _ in runs] == ["covered.100.txt", "covered.200.txt"]
+    assert runs[0][1] == {"contracts/protocol/core/lendingpool/LendingPool.sol": {2, 3, 4}}
+
+    delta = stats.coverage_delta(runs[0][1], runs[1][1])
+    assert delta == {
+        "contracts/protocol/core/lendingpool/LendingPool.sol": ({5}, {3, 4}),
+        "contracts/protocol/core/minipool/MiniPool.sol": ({10, 11}, set()),
+    }
+
+    union, calls = stats.campaign_stats(manifest, log=lambda *_: None)
+    assert stats.total(union) == 6
+    assert calls == {"randDepositLP": 1, "userDebtIntegrityMP": 1}
+
+    # Nothing changed: nothing is parsed again.
+    assert stats.index_campaign(corpus_dir)[1] == 0
+    (tmp_path / "corpus" / "covered.300.txt").write_text(RUN_1)
+    assert stats.index_campaign(corpus_dir)[1] == 1
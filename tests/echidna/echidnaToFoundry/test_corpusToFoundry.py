@@ -0,0 +1,54 @@
+import os
+import shutil
+
+import pytest
+
+import corpusToFoundry as corpus
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+REPRODUCER = os.path.join(FIXTURES, "reproducer.txt")
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [("0123", 123), ("0", 0), ("0x1F", 31), ("0X1f", 31), ("-0x10", -16), ("-007", -7), (42, 42)],
+)
+def test_int(value, expected):
+    assert corpus._int(value) == expected
+
+
+def test_read_corpus_file():
+    assert corpus.read_sequences(REPRODUCER) == [
+        "PropertiesMain.randDepositLP((37, 0, 85, 159, 25, 122, 19, 46, 1, 25, 14, "
+        "19517060225048056303761628647016002362, false),2,14,1,34611341961874600762689036068982424608)"
+        " from: 0x0000000000000000000000000000000000010000\n"
+        "*wait* Time delay: 5365 seconds Block delay: 4484\n"
+        "PropertiesMain.userDebtIntegrityMP() from: 0x0000000000000000000000000000000000030000"
+        " Time delay: 1949 seconds Block delay: 757"
+    ]
+
+
+def test_duplicates_are_emitted_once(tmp_path):
+    for name in ("a", "b"):
+        (tmp_path / name / "reproducers").mkdir(parents=True)
+        shutil.copy(REPRODUCER, str(tmp_path / name / "reproducers" / "1.txt"))
+    files = corpus.find_inputs([str(tmp_path)])
+    tests, errors = corpus.convert_all(files, workers=1)
+    assert errors == [] and len(files) == 2 and len(tests) == 1
+    (statements, sources), = tests.values()
+    assert sources == sorted(files)
+    assert statements[:2] == ["        vm.prank(address(uint160(0x10000)));", statements[1]]
+
+    written = corpus.write_shards(tests, str(tmp_path / "out"), 4)
+    assert len(written) == 1
+    with open(written[0], "r", encoding="utf-8") as f:
+        source = f.read()
+    assert "function test_{}()".format(next(iter(tests))[:12]) in source
+    assert '"{}/PropertiesMain.sol"'.format(
+        os.path.relpath(corpus.ECHIDNA_DIR, str(tmp_path / "out")).replace(os.sep, "/")
+    ) in source
+
+
+def test_shards_are_written_outside_the_test_root():
+    tests_root = os.path.join(corpus.ROOT_DIR, "tests") + os.sep
+    assert not os.path.abspath(corpus.DEFAULT_OUT).startswith(tests_root)
@@ -0,0 +1,108 @@
+import os
+
+import pytest
+
+from FromSeqToFoudry import input_text, transform_calls
+from sequenceParser import (
+    Array,
+    Bool,
+    Call,
+    Number,
+    ParseError,
+    String,
+    Tuple,
+    Wait,
+    emit_statement,
+    format_statement,
+    format_value,
+    parse_line,
+    parse_sequence,
+    parse_signatures,
+)
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+SOURCE = """
+contract Base {
+    struct Inner { uint8 a; bool b; }
+    struct Outer { Inner inner; uint256[2] pair; }
+}
+contract Main is Base {
+    // function commented(uint256 x) public {}
+    function fn(Outer memory o, address who) public {}
+    function note(string memory s) external {}
+    function internalOnly(uint256 x) internal {}
+}
+"""
+
+
+def test_parse_line():
+    line = "PropertiesMain.fn(((1, true), [2, 3]),0x30000) from: 0x30000 Time delay: 60 seconds Block delay: 5"
+    assert parse_line(line) == Call(
+        "PropertiesMain",
+        "fn",
+        [Tuple([Tuple([Number(1), Bool(True)]), Array([Number(2), Number(3)])]), Number(0x30000)],
+        sender=0x30000,
+        time_delay=60,
+        block_delay=5,
+    )
+    assert parse_line("*wait* Time delay: 7 seconds Block delay: 2") == Wait(7, 2)
+    assert parse_line('note("a \\"b\\"")') == Call(None, "note", [String('a "b"')])
+    assert parse_line("f(007,-0x10) Time delay: 060 seconds Block delay: 0") == Call(
+        None, "f", [Number(7), Number(-16)], time_delay=60
+    )
+
+
+@pytest.mark.parametrize("line", ["PropertiesMain.fn((1, 2)", "PropertiesMain.fn(1) extra", "PropertiesMain.fn(1;)"])
+def test_parse_errors(line):
+    with pytest.raises(ParseError):
+        parse_line(line)
+
+
+def test_haskell_string_escapes():
+    value = "caf\xe91 \x7f\x01\x0eH\x01\nAAӒ\"\\"
+    line = r'note("caf\233\&1 \DEL\SOH\SO\&H\^A\n\x41\o101\1234\"\\")'
+    assert parse_line(line) == Call(None, "note", [String(value)])
+    # Written back the way `show` prints it.
+    shown = r'note("caf\233\&1 \DEL\SOH\SO\&H\SOH\nAA\1234\"\\")'
+    assert format_statement(parse_line(line)) == shown
+    assert parse_line(shown) == parse_line(line)
+    for text in ["\x0eH", "\xff9", "\x00", "\x1f\x7f", "a\"b\\c"]:
+        assert parse_line("f({})".format(format_value(String(text)))).args == [String(text)]
+
+
+@pytest.mark.parametrize("line, column", [(r'f("ok\q")', 5), (r'f(1, "\1114112")', 6), (r'f("\^a")', 3)])
+def test_invalid_string_escapes(line, column):
+    with pytest.raises(ParseError, match="at column {} ".format(column)):
+        parse_line(line)
+
+
+def test_round_trip_of_the_example_sequence():
+    lines = [line.strip() for line in input_text.split("\n") if line.strip()]
+    nodes = parse_sequence(input_text)
+    assert len(nodes) == len(lines)
+    assert [format_statement(node) for node in nodes] == lines
+    assert [parse_line(format_statement(node)) for node in nodes] == nodes
+
+
+def test_emit_against_signatures():
+    signatures = parse_signatures([SOURCE])
+    assert set(signatures.functions) == {"fn", "note"}
+    node = parse_line("Main.fn(((1, false), [2, 3]),16) from: 0x10000 Time delay: 60 seconds Block delay: 5")
+    assert emit_statement(node, signatures) == [
+        "skip(60);",
+        "vm.roll(block.number + 5);",
+        "vm.prank(address(uint160(0x10000)));",
+        "main.fn(Base.Outer(Base.Inner(1, false), [uint256(2), 3]), address(uint160(0x10)));",
+    ]
+    with pytest.raises(ParseError):
+        emit_statement(parse_line("Main.fn((1, 2),16)"), signatures)
+    assert emit_statement(parse_line(r'Main.note("a\\\233\DEL\"")'), signatures) == [
+        r'main.note("a\\\xe9\x7f\"");'
+    ]
+
+
+def test_example_sequence_matches_the_expected_solidity():
+    with open(os.path.join(FIXTURES, "sequence.expected"), "r", encoding="utf-8") as f:
+        expected = f.read().splitlines()
+    assert transform_calls(input_text) == expected
@@ -0,0 +1,75 @@
+import json
+import os
+import sys
+
+import shrinkSequence as shrinker
+
+LINES = [
+    "PropertiesMain.randDepositLP((0, 179, 164, 0, 0, 0, 67, 10, 20, 61, 6, 1113, false),36,0,45,102)",
+    "*wait* Time delay: 5365 seconds Block delay: 4484",
+    "PropertiesMain.randFlashloanLP((2, 1, 209, 51, 197, 44, 56, 0, 161, 126, 2, 7205, false),11,12,37,52)",
+    "PropertiesMain.randBorrowMP((18, 174, 57, 15, 31, 27, 52, 148, 179, 112, 0, 38, true),4,1,49,226,2) "
+    "Time delay: 1949 seconds Block delay: 757",
+    "PropertiesMain.userDebtIntegrityMP()",
+]
+
+
+def test_ddmin_keeps_the_failing_lines():
+    needed = {LINES[1], LINES[3]}
+    reduced = shrinker.ddmin(LINES, lambda cands: [needed <= set(c) for c in cands], log=lambda *_: None)
+    assert reduced == [LINES[1], LINES[3]]
+
+
+def test_field_and_delay_edits():
+    # Fails as long as the 3rd field of the borrow stays >= 10.
+    def test(cands):
+        return [int(shrinker.tuple_fields(c[0])[2]) >= 10 for c in cands]
+
+    lines = shrinker.shrink_edits([LINES[3]], shrinker.field_edits, test)
+    assert shrinker.tuple_fields(lines[0]) == ["0"] * 2 + ["14"] + ["0"] * 9 + ["false"]
+    lines = shrinker.shrink_edits(lines, shrinker.delay_edits, test)
+    assert "delay" not in lines[0]
+    assert shrinker.smaller_values("5") == ["0", "1", "2"]
+    assert shrinker.smaller_values("0") == []
+
+
+def _fake_forge(tmp_path, status):
+    """A `forge` that fails (or passes) every test of the generated candidates contract."""
+    script = tmp_path / "forge"
+    script.write_text(
+        "#!{}\n"
+        "import json, re, sys\n"
+        "path = sys.argv[sys.argv.index('--match-path') + 1]\n"
+        "names = re.findall(r'function (test_\\w+)\\(', open(path).read())\n"
+        "results = {{n + '()': {{'status': {!r}, 'reason': 'boom'}} for n in names}}\n"
+        "print(json.dumps({{path + ':ShrinkCandidates': {{'test_results': results}}}}))\n".format(sys.executable, status)
+    )
+    script.chmod(0o755)
+    return str(script)
+
+
+def test_verdict_cache_is_keyed_by_the_sources(tmp_path):
+    scratch = tmp_path / "scratch"
+    cache = str(scratch / "verdicts.json")
+    failing = _fake_forge(tmp_path, "Failure")
+
+    oracle = shrinker.Oracle(failing, sources="v1", scratch_dir=str(scratch))
+    assert oracle.verdicts([LINES[:2]]) == [(True, "boom")]
+    assert oracle.runs == 1
+    assert os.listdir(str(scratch)) == ["verdicts.json"]
+    with open(cache, "r", encoding="utf-8") as f:
+        assert json.load(f)["sources"] == "v1"
+
+    # Same sources: the verdict is reused without running forge.
+    oracle = shrinker.Oracle(_fake_forge(tmp_path, "Success"), cache_path=cache, sources="v1")
+    assert oracle.verdicts([LINES[:2]]) == [(True, "boom")]
+    assert oracle.runs == 0
+
+    # Changed sources: the sequence is replayed.
+    oracle = shrinker.Oracle(_fake_forge(tmp_path, "Success"), sources="v2", scratch_dir=str(scratch))
+    assert oracle.verdicts([LINES[:2]]) == [(False, "boom")]
+    assert oracle.runs == 1
+
+
+def test_scratch_dir_is_outside_the_test_root():
+    assert os.path.relpath(shrinker.SCRATCH_DIR, shrinker.ROOT_DIR).split(os.sep)[0] == "replays"
@@ -460,15 +460,11 @@ contract MiniPoolPidReserveInterestRateStrategyTest is Common {
                 ",",
                 Strings.toString(currentLiquidityRate),
                 ",",
-                Strings.toString(currentVariableBorrowRate)
+                Strings.toString(currentVariableBorrowRate),
+                ",",
+                vm.toString(pidStrat._errI())
             )
         );
-        // ",",
-        // Strings.toString(availableLiquidity),
-        // ",",
-        // Strings.toString(currentDebt),
-        // ",",
-        // Strings.toString(uint256(errI))
 
         vm.writeLine(path, data);
     }
@@ -498,11 +494,11 @@ contract MiniPoolPidReserveInterestRateStrategyTest is Common {
                 ",",
                 Strings.toString(currentLiquidityRate),
                 ",",
-                Strings.toString(currentVariableBorrowRate)
+                Strings.toString(currentVariableBorrowRate),
+                ",",
+                vm.toString(miniPoolPidStrat._errI())
             )
         );
-        // ",",
-        // Strings.toString(uint256(errI))
 
         vm.writeLine(pathMiniPool, data);
     }
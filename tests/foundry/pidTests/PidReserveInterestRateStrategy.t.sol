@@ -86,7 +86,7 @@ contract PidReserveInterestRateStrategyTest is Common {
         if (vm.exists(path)) vm.removeFile(path);
         vm.writeLine(
             path,
-            "timestamp,user,action,asset,utilizationRate,currentLiquidityRate,currentVariableBorrowRate,availableLiquidity,currentDebt"
+            "timestamp,user,action,asset,utilizationRate,currentLiquidityRate,currentVariableBorrowRate,errI"
         );
     }
 
@@ -240,7 +240,9 @@ contract PidReserveInterestRateStrategyTest is Common {
                 ",",
                 Strings.toString(currentLiquidityRate),
                 ",",
-                Strings.toString(currentVariableBorrowRate)
+                Strings.toString(currentVariableBorrowRate),
+                ",",
+                vm.toString(pidStrat._errI())
             )
         );
 
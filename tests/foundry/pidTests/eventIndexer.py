@@ -0,0 +1,503 @@
+"""
+Offline event indexer: broadcast receipts and local node log dumps into a SQLite store.
+
+Logs are read from `broadcast/**/run-latest.json` (the receipts forge writes after a script)
+and from JSON dumps of a local node (`cast logs --json` / `eth_getLogs` output, a JSON list,
+an RPC response or one log per line). They are decoded against every event ABI found in the
+forge artifacts (`out/`), through a map `(topic0, topic count) -> event` computed once per
+artifact and cached in the database, and inserted in bulk, one transaction per source:
+- `events`: every decoded log (arguments as JSON, integers as decimal strings),
+- `pid_logs`: `BasePiReserveRateStrategy.PidLog`, typed, with the asset of the strategy,
+- `reserve_updates`: `ReserveDataUpdated` of the LendingPool and the MiniPools.
+Both typed tables are indexed on `(asset, block)`. Rays are stored as decimal text (exact).
+
+`PidLog` has no asset: it is emitted by the strategy right before the pool emits
+`ReserveDataUpdated(reserve, ...)` in the same transaction, which gives the asset of the
+strategy (remembered in `strategies` for later logs).
+
+Ingestion is incremental: a source is read again only when its mtime or size changed, and
+only the logs above the last block indexed from it are decoded (a source whose blocks went
+backwards, e.g. a restarted anvil, is indexed again; rows are unique per transaction and log
+index). `read_pid_logs()` / `--csv` give the `pidData` trace format back, so the pid plots run
+on fork or testnet runs without re-executing anything.
+
+cmd :: python3 tests/foundry/pidTests/eventIndexer.py --db events.sqlite
+cmd :: python3 tests/foundry/pidTests/eventIndexer.py anvil-logs.json --chain-id 31337 --csv data/fork.csv
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+from collections import namedtuple
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+OUT_DIR = os.path.join(ROOT_DIR, "out")
+BROADCAST_DIR = os.path.join(ROOT_DIR, "broadcast")
+DEFAULT_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "events.sqlite")
+DEFAULT_CHAIN_ID = 31337
+
+# Fallback when `out/` is not built: the events the typed tables are made of.
+BUILTIN_ABI = [
+    {
+        "type": "event",
+        "name": "PidLog",
+        "anonymous": False,
+        "inputs": [
+            {"name": "utilizationRate", "type": "uint256", "indexed": False},
+            {"name": "currentLiquidityRate", "type": "uint256", "indexed": False},
+            {"name": "currentVariableBorrowRate", "type": "uint256", "indexed": False},
+            {"name": "err", "type": "int256", "indexed": False},
+            {"name": "controllerErr", "type": "int256", "indexed": False},
+        ],
+    },
+    {
+        "type": "event",
+        "name": "ReserveDataUpdated",
+        "anonymous": False,
+        "inputs": [
+            {"name": "reserve", "type": "address", "indexed": True},
+            {"name": "liquidityRate", "type": "uint256", "indexed": False},
+            {"name": "variableBorrowRate", "type": "uint256", "indexed": False},
+            {"name": "liquidityIndex", "type": "uint256", "indexed": False},
+            {"name": "variableBorrowIndex", "type": "uint256", "indexed": False},
+        ],
+    },
+]
+
+PID_COLUMNS = ["utilizationRate", "currentLiquidityRate", "currentVariableBorrowRate", "err", "controllerErr"]
+RESERVE_COLUMNS = ["liquidityRate", "variableBorrowRate", "liquidityIndex", "variableBorrowIndex"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    path TEXT PRIMARY KEY, chain_id INTEGER, mtime INTEGER, size INTEGER, last_block INTEGER
+);
+CREATE TABLE IF NOT EXISTS artifacts (path TEXT PRIMARY KEY, mtime INTEGER, size INTEGER, events TEXT);
+CREATE TABLE IF NOT EXISTS events (
+    chain_id INTEGER, block INTEGER, log_index INTEGER, tx_hash TEXT, timestamp INTEGER,
+    address TEXT, name TEXT, args TEXT,
+    PRIMARY KEY (chain_id, tx_hash, log_index)
+);
+CREATE INDEX IF NOT EXISTS events_name_block ON events (name, block);
+CREATE TABLE IF NOT EXISTS pid_logs (
+    chain_id INTEGER, block INTEGER, log_index INTEGER, tx_hash TEXT, timestamp INTEGER,
+    strategy TEXT, asset TEXT, utilizationRate TEXT, currentLiquidityRate TEXT,
+    currentVariableBorrowRate TEXT, err TEXT, controllerErr TEXT,
+    PRIMARY KEY (chain_id, tx_hash, log_index)
+);
+CREATE INDEX IF NOT EXISTS pid_logs_asset_block ON pid_logs (asset, block);
+CREATE TABLE IF NOT EXISTS reserve_updates (
+    chain_id INTEGER, block INTEGER, log_index INTEGER, tx_hash TEXT, timestamp INTEGER,
+    pool TEXT, asset TEXT, liquidityRate TEXT, variableBorrowRate TEXT, liquidityIndex TEXT,
+    variableBorrowIndex TEXT,
+    PRIMARY KEY (chain_id, tx_hash, log_index)
+);
+CREATE INDEX IF NOT EXISTS reserve_updates_asset_block ON reserve_updates (asset, block);
+CREATE TABLE IF NOT EXISTS strategies (chain_id INTEGER, address TEXT, asset TEXT, PRIMARY KEY (chain_id, address));
+"""
+
+
+# ----------- keccak256 -----------
+
+_MASK = (1 << 64) - 1
+_ROUND_CONSTANTS = [
+    0x0000000000000001, 0x0000000000008082, 0x800000000000808A, 0x8000000080008000,
+    0x000000000000808B, 0x0000000080000001, 0x8000000080008081, 0x8000000000008009,
+    0x000000000000008A, 0x0000000000000088, 0x0000000080008009, 0x000000008000000A,
+    0x000000008000808B, 0x800000000000008B, 0x8000000000008089, 0x8000000000008003,
+    0x8000000000008002, 0x8000000000000080, 0x000000000000800A, 0x800000008000000A,
+    0x8000000080008081, 0x8000000000008080, 0x0000000080000001, 0x8000000080008008,
+]
+# _ROTATIONS[x][y]
+_ROTATIONS = [
+    [0, 36, 3, 41, 18], [1, 44, 10, 45, 2], [62, 6, 43, 15, 61], [28, 55, 25, 21, 56], [27, 20, 39, 8, 14],
+]
+_RATE = 136
+
+
+def _rol(value, shift):
+    return ((value << shift) | (value >> (64 - shift))) & _MASK if shift else value
+
+
+def _keccak_f(a):
+    for rc in _ROUND_CONSTANTS:
+        c = [a[x][0] ^ a[x][1] ^ a[x][2] ^ a[x][3] ^ a[x][4] for x in range(5)]
+        d = [c[(x - 1) % 5] ^ _rol(c[(x + 1) % 5], 1) for x in range(5)]
+        b = [[0] * 5 for _ in range(5)]
+        for x in range(5):
+            for y in range(5):
+                b[y][(2 * x + 3 * y) % 5] = _rol(a[x][y] ^ d[x], _ROTATIONS[x][y])
+        a = [[b[x][y] ^ (~b[(x + 1) % 5][y] & b[(x + 2) % 5][y]) for y in range(5)] for x in range(5)]
+        a[0][0] ^= rc
+    return a
+
+
+def keccak256(data):
+    """Keccak-256 (the Ethereum one, not SHA3-256); only used to compute event topics."""
+    padded = bytearray(data) + b"\x01"
+    padded += b"\x00" * (-len(padded) % _RATE)
+    padded[-1] |= 0x80
+    state = [[0] * 5 for _ in range(5)]
+    for start in range(0, len(padded), _RATE):
+        for i in range(_RATE // 8):
+            state[i % 5][i // 5] ^= int.from_bytes(padded[start + 8 * i : start + 8 * i + 8], "little")
+        state = _keccak_f(state)
+    return b"".join(state[i % 5][i // 5].to_bytes(8, "little") for i in range(4))
+
+
+# ----------- ABI -----------
+
+Event = namedtuple("Event", "name signature indexed data")
+
+
+def canonical_type(param):
+    """ABI type of a parameter, tuples expanded (`(uint256,address)[]`)."""
+    type_ = param["type"]
+    if type_.startswith("tuple"):
+        return "(" + ",".join(canonical_type(c) for c in param["components"]) + ")" + type_[5:]
+    return type_
+
+
+def events_of_abi(abi):
+    """`[topic0, topic count, name, signature, indexed types, data types]` of the non anonymous events."""
+    events = []
+    for item in abi:
+        if item.get("type") != "event" or item.get("anonymous"):
+            continue
+        types = [canonical_type(p) for p in item["inputs"]]
+        signature = "{}({})".format(item["name"], ",".join(types))
+        indexed = [(p["name"], t) for p, t in zip(item["inputs"], types) if p.get("indexed")]
+        data = [(p["name"], t) for p, t in zip(item["inputs"], types) if not p.get("indexed")]
+        topic = "0x" + keccak256(signature.encode()).hex()
+        events.append([topic, 1 + len(indexed), item["name"], signature, indexed, data])
+    return events
+
+
+def find_artifacts(out_dir=OUT_DIR):
+    artifacts = []
+    for root, dirs, files in os.walk(out_dir):
+        dirs[:] = sorted(d for d in dirs if d != "build-info")
+        artifacts += [os.path.join(root, f) for f in sorted(files) if f.endswith(".json")]
+    return artifacts
+
+
+def load_decoders(db, out_dir=OUT_DIR):
+    """`{(topic0, topic count): Event}`, reading only the artifacts changed since the last run."""
+    known = {path: (mtime, size) for path, mtime, size in db.execute("SELECT path, mtime, size FROM artifacts")}
+    artifacts = find_artifacts(out_dir) if os.path.isdir(out_dir) else []
+    with db:
+        db.executemany("DELETE FROM artifacts WHERE path = ?", [(p,) for p in set(known) - set(artifacts)])
+        for path in artifacts:
+            stat = os.stat(path)
+            if known.get(path) == (stat.st_mtime_ns, stat.st_size):
+                continue
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    abi = json.load(f).get("abi", [])
+            except (ValueError, AttributeError):
+                abi = []
+            db.execute(
+                "INSERT OR REPLACE INTO artifacts VALUES (?, ?, ?, ?)",
+                (path, stat.st_mtime_ns, stat.st_size, json.dumps(events_of_abi(abi))),
+            )
+
+    decoders = {}
+    rows = [json.dumps(events_of_abi(BUILTIN_ABI))] + [r[0] for r in db.execute("SELECT events FROM artifacts")]
+    for events in rows:
+        for topic, count, name, signature, indexed, data in json.loads(events):
+            decoders[(topic, count)] = Event(name, signature, [tuple(p) for p in indexed], [tuple(p) for p in data])
+    return decoders
+
+
+def _word(data, offset):
+    return int.from_bytes(data[offset : offset + 32], "big")
+
+
+def decode_value(type_, data, offset=0, base=0):
+    """Value of an ABI type stored at `offset` (head) of `data`, `base` being the start of its tuple."""
+    if type_.endswith("]"):
+        element, size = type_[:-1].rsplit("[", 1)
+        if size:
+            if is_dynamic(element):
+                raise ValueError("unsupported type " + type_)
+            return [decode_value(element, data, offset + 32 * k, base) for k in range(int(size))]
+        start = base + _word(data, offset)
+        count = _word(data, start)
+        if is_dynamic(element):
+            raise ValueError("unsupported type " + type_)
+        return [decode_value(element, data, start + 32 + 32 * k, start + 32) for k in range(count)]
+    if type_ in ("bytes", "string"):
+        start = base + _word(data, offset)
+        raw = bytes(data[start + 32 : start + 32 + _word(data, start)])
+        return raw.decode("utf-8", "replace") if type_ == "string" else "0x" + raw.hex()
+    if type_.startswith("("):
+        raise ValueError("unsupported type " + type_)
+    value = _word(data, offset)
+    if type_.startswith("uint"):
+        return value
+    if type_.startswith("int"):
+        return value - (1 << 256) if value >> 255 else value
+    if type_ == "address":
+        return "0x{:040x}".format(value & ((1 << 160) - 1))
+    if type_ == "bool":
+        return bool(value)
+    if type_.startswith("bytes"):
+        return "0x" + bytes(data[offset : offset + int(type_[5:])]).hex()
+    raise ValueError("unsupported type " + type_)
+
+
+def is_dynamic(type_):
+    return type_ in ("bytes", "string") or type_.endswith("[]") or type_.startswith("(")
+
+
+def decode_log(event, topics, data):
+    """`{name: value}` of a log; indexed dynamic values are their hash."""
+    args = {}
+    for (name, type_), topic in zip(event.indexed, topics[1:]):
+        args[name] = topic if is_dynamic(type_) else decode_value(type_, bytes.fromhex(topic[2:]))
+    raw = bytes.fromhex(data[2:] if data.startswith("0x") else data)
+    for k, (name, type_) in enumerate(event.data):
+        args[name] = decode_value(type_, raw, 32 * k)
+    return args
+
+
+# ----------- sources -----------
+
+Log = namedtuple("Log", "block log_index tx_hash timestamp address topics data")
+
+
+def _int(value):
+    if value is None:
+        return None
+    return int(value, 16) if isinstance(value, str) else int(value)
+
+
+def _log(raw):
+    return Log(
+        _int(raw.get("blockNumber")),
+        _int(raw.get("logIndex")),
+        raw.get("transactionHash", "").lower(),
+        _int(raw.get("blockTimestamp") or raw.get("timestamp")),
+        raw["address"].lower(),
+        [t.lower() for t in raw.get("topics", [])],
+        raw.get("data") or "0x",
+    )
+
+
+def find_sources(paths):
+    """`run-latest.json` of the given broadcast directories, other files as given."""
+    sources = []
+    for path in paths:
+        if not os.path.isdir(path):
+            sources.append(path)
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            if "run-latest.json" in files:
+                sources.append(os.path.join(root, "run-latest.json"))
+    return sources
+
+
+def read_logs(path, chain_id=None):
+    """`(chain id, logs)` of a broadcast file or of a log dump."""
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    try:
+        data = json.loads(text)
+    except ValueError:
+        data = [json.loads(line) for line in text.splitlines() if line.strip()]
+
+    if isinstance(data, dict) and "receipts" in data:
+        chain_id = data.get("chain") or chain_id or _int(os.path.basename(os.path.dirname(path)))
+        raws = [log for receipt in data["receipts"] for log in receipt.get("logs", [])]
+    else:
+        if isinstance(data, dict):
+            data = data.get("result", data.get("logs", []))
+        raws = data
+    return int(chain_id or DEFAULT_CHAIN_ID), [_log(raw) for raw in raws if raw.get("topics")]
+
+
+# ----------- store -----------
+
+
+def connect(path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    db = sqlite3.connect(path)
+    db.executescript(SCHEMA)
+    return db
+
+
+def _text(value):
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, int):
+        return str(value)
+    if isinstance(value, list):
+        return [_text(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _text(v) for k, v in value.items()}
+    return value
+
+
+def decode_logs(chain_id, logs, decoders, strategies):
+    """Rows of the `events`, `pid_logs` and `reserve_updates` tables; updates `strategies`."""
+    events, pid_logs, reserve_updates, unknown = [], [], [], 0
+    by_tx = {}
+    for log in logs:
+        by_tx.setdefault(log.tx_hash, []).append(log)
+
+    for tx_logs in by_tx.values():
+        tx_logs.sort(key=lambda log: log.log_index)
+        pending = []  # PidLog rows waiting for the ReserveDataUpdated of their reserve
+        for log in tx_logs:
+            event = decoders.get((log.topics[0], len(log.topics)))
+            if event is None:
+                unknown += 1
+                continue
+            try:
+                args = decode_log(event, log.topics, log.data)
+            except (ValueError, IndexError):
+                unknown += 1
+                continue
+            key = (chain_id, log.block, log.log_index, log.tx_hash, log.timestamp)
+            events.append((*key, log.address, event.name, json.dumps(_text(args))))
+            if event.signature == "PidLog(uint256,uint256,uint256,int256,int256)":
+                row = [*key, log.address, strategies.get((chain_id, log.address))]
+                pid_logs.append(row + [str(args[c]) for c in PID_COLUMNS])
+                pending.append(pid_logs[-1])
+            elif event.signature == "ReserveDataUpdated(address,uint256,uint256,uint256,uint256)":
+                # By position: the interfaces name it `reserve`, ReserveLogic/MiniPoolReserveLogic `asset`.
+                asset = args[event.indexed[0][0]]
+                reserve_updates.append((*key, log.address, asset, *[str(args[c]) for c in RESERVE_COLUMNS]))
+                for row in pending:
+                    strategies[(chain_id, row[5])] = asset
+                    row[6] = asset
+                pending = []
+    return events, pid_logs, reserve_updates, unknown
+
+
+def index_source(db, path, decoders, chain_id=None, log=print):
+    """Indexes the new logs of one source, returns the number of inserted events."""
+    key = os.path.relpath(path, ROOT_DIR)
+    stat = os.stat(path)
+    entry = db.execute("SELECT chain_id, mtime, size, last_block FROM sources WHERE path = ?", (key,)).fetchone()
+    if entry is not None and entry[1:3] == (stat.st_mtime_ns, stat.st_size):
+        return 0
+
+    chain_id, logs = read_logs(path, chain_id)
+    last_block = entry[3] if entry is not None and entry[0] == chain_id else -1
+    top = max((l.block for l in logs), default=last_block)
+    if top < last_block:
+        log("{}: blocks went back from {} to {}, indexing it again".format(key, last_block, top))
+        last_block = -1
+    logs = [l for l in logs if l.block > last_block]
+
+    strategies = {(c, a): asset for c, a, asset in db.execute("SELECT chain_id, address, asset FROM strategies")}
+    events, pid_logs, reserve_updates, unknown = decode_logs(chain_id, logs, decoders, strategies)
+    with db:
+        db.executemany("INSERT OR IGNORE INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?)", events)
+        db.executemany("INSERT OR IGNORE INTO pid_logs VALUES ({})".format(", ".join("?" * 12)), pid_logs)
+        db.executemany(
+            "INSERT OR IGNORE INTO reserve_updates VALUES ({})".format(", ".join("?" * 11)), reserve_updates
+        )
+        db.executemany(
+            "INSERT OR REPLACE INTO strategies VALUES (?, ?, ?)",
+            [(c, a, asset) for (c, a), asset in strategies.items() if asset],
+        )
+        # PidLogs indexed before their strategy was known.
+        db.executemany(
+            "UPDATE pid_logs SET asset = ? WHERE chain_id = ? AND strategy = ? AND asset IS NULL",
+            [(asset, c, a) for (c, a), asset in strategies.items() if asset],
+        )
+        db.execute(
+            "INSERT OR REPLACE INTO sources VALUES (?, ?, ?, ?, ?)",
+            (key, chain_id, stat.st_mtime_ns, stat.st_size, max(top, last_block)),
+        )
+    log("{}: {} new logs, {} events ({} PidLog, {} ReserveDataUpdated), {} unknown".format(
+        key, len(logs), len(events), len(pid_logs), len(reserve_updates), unknown
+    ))
+    return len(events)
+
+
+# ----------- queries -----------
+
+
+def read_pid_logs(db_path, assets=None, chain_id=None, rays="percent"):
+    """
+    `PidLog` rows in the `pidData` trace layout (`timestamp`, `asset`, rate columns), ordered by
+    block. `timestamp` is the block timestamp when the source had it, the block number otherwise.
+    """
+    # Imported here so that indexing and decoding only need the standard library.
+    import pandas as pd
+
+    from pidData import RAY_PERCENT
+
+    query = "SELECT * FROM pid_logs WHERE 1 = 1"
+    params = []
+    if assets:
+        query += " AND asset IN ({})".format(", ".join("?" * len(assets)))
+        params += [a.lower() for a in assets]
+    if chain_id is not None:
+        query += " AND chain_id = ?"
+        params.append(chain_id)
+    with sqlite3.connect(db_path) as db:
+        data = pd.read_sql_query(query + " ORDER BY chain_id, block, log_index", db, params=params)
+    data.insert(0, "timestamp", data.pop("timestamp").fillna(data["block"]).astype("int64"))
+    for column in PID_COLUMNS:
+        values = [int(v) if rays == "exact" else int(v) / RAY_PERCENT for v in data[column]]
+        data[column] = pd.Series(values, index=data.index, dtype=object if rays == "exact" else "float64")
+    data["asset"] = data["asset"].astype("category")
+    return data
+
+
+def export_trace(db_path, path, assets=None, chain_id=None):
+    """Writes the `PidLog` rows as a pid trace CSV (exact rays), readable by `pidData`."""
+    trace = read_pid_logs(db_path, assets, chain_id, rays="exact")
+    trace[["timestamp", "asset", *PID_COLUMNS[:3]]].to_csv(path, index=False)
+
+
+def export_parquet(db_path, out_dir):
+    """Writes the typed tables as Parquet files (rays kept as decimal strings)."""
+    import pandas as pd
+
+    os.makedirs(out_dir, exist_ok=True)
+    with sqlite3.connect(db_path) as db:
+        for table in ("pid_logs", "reserve_updates"):
+            data = pd.read_sql_query("SELECT * FROM {} ORDER BY asset, block, log_index".format(table), db)
+            data.to_parquet(os.path.join(out_dir, table + ".parquet"), index=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Indexes broadcast receipts and node log dumps into SQLite.")
+    parser.add_argument("sources", nargs="*", default=[BROADCAST_DIR], help="broadcast directories or log dumps")
+    parser.add_argument("--db", default=DEFAULT_DB, help="SQLite store")
+    parser.add_argument("--out", default=OUT_DIR, help="forge artifacts directory (ABIs)")
+    parser.add_argument("--chain-id", type=int, default=None, help="chain id of the log dumps (default 31337)")
+    parser.add_argument("--csv", default=None, help="write the PidLog trace (pidData format) to this CSV")
+    parser.add_argument("--asset", action="append", default=None, help="restrict --csv to this asset")
+    parser.add_argument("--parquet", default=None, help="export the typed tables to this directory")
+    args = parser.parse_args(argv)
+
+    db = connect(args.db)
+    decoders = load_decoders(db, args.out)
+    sources = [s for s in find_sources(args.sources) if os.path.exists(s)]
+    if not sources:
+        print("No source found in {}.".format(", ".join(args.sources)))
+    inserted = sum(index_source(db, path, decoders, args.chain_id) for path in sources)
+    counts = [db.execute("SELECT COUNT(*) FROM " + t).fetchone()[0] for t in ("events", "pid_logs", "reserve_updates")]
+    db.close()
+    print("{} new events, store: {} events, {} PidLog, {} ReserveDataUpdated ({} decoders)".format(
+        inserted, *counts, len(decoders)
+    ))
+
+    if args.csv:
+        export_trace(args.db, args.csv, args.asset, args.chain_id)
+        print("PidLog trace written to {}".format(args.csv))
+    if args.parquet:
+        export_parquet(args.db, args.parquet)
+        print("Parquet files written to {}".format(args.parquet))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
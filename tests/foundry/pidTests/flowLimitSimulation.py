@@ -0,0 +1,330 @@
+"""
+Monte Carlo stress simulator of the main pool and its MiniPools under PI rates and flow limits.
+
+One asset is modelled in the main LendingPool and in `M` MiniPools that list its aToken. Each
+pool has its own PI strategy (`BasePiReserveRateStrategy`, float counterpart of
+`piSimulation.py`) and reserve factor. Each MiniPool also has a flow limit (`FlowLimiter`).
+
+Every step (default one hour), in every scenario:
+- the demand of borrowers and suppliers follows a mean reverting random walk, correlated
+  price shocks (Poisson) push borrow demand up and supply down in every pool at once,
+- agents move part of the way to their targets, which depend on the current rates
+  (borrowers leave when the borrow rate is high, suppliers come when the supply rate is high),
+- main pool withdrawals and borrows are bounded by its available liquidity; a MiniPool
+  borrowing more than its own liquidity flow borrows the rest from the main pool, up to its
+  flow limit and to what is left in the main pool (shared pro rata between MiniPools),
+- the PI state and the rates of every pool are updated. A MiniPool with an outstanding flow
+  pays at least the liquidity rate covering the main pool borrow rate
+  (`MiniPoolPiReserveInterestRateStrategy.calculateInterestRates()`).
+
+The time loop is the only Python loop: every step is an array operation over
+`(scenarios, pools)`. Scenarios are split in chunks run in a process pool, each chunk with
+its own seed, so a run is reproducible for a given `--seed` and chunk size. The same seeds are
+used for every value of a `--flow-limit` sweep (common random numbers), so differences
+between the limits are not sampling noise.
+
+cmd :: python3 tests/foundry/pidTests/flowLimitSimulation.py --minipools 8 --scenarios 5000 \
+           --days 30 --flow-limit 1,2,5,10
+"""
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from piSimulation import RAY, PiParams
+
+SECONDS_PER_YEAR = 365 * 24 * 3600
+DELTA_TIME_MARGIN = 5 * 24 * 3600
+SPIKE_UTILIZATION = 0.95
+
+_PI = PiParams()
+
+
+class PoolParams(NamedTuple):
+    """
+    PI strategy and market size of one pool. Rays are given as fractions (`45e25` -> `0.45`),
+    `ki` per second (`13e19` -> `1.3e-7`), `reserve_factor` as a fraction (`1500` -> `0.15`).
+    Amounts are in units of the asset; `flow_limit` only applies to MiniPools.
+    """
+
+    optimal_utilization_rate: float = _PI.optimal_utilization_rate / RAY
+    kp: float = _PI.kp / RAY
+    ki: float = _PI.ki / RAY
+    min_controller_error: float = _PI.min_controller_error / RAY
+    max_i_time_amp: float = _PI.max_i_time_amp
+    m_factor: float = _PI.m_factor / RAY
+    n_factor: int = _PI.n_factor
+    reserve_factor: float = _PI.reserve_factor / 10_000
+    supply: float = 100.0
+    demand: float = 40.0
+    flow_limit: float = 0.0
+
+
+class Market(NamedTuple):
+    """Behaviour of the agents, shared by every pool."""
+
+    volatility: float = 0.3  # of log demand / supply, per sqrt(day)
+    half_life_days: float = 3.0  # mean reversion of the demand
+    shocks_per_year: float = 12.0
+    shock_min: float = 0.05  # price move of a shock, uniform in [min, max]
+    shock_max: float = 0.4
+    shock_demand: float = 2.0  # log borrow demand jump per unit of price move
+    shock_supply: float = 1.0  # log supply drop per unit of price move
+    borrow_elasticity: float = 5.0  # log borrow demand per unit of borrow rate above the reference
+    supply_elasticity: float = 3.0  # log supply per unit of supply rate above the reference
+    response_hours: float = 6.0  # time constant of the agents
+    heterogeneity: float = 0.3  # log normal spread of the pools size between scenarios
+
+
+# ----------- PI strategy (floats) -----------
+
+
+def normalized_error(utilization, optimal):
+    """`_getNormalizedError()`."""
+    err = utilization - optimal
+    return np.where(utilization < optimal, err / optimal, err / (1 - optimal))
+
+
+def transfer_function(controller_error, p):
+    """`transferFunctionReturnInt()`."""
+    ce = np.maximum(controller_error, p.min_controller_error)
+    return p.m_factor * ((ce + 1) / 2) ** p.n_factor
+
+
+def pi_update(err_i, utilization, dt, p):
+    """`_calculateInterestRates()`: `(errI, borrow rate, liquidity rate)` after one step."""
+    err = normalized_error(utilization, p.optimal_utilization_rate)
+    err_i = np.maximum(err_i + p.ki * err * dt, -p.ki * p.max_i_time_amp)
+    err_i = np.where(utilization == 0, 0.0, err_i)
+    borrow = np.where(utilization == 0, 0.0, transfer_function(p.kp * err + err_i, p))
+    return err_i, borrow, borrow * utilization * (1 - p.reserve_factor)
+
+
+def min_liquidity_rate(main_borrow_rate, main_liquidity_rate):
+    """Liquidity rate floor of a MiniPool with an outstanding flow."""
+    common_term = 1 + main_liquidity_rate * DELTA_TIME_MARGIN / SECONDS_PER_YEAR
+    compounded = np.exp(main_borrow_rate * DELTA_TIME_MARGIN / SECONDS_PER_YEAR)
+    return (compounded - common_term) / (common_term * DELTA_TIME_MARGIN / SECONDS_PER_YEAR)
+
+
+# ----------- simulation -----------
+
+
+def stack(pools):
+    """`PoolParams` of arrays, one column per pool (main pool first)."""
+    return PoolParams(*(np.array(values, dtype=float) for values in zip(*pools)))
+
+
+def simulate(pools, market, scenarios, days, step, seed):
+    """
+    Runs `scenarios` scenarios of `days` days. Returns per scenario metrics, arrays of shape
+    `(scenarios, pools)` (`(scenarios,)` for the main pool only ones).
+    """
+    rng = np.random.default_rng(seed)
+    p = stack(pools)
+    n, count = scenarios, len(pools)
+    dt, steps = float(step), int(days * 86400 // step)
+    dt_days = dt / 86400
+    theta = np.log(2) / market.half_life_days
+    response = 1 - np.exp(-dt / (market.response_hours * 3600))
+
+    size = np.exp(market.heterogeneity * rng.standard_normal((n, count)) - market.heterogeneity**2 / 2)
+    base_supply, base_demand = p.supply * size, p.demand * size
+    sensitivity = rng.uniform(0.5, 1.5, (n, count))  # of each pool to the shocks
+    # Rates at the optimal utilization, around which the agents are neutral.
+    ref_borrow = transfer_function(np.zeros(count), p)
+    ref_supply = ref_borrow * p.optimal_utilization_rate * (1 - p.reserve_factor)
+
+    supply = base_supply.copy()
+    debt = np.minimum(base_demand, supply)
+    flow = np.zeros((n, count))
+    err_i = np.zeros((n, count))
+    log_demand, log_supply = np.zeros((n, count)), np.zeros((n, count))
+    borrow_rate = np.tile(ref_borrow, (n, 1))
+    liquidity_rate = np.tile(ref_supply, (n, 1))
+
+    metrics = {
+        "maxUtilization": np.zeros((n, count)),
+        "spikeShare": np.zeros((n, count)),
+        "maxBorrowRate": np.zeros((n, count)),
+        "saturatedShare": np.zeros((n, count)),
+        "mainConstrainedShare": np.zeros((n, count)),
+        "maxFlowUse": np.zeros((n, count)),
+        "floorShare": np.zeros((n, count)),
+        "minMainAvailable": np.full(n, np.inf),
+    }
+
+    for _ in range(steps):
+        # exogenous demand: mean reverting noise plus correlated shocks.
+        shock = (rng.random(n) < market.shocks_per_year * dt / SECONDS_PER_YEAR) * rng.uniform(
+            market.shock_min, market.shock_max, n
+        )
+        shock = shock[:, None] * sensitivity
+        noise = market.volatility * np.sqrt(dt_days)
+        log_demand += -theta * dt_days * log_demand + noise * rng.standard_normal((n, count))
+        log_demand += market.shock_demand * shock
+        log_supply += -theta * dt_days * log_supply + noise * rng.standard_normal((n, count))
+        log_supply -= market.shock_supply * shock
+
+        # agents move toward rate dependent targets.
+        target_debt = base_demand * np.exp(log_demand - market.borrow_elasticity * (borrow_rate - ref_borrow))
+        target_supply = base_supply * np.exp(log_supply + market.supply_elasticity * (liquidity_rate - ref_supply))
+        wanted_debt = debt + response * (target_debt - debt)
+        wanted_supply = supply + response * (target_supply - supply)
+
+        # main pool: lent liquidity (users and flows) cannot be withdrawn.
+        flows = flow[:, 1:].sum(axis=1)
+        supply[:, 0] = np.maximum(wanted_supply[:, 0], debt[:, 0] + flows)
+        debt[:, 0] = np.minimum(wanted_debt[:, 0], supply[:, 0] - flows)
+        capacity = supply[:, 0] - debt[:, 0]
+
+        # MiniPools: flow borrow what their own liquidity does not cover.
+        limit = p.flow_limit[1:]
+        own_supply = wanted_supply[:, 1:]
+        needed = np.clip(wanted_debt[:, 1:] - own_supply, 0, limit)
+        total = needed.sum(axis=1)
+        scale = np.where(total > capacity, capacity / np.where(total > 0, total, 1), 1.0)
+        flow[:, 1:] = needed * scale[:, None]
+        debt[:, 1:] = np.minimum(wanted_debt[:, 1:], own_supply + flow[:, 1:])
+        supply[:, 1:] = np.maximum(own_supply, debt[:, 1:] - flow[:, 1:])
+
+        utilization = np.empty((n, count))
+        utilization[:, 0] = (debt[:, 0] + flow[:, 1:].sum(axis=1)) / supply[:, 0]
+        utilization[:, 1:] = debt[:, 1:] / (supply[:, 1:] + flow[:, 1:])
+        utilization = np.clip(np.nan_to_num(utilization), 0, 1)
+
+        err_i, borrow_rate, liquidity_rate = pi_update(err_i, utilization, dt, p)
+        floor = min_liquidity_rate(borrow_rate[:, :1], liquidity_rate[:, :1])
+        floored = (flow > 0) & (liquidity_rate < floor) & (utilization > 0)
+        floored[:, 0] = False
+        liquidity_rate = np.where(floored, floor, liquidity_rate)
+        borrow_rate = np.where(
+            floored, floor / np.maximum(utilization * (1 - p.reserve_factor), 1e-18), borrow_rate
+        )
+
+        metrics["maxUtilization"] = np.maximum(metrics["maxUtilization"], utilization)
+        metrics["spikeShare"] += utilization >= SPIKE_UTILIZATION
+        metrics["maxBorrowRate"] = np.maximum(metrics["maxBorrowRate"], borrow_rate)
+        metrics["saturatedShare"][:, 1:] += (wanted_debt[:, 1:] - own_supply) > limit
+        metrics["mainConstrainedShare"][:, 1:] += (scale < 1)[:, None] & (needed > 0)
+        metrics["maxFlowUse"][:, 1:] = np.maximum(
+            metrics["maxFlowUse"][:, 1:], flow[:, 1:] / np.where(limit > 0, limit, np.inf)
+        )
+        metrics["floorShare"] += floored
+        metrics["minMainAvailable"] = np.minimum(metrics["minMainAvailable"], capacity - flow[:, 1:].sum(axis=1))
+
+    for name in ["spikeShare", "saturatedShare", "mainConstrainedShare", "floorShare"]:
+        metrics[name] /= max(steps, 1)
+    return metrics
+
+
+def _run_chunk(args):
+    return simulate(*args)
+
+
+def run(pools, market, scenarios, days, step=3600, seed=0, chunk=1000, workers=None):
+    """Runs the scenarios in chunks over a process pool, returns the concatenated metrics."""
+    sizes = [min(chunk, scenarios - start) for start in range(0, scenarios, chunk)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    jobs = [(pools, market, size, days, step, s) for size, s in zip(sizes, seeds)]
+    if workers == 1 or len(jobs) == 1:
+        results = [_run_chunk(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_run_chunk, jobs))
+    return {name: np.concatenate([r[name] for r in results]) for name in results[0]}
+
+
+# ----------- report -----------
+
+QUANTILES = [0.5, 0.9, 0.99, 1.0]
+
+
+def summary(metrics):
+    """Distribution over scenarios of the main pool and MiniPools metrics (worst MiniPool per scenario)."""
+    rows = {
+        "main max utilization": metrics["maxUtilization"][:, 0],
+        "main time above {:.0%}".format(SPIKE_UTILIZATION): metrics["spikeShare"][:, 0],
+        "main max borrow rate": metrics["maxBorrowRate"][:, 0],
+        "main min available": metrics["minMainAvailable"],
+    }
+    if metrics["maxUtilization"].shape[1] > 1:
+        rows.update({
+            "minipool max utilization": metrics["maxUtilization"][:, 1:].max(axis=1),
+            "minipool time above {:.0%}".format(SPIKE_UTILIZATION): metrics["spikeShare"][:, 1:].max(axis=1),
+            "minipool max borrow rate": metrics["maxBorrowRate"][:, 1:].max(axis=1),
+            "minipool flow limit use": metrics["maxFlowUse"][:, 1:].max(axis=1),
+            "minipool time saturated": metrics["saturatedShare"][:, 1:].max(axis=1),
+            "minipool time main pool dry": metrics["mainConstrainedShare"][:, 1:].max(axis=1),
+            "minipool time rate floored": metrics["floorShare"][:, 1:].max(axis=1),
+        })
+    table = pd.DataFrame({name: np.quantile(values, QUANTILES) for name, values in rows.items()}).T
+    table.columns = ["p50", "p90", "p99", "max"]
+    if metrics["maxUtilization"].shape[1] > 1:
+        # share of the scenarios where a time share is not zero.
+        table["P(>0)"] = [np.mean(values > 0) if "time" in name else np.nan for name, values in rows.items()]
+    return table
+
+
+def load_config(path, minipools):
+    """`(pools, market)` from a JSON `{"main": {...}, "minipools": [{...}], "market": {...}}`."""
+    config = {}
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+    main = PoolParams(**config.get("main", {}))
+    default_minipool = PoolParams(supply=5.0, demand=3.0, flow_limit=2.0)
+    minis = [default_minipool._replace(**c) for c in config.get("minipools", [])]
+    minis += [default_minipool] * max(minipools - len(minis), 0)
+    return [main] + minis, Market(**config.get("market", {}))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Monte Carlo stress test of MiniPool flow limits under PI rates.")
+    parser.add_argument("--config", default=None, help="JSON with main / minipools / market parameters")
+    parser.add_argument("--minipools", type=int, default=4, help="MiniPools with default parameters (beyond the config ones)")
+    parser.add_argument(
+        "--flow-limit", type=lambda s: [float(v) for v in s.split(",")], default=None,
+        help="comma separated flow limits applied to every MiniPool, one run each",
+    )
+    parser.add_argument("--scenarios", type=int, default=2000)
+    parser.add_argument("--days", type=float, default=30.0)
+    parser.add_argument("--step", type=int, default=3600, help="seconds between two updates")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk", type=int, default=1000, help="scenarios per task")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--out", default=None, help="write the per scenario metrics to this CSV")
+    args = parser.parse_args(argv)
+
+    pools, market = load_config(args.config, args.minipools)
+    limits = args.flow_limit or [None]
+    frames = []
+    for limit in limits:
+        run_pools = pools if limit is None else [pools[0]] + [m._replace(flow_limit=limit) for m in pools[1:]]
+        metrics = run(run_pools, market, args.scenarios, args.days, args.step, args.seed, args.chunk, args.workers)
+        print("\n{} scenarios, {} days, {} MiniPools{}".format(
+            args.scenarios, args.days, len(pools) - 1, "" if limit is None else ", flow limit {:g}".format(limit)
+        ))
+        print(summary(metrics).to_string(float_format=lambda v: "{:.4g}".format(v), na_rep="-"))
+        if args.out:
+            frame = pd.DataFrame({"scenario": np.arange(args.scenarios), "flowLimit": limit})
+            for name, values in metrics.items():
+                if values.ndim == 1:
+                    frame[name] = values
+                else:
+                    for k in range(values.shape[1]):
+                        frame["{}{}".format(name, "Main" if k == 0 else k)] = values[:, k]
+            frames.append(frame)
+    if args.out:
+        pd.concat(frames, ignore_index=True).to_csv(args.out, index=False)
+        print("\nPer scenario metrics written to {}".format(os.path.abspath(args.out)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
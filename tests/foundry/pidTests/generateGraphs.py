@@ -3,12 +3,18 @@ import matplotlib.pyplot as plt
 import os
 # import pdb
 
+import pidCache
+
 log = False
+asset = "0xda10009cbd5d07dd0cecc66161fc93d7c9000da1"
+max_points = 5000 # min/max downsampling per asset, None to plot every row
 print(os.getcwd())
 if "pidTests" in os.getcwd():
     dir = os.getcwd() + "/data"
 else:
     dir = os.getcwd() + "/tests/foundry/pidTests/data"
+cache_dir = os.path.join(dir, pidCache.CACHE_DIR)
+manifest = pidCache.load_manifest(cache_dir)
 idx = 0
 
 # liquidities = []
@@ -18,35 +24,41 @@ timestamp = []
 names = []
 linestyles = ['-.', '--', ':']
 for root, dirs, filenames in os.walk(dir):
+    if pidCache.CACHE_DIR in dirs:
+        dirs.remove(pidCache.CACHE_DIR)
     for filename in filenames:
         
         if ".csv" in filename:
             names.append(filename.split(".")[0])
             print("Filename: {}".format(filename))
-            # Load the CSV file
+            # Load the CSV file (memory-mapped columnar copy, converted on first use)
             print(os.path.join(root, filename))
-            data = pd.read_csv(os.path.join(root, filename))
+            table, digest = pidCache.cached_table(os.path.join(root, filename), cache_dir, manifest)
+
+            # Skip the figure if neither the trace nor the plot settings changed
+            figure = dir + "/rates_over_time_{}.png".format(filename.split(".")[0])
+            key = pidCache.render_key(digest, asset, max_points, log)
+            if not pidCache.needs_render(manifest, figure, key):
+                print("Up to date: {}".format(figure))
+                continue
 
-            # Filter the data for the specified asset
-            asset_data = data[data["asset"] == "0xda10009cbd5d07dd0cecc66161fc93d7c9000da1"].copy()
+            # Keep only the specified asset (rates are in %)
+            asset_data = pidCache.select(table, assets=[asset], max_points=max_points)
 
-            # Convert the timestamp to datetime and the rates to float
+            # Convert the timestamp to datetime
             timestamp = pd.to_datetime(asset_data["timestamp"], unit="s")
             asset_data["timestamp"] = pd.to_datetime(asset_data["timestamp"], unit="s")
-            asset_data["currentVariableBorrowRate"] = asset_data["currentVariableBorrowRate"].astype(float)
-            asset_data["currentLiquidityRate"] = asset_data["currentLiquidityRate"].astype(float)
-            asset_data["utilizationRate"] = asset_data["utilizationRate"].astype(float)
-            # liquidities.append(asset_data["availableLiquidity"].astype(float))
-            # debts.append(asset_data["currentDebt"].astype(float))
-            # errI.append(asset_data["errI"].astype(float))
+            # liquidities.append(asset_data["availableLiquidity"])
+            # debts.append(asset_data["currentDebt"])
+            # errI.append(asset_data["errI"])
             
             # Create a figure with two subplots
             fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(10, 8), sharex=True)
 
             # Upper subplot: currentVariableBorrowRate and currentLiquidityRate
-            ax1.plot(asset_data["timestamp"], asset_data["currentVariableBorrowRate"] / 1e25, label="currentVariableBorrowRate")
-            ax1.plot(asset_data["timestamp"], asset_data["currentLiquidityRate"] / 1e25, color='red', label="currentLiquidityRate")
-            ax1.set_title("Rates over time for asset 0xda10009cbd5d07dd0cecc66161fc93d7c9000da1")
+            ax1.plot(asset_data["timestamp"], asset_data["currentVariableBorrowRate"], label="currentVariableBorrowRate")
+            ax1.plot(asset_data["timestamp"], asset_data["currentLiquidityRate"], color='red', label="currentLiquidityRate")
+            ax1.set_title("Rates over time for asset {}".format(asset))
             ax1.set_ylabel("Rates (in %)")
             if log : 
                 ax1.set_yscale('log')  # Set y-axis to log scale
@@ -54,7 +66,7 @@ for root, dirs, filenames in os.walk(dir):
             ax1.grid(True)
 
             # Lower subplot: utilizationRate
-            ax2.plot(asset_data["timestamp"], asset_data["utilizationRate"] / 1e25, color='green', label="utilizationRate")
+            ax2.plot(asset_data["timestamp"], asset_data["utilizationRate"], color='green', label="utilizationRate")
             ax2.set_xlabel("Timestamp")
             ax2.set_ylabel("Utilization Rate (in %)")
             if log : 
@@ -64,7 +76,10 @@ for root, dirs, filenames in os.walk(dir):
 
             plt.tight_layout()
             
-            plt.savefig(dir + "/rates_over_time_{}.png".format(filename.split(".")[0]))
+            plt.savefig(figure)
+            plt.close(fig)
+            pidCache.mark_rendered(manifest, figure, key)
+            pidCache.save_manifest(cache_dir, manifest)
             idx+=1
             # print("LIQUIDITIES: ", liquidities)
         
@@ -107,3 +122,6 @@ fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(10, 8), sharex=True)
 plt.tight_layout()
 
 plt.savefig(dir + "/liquiditiesAndDebts.png".format(filename.split(".")[0]))
+
+pidCache.prune(cache_dir, manifest)
+pidCache.save_manifest(cache_dir, manifest)
@@ -0,0 +1,236 @@
+"""
+Interest index accrual model: how far the on-chain indexes drift from exact compounding.
+
+`ReserveLogic._updateIndexes()` multiplies the liquidity index by
+`MathUtils.calculateLinearInterest()` and the variable borrow index by the truncated binomial
+`MathUtils.calculateCompoundedInterest()`, at every reserve update. Both are replicated here
+with the `WadRayMath` rounding (object arrays of exact ints) and compared with exact per second
+compounding of the same rates, `prod (1 + rate / SECONDS_PER_YEAR) ^ dt`.
+
+A rate trace (e.g. the `output.csv` written by `testPid()`) gives the stored rates of the
+strategy after each operation; each rate holds until the next row. `testPid()` logs the rates
+of the DAI strategy on every row whatever the operation asset, so only the rows of the
+strategy asset (the reserve updates of that strategy) are kept, like `piSimulation.load_trace()`.
+The reserve is updated at every row and, for each cadence, also every `cadence` seconds in
+between (keeper pokes). A PI strategy recomputes `_errI` and its rates at every update, so the
+rates of a poke are re-derived with `piSimulation.update()` / `current_rates()` from the logged
+`errI` of the previous row, its utilization held until the next row (`--hold-rates` keeps the
+logged rates instead, for a strategy whose rates only depend on the utilization). The factors
+of all intervals are computed at once, the index chain is accumulated with a ufunc over the
+exact `rayMul`, and the exact reference is accumulated in the log domain.
+
+cmd :: python3 tests/foundry/pidTests/indexAccrual.py tests/foundry/pidTests/data/output.csv \
+           --cadence native,1h,1d,7d --horizon-days 365
+"""
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+
+from piSimulation import DAI, RAY, PiParams, PiState, as_int_array, batch_params, current_rates, ray_mul, update
+from pidData import find_traces, read_trace
+
+SECONDS_PER_YEAR = 365 * 24 * 3600
+UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 7 * 86400}
+
+_ray_mul_ufunc = np.frompyfunc(ray_mul, 2, 1)
+
+
+def linear_interest(rates, dts):
+    """`MathUtils.calculateLinearInterest()` for arrays of rates and time deltas."""
+    return RAY + as_int_array(rates) * as_int_array(dts) // SECONDS_PER_YEAR
+
+
+def compounded_interest(rates, dts):
+    """`MathUtils.calculateCompoundedInterest()` (3 terms binomial) for arrays of rates and deltas."""
+    rates, exp = as_int_array(rates), as_int_array(dts)
+    exp_minus_one = np.where(exp > 0, exp - 1, 0)
+    exp_minus_two = np.where(exp > 2, exp - 2, 0)
+    base_power_two = ray_mul(rates, rates) // (SECONDS_PER_YEAR * SECONDS_PER_YEAR)
+    base_power_three = ray_mul(base_power_two, rates) // SECONDS_PER_YEAR
+    second_term = exp * exp_minus_one * base_power_two // 2
+    third_term = exp * exp_minus_one * exp_minus_two * base_power_three // 6
+    return np.where(
+        exp == 0, RAY, RAY + rates * exp // SECONDS_PER_YEAR + second_term + third_term
+    )
+
+
+def accrue(factors, start=RAY):
+    """Index after each interval: `index = factor.rayMul(index)`, rounding at every update."""
+    chain = np.empty(len(factors) + 1, dtype=object)
+    chain[0] = start
+    chain[1:] = factors
+    return _ray_mul_ufunc.accumulate(chain)[1:]
+
+
+def ray_to_longdouble(values):
+    """Ray ints as `np.longdouble` fractions, converted from the ints (not through a float)."""
+    return np.array([np.longdouble(int(v)) for v in values], dtype=np.longdouble) / np.longdouble(RAY)
+
+
+def exact_growth(rates, dts):
+    """
+    Exact per second compounding of each interval, cumulated in the log domain with extended
+    precision floats (`np.longdouble`), far below the errors being measured.
+    """
+    per_second = ray_to_longdouble(rates) / SECONDS_PER_YEAR
+    return np.exp(np.cumsum(np.log1p(per_second) * np.asarray(dts, dtype=np.longdouble)))
+
+
+def parse_cadence(spec):
+    """`native`, `3600`, `1h`, `7d`... -> seconds (`None` for native)."""
+    spec = spec.strip()
+    if spec == "native":
+        return None
+    if spec[-1] in UNITS:
+        return int(float(spec[:-1]) * UNITS[spec[-1]])
+    return int(spec)
+
+
+def update_points(timestamps, cadence=None, end=None):
+    """Update timestamps: every row, plus every `cadence` seconds, up to `end`."""
+    end = int(timestamps[-1]) if end is None else end
+    points = np.asarray(timestamps, dtype=np.int64)
+    if cadence:
+        points = np.union1d(points, np.arange(points[0], end + 1, cadence, dtype=np.int64))
+    if end > points[-1]:
+        points = np.append(points, end)
+    return np.unique(points[points <= end])
+
+
+def intervals(timestamps, cadence=None, end=None, with_points=False):
+    """
+    `(row index of the rate in effect, dt)` of every interval between two updates, and the
+    update timestamps starting them with `with_points`.
+    """
+    points = update_points(timestamps, cadence, end)
+    rows = np.searchsorted(np.asarray(timestamps, dtype=np.int64), points[:-1], side="right") - 1
+    if with_points:
+        return rows, np.diff(points), points[:-1]
+    return rows, np.diff(points)
+
+
+def poke_rates(data, rows, starts, params):
+    """
+    `(liquidity rates, borrow rates)` of every interval when the PI strategy is updated at each
+    start: the logged rates at the trace rows and, at the pokes in between, the rates of
+    `_calculateInterestRates()` from the state left by the previous update, at the utilization
+    of the previous row (no rates without borrowers).
+    """
+    params = batch_params(params)
+    liquidity = data["currentLiquidityRate"].to_numpy()[rows].astype(object)
+    borrow = data["currentVariableBorrowRate"].to_numpy()[rows].astype(object)
+    timestamps = data["timestamp"].to_numpy()
+    err_i, utilization = data["errI"].to_numpy(), data["utilizationRate"].to_numpy()
+    state = None
+    for k, (row, start) in enumerate(zip(rows, starts)):
+        if start == timestamps[row]:
+            state = PiState(as_int_array(int(err_i[row]), 1), as_int_array(int(start), 1))
+            continue
+        rate = int(utilization[row])
+        state = update(state, int(start), rate, params)
+        if rate == 0:
+            liquidity[k], borrow[k] = 0, 0
+        else:
+            new_liquidity, new_borrow = current_rates(state, rate, params)
+            liquidity[k], borrow[k] = new_liquidity[0], new_borrow[0]
+    return liquidity, borrow
+
+
+def accrual_error(data, cadence=None, end=None, params=None):
+    """
+    Accrues both indexes of one asset trace at the given cadence, returns the error metrics:
+    relative error (model / exact - 1) of the final index and its worst value over the path.
+    With `params` (`PiParams`), the rates of the pokes are re-derived by `poke_rates()`,
+    otherwise the logged rates hold until the next row.
+    """
+    rows, dts, starts = intervals(data["timestamp"].to_numpy(), cadence, end, with_points=True)
+    if params is None:
+        rates = {c: data[c].to_numpy()[rows] for c in ["currentLiquidityRate", "currentVariableBorrowRate"]}
+    else:
+        liquidity, borrow = poke_rates(data, rows, starts, params)
+        rates = {"currentLiquidityRate": liquidity, "currentVariableBorrowRate": borrow}
+    # no debt -> the borrow index is not updated on chain.
+    has_debt = np.ones(len(data), dtype=bool)
+    if "utilizationRate" in data:
+        has_debt = np.array([u != 0 for u in data["utilizationRate"]], dtype=bool)
+    dts_borrow = np.where(has_debt[rows], dts, 0)
+
+    result = {"updates": len(dts), "days": float(dts.sum()) / 86400}
+    for name, column, interest, dt in [
+        ("liquidity", "currentLiquidityRate", linear_interest, dts),
+        ("borrow", "currentVariableBorrowRate", compounded_interest, dts_borrow),
+    ]:
+        column_rates = as_int_array(rates[column])
+        model = accrue(interest(column_rates, dt)) if len(column_rates) else np.array([RAY], dtype=object)
+        exact = exact_growth(column_rates, dt) if len(column_rates) else np.ones(1)
+        error = ray_to_longdouble(model) / exact - 1
+        result[name + "Index"] = model[-1]
+        result[name + "Error"] = float(error[-1])
+        result[name + "MaxError"] = float(error[np.argmax(np.abs(error))])
+    return result
+
+
+def report(paths, cadences, asset=DAI, horizon_days=None, params=PiParams(), log=print):
+    """
+    Error metrics of the `asset` strategy for every trace / cadence, the rates of the pokes
+    re-derived with the PI `params` (held when `None`).
+    """
+    rows = []
+    for path in find_traces(paths):
+        data = read_trace(path, [asset], rays="exact")
+        if data.empty:
+            log("{}: no row for {}, skipped".format(path, asset))
+            continue
+        data = data.sort_values("timestamp", kind="stable").reset_index(drop=True)
+        trace_params = params
+        if params is not None and not {"errI", "utilizationRate"} <= set(data):
+            log("{}: no errI / utilizationRate columns, rates held between rows".format(path))
+            trace_params = None
+        end = int(data["timestamp"].iloc[-1])
+        if horizon_days:
+            end = max(end, int(data["timestamp"].iloc[0]) + int(horizon_days * 86400))
+        for cadence in cadences:
+            metrics = accrual_error(data, cadence, end, trace_params)
+            rows.append({
+                "trace": path,
+                "asset": asset.lower(),
+                "cadence": cadence or "native",
+                "pokeRates": "held" if trace_params is None else "pi",
+                **metrics,
+            })
+    return pd.DataFrame(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Index accrual error against exact compounding.")
+    parser.add_argument("traces", nargs="+", help="rate traces (CSV) or directories of them")
+    parser.add_argument(
+        "--cadence", type=lambda s: [parse_cadence(c) for c in s.split(",")], default=[None],
+        help="comma separated update cadences: native (trace rows only), 600, 1h, 1d, 1w...",
+    )
+    parser.add_argument("--asset", default=DAI, help="asset of the strategy whose rates the trace logs")
+    parser.add_argument("--horizon-days", type=float, default=None, help="accrue up to this horizon after the last row")
+    parser.add_argument(
+        "--hold-rates", action="store_true",
+        help="keep the logged rates between rows instead of re-deriving the PI rates at every poke",
+    )
+    parser.add_argument("--out", default=None, help="also write the results to this CSV")
+    args = parser.parse_args(argv)
+
+    results = report(args.traces, args.cadence, args.asset, args.horizon_days, None if args.hold_rates else PiParams())
+    if results.empty:
+        print("No trace found.")
+        return 1
+    if args.out:
+        results.to_csv(args.out, index=False)
+    display = results.drop(columns=["liquidityIndex", "borrowIndex"])
+    for column in [c for c in display if c.endswith("Error")]:
+        display[column] = display[column].map(lambda v: "{:+.3e}".format(v))
+    print(display.to_string(index=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
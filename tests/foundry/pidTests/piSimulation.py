@@ -0,0 +1,295 @@
+"""
+Offline replica of `BasePiReserveRateStrategy` for tuning the PI controller without Foundry.
+
+Every function below mirrors its Solidity counterpart with exact integer ray math (numpy
+object arrays of Python ints, so values never leave int256 precision). A simulation runs
+one utilization trace for a whole batch of parameter sets at once: the loop is over time,
+every step is an array operation over the parameter sets.
+
+cmd :: python3 tests/foundry/pidTests/piSimulation.py tests/foundry/pidTests/data/output.csv
+"""
+import argparse
+import sys
+from decimal import Decimal
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from pidData import read_trace
+
+# WadRayMath / PercentageMath constants.
+RAY = 10**27
+HALF_RAY = RAY // 2
+PERCENTAGE_FACTOR = 10**4
+HALF_PERCENT = PERCENTAGE_FACTOR // 2
+
+# BasePiReserveRateStrategy constants.
+M_FACTOR = 20 * 10**25
+N_FACTOR = 2
+
+DAI = "0xda10009cbd5d07dd0cecc66161fc93d7c9000da1"
+
+
+class PiParams(NamedTuple):
+    """
+    Constructor arguments of `PiReserveInterestRateStrategy` plus the contract constants.
+    Each field is either an int (shared by every set) or a sequence of ints (one per set).
+    Defaults are the values deployed in `PidReserveInterestRateStrategyTest.setUp()`.
+    """
+
+    min_controller_error: object = -400 * 10**24
+    max_i_time_amp: object = 20 * 24 * 3600
+    optimal_utilization_rate: object = 45 * 10**25
+    kp: object = 10**27
+    ki: object = 13 * 10**19
+    m_factor: object = M_FACTOR
+    n_factor: object = N_FACTOR
+    reserve_factor: object = 1500
+
+
+class PiState(NamedTuple):
+    """Mutable storage of the strategy (`_errI`, `_lastTimestamp`), one entry per set."""
+
+    err_i: np.ndarray
+    last_timestamp: np.ndarray
+
+
+# ----------- ray math -----------
+
+
+def as_int_array(x, size=None):
+    """Converts an int or a sequence of ints to an object array of Python ints."""
+    arr = np.asarray(x, dtype=object)
+    if size is not None:
+        arr = np.broadcast_to(arr, (size,)).copy()
+    return arr
+
+
+def ray_mul(a, b):
+    """`WadRayMath.rayMul()` for non negative operands."""
+    return (a * b + HALF_RAY) // RAY
+
+
+def ray_div(a, b):
+    """`WadRayMath.rayDiv()` for non negative operands."""
+    return (a * RAY + b // 2) // b
+
+
+def percent_mul(value, percentage):
+    """`PercentageMath.percentMul()`."""
+    return (value * percentage + HALF_PERCENT) // PERCENTAGE_FACTOR
+
+
+def sdiv(a, b):
+    """Signed division rounding toward zero like the EVM (Python `//` floors)."""
+    a, b = as_int_array(a), as_int_array(b)
+    q = abs(a) // abs(b)
+    return np.where((a < 0) != (b < 0), -q, q)
+
+
+def ray_mul_int(a, b):
+    """`WadRayMath.rayMulInt()`: rounds half away from zero."""
+    raw = as_int_array(a) * as_int_array(b)
+    return np.where(raw < 0, -((HALF_RAY - raw) // RAY), (raw + HALF_RAY) // RAY)
+
+
+def ray_div_int(a, b):
+    """`WadRayMath.rayDivInt()`: rounds half away from zero."""
+    a, b = as_int_array(a), as_int_array(b)
+    half_b = sdiv(b, 2)
+    same_sign = ((a >= 0) & (b > 0)) | ((a <= 0) & (b < 0))
+    return np.where(same_sign, sdiv(a * RAY + half_b, b), sdiv(a * RAY - half_b, b))
+
+
+def ray_power_int(base, exponent):
+    """`WadRayMath.rayPowerInt()` with a (possibly per set) integer exponent."""
+    exponent = np.asarray(exponent)
+    result = np.where(exponent == 0, RAY, base)
+    for i in range(1, int(np.max(exponent))):
+        result = np.where(i < exponent, ray_mul_int(result, base), result)
+    return result
+
+
+# ----------- strategy -----------
+
+
+def max_err_i_amp(params):
+    """`_maxErrIAmp` as set by the constructor and `setPidValues()`."""
+    return ray_mul_int(params.ki, -RAY * params.max_i_time_amp)
+
+
+def normalized_error(utilization_rate, params):
+    """`_getNormalizedError()`."""
+    u0 = params.optimal_utilization_rate
+    err = utilization_rate - u0
+    return np.where(
+        utilization_rate < u0, ray_div_int(err, u0), ray_div_int(err, RAY - u0)
+    )
+
+
+def transfer_function(controller_error, params):
+    """`transferFunctionReturnInt()`."""
+    ce = np.where(
+        controller_error > params.min_controller_error,
+        controller_error,
+        params.min_controller_error,
+    )
+    return ray_mul_int(
+        params.m_factor, ray_power_int(ray_div_int(ce + RAY, 2 * RAY), params.n_factor)
+    )
+
+
+def liquidity_rate(variable_borrow_rate, utilization_rate, params):
+    """`_getLiquidityRate()`."""
+    return percent_mul(
+        ray_mul(variable_borrow_rate, utilization_rate),
+        PERCENTAGE_FACTOR - params.reserve_factor,
+    )
+
+
+def batch_params(params):
+    """Broadcasts every field of `params` to object arrays of exact ints of the same length."""
+    fields = [np.asarray(v, dtype=object) for v in params]
+    if any(f.ndim > 1 for f in fields):
+        raise ValueError("parameter fields must be ints or flat sequences")
+    fields = [as_int_array([parse_int(x) for x in f.reshape(-1)]) for f in fields]
+    size = max(f.size for f in fields)
+    if any(f.size not in (1, size) for f in fields):
+        raise ValueError("parameter sets must all have the same length")
+    return PiParams(*(as_int_array(f, size) for f in fields))
+
+
+def initial_state(params, start_timestamp):
+    size = len(params.kp)
+    return PiState(as_int_array(0, size), as_int_array(start_timestamp, size))
+
+
+def update(state, timestamp, utilization_rate, params, err=None):
+    """
+    State update of `_calculateInterestRates()` for one utilization rate (`_errI` accumulation,
+    `_maxErrIAmp` clamp and the reset when there are no borrowers).
+    """
+    if utilization_rate == 0:
+        return PiState(np.zeros_like(state.err_i), as_int_array(timestamp, len(state.err_i)))
+    if err is None:
+        err = normalized_error(utilization_rate, params)
+    err_i = state.err_i + ray_mul_int(params.ki, err * (timestamp - state.last_timestamp))
+    err_i = np.maximum(err_i, max_err_i_amp(params))
+    return PiState(err_i, as_int_array(timestamp, len(err_i)))
+
+
+def current_rates(state, utilization_rate, params, err=None):
+    """
+    `getCurrentInterestRates()`: rates for the current utilization and stored `_errI`.
+    Returns `(currentLiquidityRate, currentVariableBorrowRate)`.
+    """
+    if err is None:
+        err = normalized_error(utilization_rate, params)
+    borrow_rate = transfer_function(ray_mul_int(params.kp, err) + state.err_i, params)
+    return liquidity_rate(borrow_rate, utilization_rate, params), borrow_rate
+
+
+def simulate(timestamps, utilization_rates, params, updates=None, start_timestamp=None):
+    """
+    Replays a utilization trace through every parameter set of `params`.
+
+    At each row the strategy state is updated when `updates[i]` is true (an operation hit the
+    strategy asset) and the rates are then read like the Foundry test does through
+    `getCurrentInterestRates()`. `start_timestamp` is the deployment timestamp of the strategy
+    (defaults to the first row).
+
+    Returns a dict of `(nb sets, nb rows)` object arrays: `currentLiquidityRate`,
+    `currentVariableBorrowRate` and `errI`.
+    """
+    params = batch_params(params)
+    timestamps, utilization_rates = np.asarray(timestamps), np.asarray(utilization_rates)
+    size, length = len(params.kp), len(timestamps)
+    updates = np.ones(length, dtype=bool) if updates is None else np.asarray(updates)
+    if start_timestamp is None:
+        start_timestamp = int(timestamps[0]) if length else 0
+
+    state = initial_state(params, start_timestamp)
+    out = {
+        "currentLiquidityRate": np.empty((size, length), dtype=object),
+        "currentVariableBorrowRate": np.empty((size, length), dtype=object),
+        "errI": np.empty((size, length), dtype=object),
+    }
+    for i in range(length):
+        timestamp, utilization = int(timestamps[i]), int(utilization_rates[i])
+        err = normalized_error(utilization, params)
+        if updates[i]:
+            state = update(state, timestamp, utilization, params, err)
+        liquidity, borrow = current_rates(state, utilization, params, err)
+        out["currentLiquidityRate"][:, i] = liquidity
+        out["currentVariableBorrowRate"][:, i] = borrow
+        out["errI"][:, i] = state.err_i
+    return out
+
+
+# ----------- io -----------
+
+
+def parse_int(value):
+    """Parses Solidity style literals (`13e19`, `-400e24`, `1_000`) into exact ints."""
+    number = Decimal(str(value).replace("_", ""))
+    if number != number.to_integral_value():
+        raise ValueError(f"{value} is not an integer")
+    return int(number)
+
+
+def load_trace(path, asset=DAI):
+    """
+    Reads a `testPid()` CSV keeping the ray columns as exact ints.
+    Rows whose `asset` is the strategy asset are flagged in the `update` column (every row of a
+    trace without `asset` column).
+    """
+    data = read_trace(path, rays="exact")
+    if "asset" in data:
+        data["update"] = (data["asset"] == asset.lower()).to_numpy()
+    else:
+        data["update"] = np.ones(len(data), dtype=bool)
+    return data
+
+
+def compare(trace, result, set_index=0):
+    """Returns the rows of `trace` where the simulated rates (and `errI`) differ from the logged ones."""
+    mismatches = pd.Series(False, index=trace.index)
+    for column in ["currentLiquidityRate", "currentVariableBorrowRate", "errI"]:
+        if column in trace:
+            mismatches |= trace[column].to_numpy() != result[column][set_index]
+    return trace[mismatches.to_numpy()]
+
+
+def main(argv=None):
+    defaults = PiParams()
+    parser = argparse.ArgumentParser(description="Replays a testPid() trace offline.")
+    parser.add_argument("csv", help="output.csv written by testPid()")
+    parser.add_argument("--asset", default=DAI)
+    parser.add_argument("--start-timestamp", type=int, default=None)
+    for field in PiParams._fields:
+        parser.add_argument(
+            "--" + field.replace("_", "-"), type=parse_int, default=getattr(defaults, field)
+        )
+    args = parser.parse_args(argv)
+
+    params = PiParams(*(getattr(args, field) for field in PiParams._fields))
+    trace = load_trace(args.csv, args.asset)
+    result = simulate(
+        trace["timestamp"].to_numpy(),
+        trace["utilizationRate"].to_numpy(),
+        params,
+        trace["update"].to_numpy(),
+        args.start_timestamp,
+    )
+    mismatches = compare(trace, result)
+    if len(mismatches):
+        print(f"{len(mismatches)}/{len(trace)} rows differ, first ones:")
+        print(mismatches.head().to_string())
+        return 1
+    print(f"{len(trace)} rows match bit for bit.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+"""
+Columnar cache of the pid traces.
+
+The first time a CSV is seen it is streamed (`pidData.iter_trace`) into an Arrow IPC file in
+`<data>/.cache/`; later reads memory-map that file instead of parsing the CSV again. Entries
+are keyed by the CSV content hash, with the (mtime, size) pair as a shortcut to skip hashing
+files that did not change. The manifest also records which inputs each figure was rendered
+from, so `generateGraphs.py` only re-renders the figures whose inputs changed.
+"""
+import hashlib
+import json
+import os
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from pidData import (
+    AMOUNT_COLUMNS,
+    RAY_COLUMNS,
+    bin_width,
+    downsample_chunks,
+    downsample_minmax,
+    iter_trace,
+    trace_columns,
+)
+
+CACHE_DIR = ".cache"
+MANIFEST = "manifest.json"
+FORMAT_VERSION = 1
+
+_TYPES = {"timestamp": pa.int64(), "user": pa.string(), "action": pa.uint8(), "asset": pa.string()}
+
+
+def file_digest(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_manifest(cache_dir):
+    path = os.path.join(cache_dir, MANIFEST)
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") == FORMAT_VERSION:
+            return manifest
+    return {"version": FORMAT_VERSION, "traces": {}, "figures": {}}
+
+
+def save_manifest(cache_dir, manifest):
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, MANIFEST)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def _schema(path):
+    key_columns, value_columns = trace_columns(path)
+    return pa.schema(
+        [(c, _TYPES[c]) for c in key_columns] + [(c, pa.float64()) for c in value_columns]
+    )
+
+
+def _build(csv_path, arrow_path):
+    """Streams the CSV into an Arrow IPC file, one record batch per chunk."""
+    schema = _schema(csv_path)
+    try:
+        with pa.OSFile(arrow_path + ".tmp", "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+            for chunk in iter_trace(csv_path, rays="percent"):
+                for column in ["user", "asset"]:
+                    if column in chunk:
+                        chunk[column] = chunk[column].astype(str)
+                writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+    except BaseException:
+        if os.path.exists(arrow_path + ".tmp"):
+            os.remove(arrow_path + ".tmp")
+        raise
+    os.replace(arrow_path + ".tmp", arrow_path)
+
+
+def cached_table(csv_path, cache_dir, manifest):
+    """
+    Returns `(table, digest)`: the memory-mapped Arrow table of `csv_path` and the CSV content
+    hash, converting the CSV first if it is new or changed.
+    """
+    key = os.path.abspath(csv_path)
+    stat = os.stat(csv_path)
+    entry = manifest["traces"].get(key)
+
+    fresh = (
+        entry is not None
+        and os.path.exists(entry["arrow"])
+        and (entry["mtime"], entry["size"]) == (stat.st_mtime_ns, stat.st_size)
+    )
+    if not fresh:
+        digest = file_digest(csv_path)
+        if entry is None or entry["digest"] != digest or not os.path.exists(entry["arrow"]):
+            os.makedirs(cache_dir, exist_ok=True)
+            arrow_path = os.path.join(cache_dir, digest + ".arrow")
+            if not os.path.exists(arrow_path):
+                print("Caching {}".format(csv_path))
+                _build(csv_path, arrow_path)
+            entry = {"digest": digest, "arrow": arrow_path}
+        entry.update(mtime=stat.st_mtime_ns, size=stat.st_size)
+        manifest["traces"][key] = entry
+
+    table = pa.ipc.open_file(pa.memory_map(entry["arrow"], "r")).read_all()
+    return table, entry["digest"]
+
+
+def iter_batches(table, assets=None):
+    """Yields the record batches of a cached table as DataFrames, filtered on `assets`."""
+    value_set = None if assets is None else pa.array([a.lower() for a in assets])
+    for batch in table.to_batches():
+        if value_set is not None and "asset" in batch.schema.names:
+            batch = batch.filter(pc.is_in(batch.column("asset"), value_set=value_set))
+        if batch.num_rows:
+            yield batch.to_pandas(strings_to_categorical=True)
+
+
+def select(table, assets=None, max_points=None):
+    """
+    Filters a cached table on `assets` and downsamples it like `pidData.read_trace()`, one
+    record batch at a time, so only the reduced rows are held in memory.
+    """
+    bin_seconds = None
+    if max_points and table.num_rows:
+        span = pc.min_max(table["timestamp"])
+        bin_seconds = bin_width(span["min"].as_py(), span["max"].as_py(), max_points)
+    columns = [c for c in RAY_COLUMNS + AMOUNT_COLUMNS if c in table.column_names]
+    chunks = (
+        downsample_minmax(chunk, bin_seconds, columns).reset_index(drop=True) for chunk in iter_batches(table, assets)
+    )
+    return downsample_chunks(chunks, bin_seconds, columns)
+
+
+def load_trace(csv_path, cache_dir, manifest, assets=None, max_points=None):
+    """
+    Cached equivalent of `pidData.read_trace(csv_path, assets, "percent", max_points)`.
+    Returns `(data, digest)`.
+    """
+    table, digest = cached_table(csv_path, cache_dir, manifest)
+    return select(table, assets, max_points), digest
+
+
+def render_key(*inputs):
+    """Identifies the inputs (trace digests, plot settings) a figure is rendered from."""
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def needs_render(manifest, figure_path, key):
+    return not os.path.exists(figure_path) or manifest["figures"].get(os.path.abspath(figure_path)) != key
+
+
+def mark_rendered(manifest, figure_path, key):
+    manifest["figures"][os.path.abspath(figure_path)] = key
+
+
+def prune(cache_dir, manifest):
+    """Deletes the cached files no manifest entry points to anymore."""
+    manifest["traces"] = {k: e for k, e in manifest["traces"].items() if os.path.exists(k)}
+    used = {os.path.basename(e["arrow"]) for e in manifest["traces"].values()}
+    for filename in os.listdir(cache_dir) if os.path.isdir(cache_dir) else []:
+        if filename.endswith(".arrow") and filename not in used:
+            os.remove(os.path.join(cache_dir, filename))
@@ -0,0 +1,201 @@
+"""
+Comparative dashboard of several pid runs (e.g. tuning candidates) in one pass.
+
+Every run (CSV trace) is loaded once through the columnar cache, downsampled, and aligned on a
+common index of seconds elapsed since the first row of the run (whatever its asset). Each
+strategy gets one figure with the borrow rate, liquidity rate, utilization and errI of every run
+overlaid. `testPid()` logs the DAI strategy on every row whatever the operation asset, so a
+trace is restricted to the rows of the strategy assets (`--asset`, DAI by default; traces from
+`eventIndexer.py` hold one strategy per asset). Figures are rendered in parallel worker
+processes with the non-interactive Agg backend and gathered in a single self-contained HTML
+report (PNGs embedded), next to the PNG files themselves.
+
+cmd :: python3 tests/foundry/pidTests/pidDashboard.py tests/foundry/pidTests/data --out report
+"""
+import argparse
+import base64
+import html
+import io
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import pyarrow.compute as pc
+
+import pidCache
+from piSimulation import DAI
+from pidData import find_traces
+
+PANELS = [
+    ("currentVariableBorrowRate", "Borrow rate (in %)"),
+    ("currentLiquidityRate", "Liquidity rate (in %)"),
+    ("utilizationRate", "Utilization rate (in %)"),
+    ("errI", "errI (controller error, ray / 1e27)"),
+]
+LINESTYLES = ["-", "--", "-.", ":"]
+
+
+def run_name(path, root):
+    """Run label: the CSV path relative to the common root, without extension."""
+    return os.path.splitext(os.path.relpath(path, root))[0]
+
+
+def load_runs(files, cache_dir, assets=(DAI,), max_points=None):
+    """
+    Loads the rows of the `assets` strategies of every run once, returns `{run name: data}`
+    with an `elapsed` column (seconds since the first row of the trace).
+    """
+    manifest = pidCache.load_manifest(cache_dir)
+    root = os.path.commonpath([os.path.dirname(os.path.abspath(f)) for f in files])
+    runs = {}
+    for file in files:
+        table, _ = pidCache.cached_table(file, cache_dir, manifest)
+        data = pidCache.select(table, assets, max_points)
+        if data.empty:
+            continue
+        data["elapsed"] = data["timestamp"] - pc.min(table["timestamp"]).as_py()
+        if "errI" in data:
+            # read as a percentage of RAY like the rates, errI is a (signed) controller error.
+            data["errI"] = data["errI"] / 100
+        runs[run_name(os.path.abspath(file), root)] = data
+    pidCache.save_manifest(cache_dir, manifest)
+    return runs
+
+
+def align(runs, asset, column):
+    """
+    One column of every run for the `asset` strategy, on the union of their elapsed times. Values are held
+    between two rows (the rates are step functions) and left empty past the end of a run.
+    """
+    series = {}
+    for name, data in runs.items():
+        if column not in data:
+            continue
+        rows = data[data["asset"] == asset]
+        if rows.empty or rows[column].isna().all():
+            continue
+        series[name] = rows.groupby("elapsed")[column].last()
+    if not series:
+        return pd.DataFrame()
+    aligned = pd.concat(series, axis=1).sort_index().ffill()
+    for name, values in series.items():
+        aligned.loc[aligned.index > values.index.max(), name] = float("nan")
+    return aligned
+
+
+def render(asset, panels, styles, log=False):
+    """
+    Renders the figure of one strategy (run in a worker process), returns the PNG bytes.
+    `styles` maps each run to its `(color, linestyle)` so a run looks the same in every panel.
+    """
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    fig, axes = plt.subplots(len(panels), 1, figsize=(12, 3 * len(panels)), sharex=True, squeeze=False)
+    for ax, (label, aligned) in zip(axes[:, 0], panels):
+        days = aligned.index / 86400
+        for name in aligned.columns:
+            color, linestyle = styles[name]
+            ax.step(days, aligned[name], where="post", label=name, color=color, linestyle=linestyle)
+        ax.set_ylabel(label)
+        if log:
+            ax.set_yscale("log")
+        ax.grid(True)
+    axes[0, 0].set_title("Runs comparison for the {} strategy".format(asset))
+    for ax in axes[:, 0]:
+        ax.legend(fontsize="small", ncol=2)
+    axes[-1, 0].set_xlabel("Days since the start of the run")
+    fig.tight_layout()
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", dpi=100)
+    plt.close(fig)
+    return buffer.getvalue()
+
+
+def summary(runs):
+    """Per run and strategy statistics shown on top of the report."""
+    rows = []
+    for name, data in runs.items():
+        for asset, rows_asset in data.groupby("asset", observed=True):
+            row = {"run": name, "strategy": asset}
+            for column, _ in PANELS[:3]:
+                row["mean " + column] = rows_asset[column].mean()
+                row["max " + column] = rows_asset[column].max()
+            rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def build_report(runs, out_dir, workers=None, log=False):
+    """Renders every strategy figure in parallel, writes the PNGs and `report.html` in `out_dir`."""
+    os.makedirs(out_dir, exist_ok=True)
+    assets = sorted({a for data in runs.values() for a in data["asset"].unique()})
+    styles = {
+        name: ("C{}".format(idx % 10), LINESTYLES[(idx // 10) % len(LINESTYLES)])
+        for idx, name in enumerate(runs)
+    }
+
+    jobs = {}
+    for asset in assets:
+        panels = [(label, align(runs, asset, column)) for column, label in PANELS]
+        panels = [(label, aligned) for label, aligned in panels if not aligned.empty]
+        if panels:
+            jobs[asset] = panels
+
+    with ProcessPoolExecutor(workers) as pool:
+        futures = {asset: pool.submit(render, asset, panels, styles, log) for asset, panels in jobs.items()}
+        images = {asset: future.result() for asset, future in futures.items()}
+
+    sections = []
+    for asset, png in images.items():
+        with open(os.path.join(out_dir, "runs_{}.png".format(asset)), "wb") as f:
+            f.write(png)
+        sections.append(
+            '<h2>{} strategy</h2>\n<img src="data:image/png;base64,{}"/>'.format(
+                html.escape(asset), base64.b64encode(png).decode()
+            )
+        )
+
+    report = os.path.join(out_dir, "report.html")
+    with open(report, "w", encoding="utf-8") as f:
+        f.write("<!DOCTYPE html>\n<html><head><meta charset='utf-8'><title>PID runs</title>")
+        f.write("<style>body{font-family:sans-serif} td,th{padding:2px 8px;text-align:right}</style>")
+        f.write("</head><body>\n<h1>PID runs: {}</h1>\n".format(", ".join(map(html.escape, runs))))
+        f.write(summary(runs).to_html(index=False, float_format=lambda v: "{:.4f}".format(v)))
+        f.write("\n".join(sections))
+        f.write("\n</body></html>\n")
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Overlays several pid runs in one report.")
+    parser.add_argument("paths", nargs="+", help="CSV traces or directories of them")
+    parser.add_argument("--out", default="report", help="output directory")
+    parser.add_argument(
+        "--asset", action="append", default=None, help="asset of a strategy to plot (default DAI)"
+    )
+    parser.add_argument("--max-points", type=int, default=2000, help="0 to plot every row")
+    parser.add_argument("--cache-dir", default=None, help="defaults to <first path>/.cache")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--log", action="store_true", help="log scale")
+    args = parser.parse_args(argv)
+
+    files = find_traces(args.paths)
+    if not files:
+        print("No trace found.")
+        return 1
+    first = args.paths[0] if os.path.isdir(args.paths[0]) else os.path.dirname(args.paths[0])
+    cache_dir = args.cache_dir or os.path.join(first, pidCache.CACHE_DIR)
+
+    runs = load_runs(files, cache_dir, args.asset or [DAI], args.max_points or None)
+    print("{} runs loaded: {}".format(len(runs), ", ".join(runs)))
+    report = build_report(runs, args.out, args.workers, args.log)
+    print("Report written to {}".format(report))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+"""
+Streaming reader for the CSV traces written by the pid tests.
+
+Files are read in chunks with explicit dtypes: int64 timestamps, uint8 actions, categorical
+users/assets. Ray columns are read as text and converted once, either to exact Python ints
+(`rays="exact"`) or to float percentages (`rays="percent"`, `value / 1e25` rounded once).
+Token amount columns follow the same mode, as exact ints or floats.
+The asset filter and the optional min/max downsampling run inside the chunk loop, so memory
+stays bounded by the chunk size and the number of plotted points rather than the file size.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+RAY_COLUMNS = ["utilizationRate", "currentLiquidityRate", "currentVariableBorrowRate", "errI"]
+AMOUNT_COLUMNS = ["availableLiquidity", "currentDebt"]
+RAY_PERCENT = 10**25
+CHUNKSIZE = 500_000
+
+
+def _ray_to_int(value):
+    return int(value) if isinstance(value, str) and value else None
+
+
+def _ray_to_percent(value):
+    # int / int is correctly rounded, unlike float(value) / 1e25 which rounds twice.
+    return int(value) / RAY_PERCENT if isinstance(value, str) and value else np.nan
+
+
+def _amount_to_float(value):
+    return float(int(value)) if isinstance(value, str) and value else np.nan
+
+
+def find_traces(paths, skip=(".cache",)):
+    """CSV files given directly or found (recursively, in name order) in the given directories."""
+    files = []
+    for path in paths:
+        if not os.path.isdir(path):
+            files.append(path)
+            continue
+        for root, dirs, filenames in os.walk(path):
+            dirs[:] = sorted(d for d in dirs if d not in skip)
+            files += [os.path.join(root, f) for f in sorted(filenames) if f.endswith(".csv")]
+    return files
+
+
+def read_header(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return f.readline().strip().split(",")
+
+
+def _dtypes(columns):
+    dtypes = {c: str for c in columns}
+    if "timestamp" in columns:
+        dtypes["timestamp"] = "int64"
+    if "action" in columns:
+        dtypes["action"] = "uint8"
+    return dtypes
+
+
+def _convert(chunk, rays):
+    for column in RAY_COLUMNS + AMOUNT_COLUMNS:
+        if column in chunk:
+            if rays == "exact":
+                convert = _ray_to_int
+            else:
+                convert = _ray_to_percent if column in RAY_COLUMNS else _amount_to_float
+            values = [convert(v) for v in chunk[column].to_numpy()]
+            chunk[column] = pd.Series(
+                values, index=chunk.index, dtype=object if rays == "exact" else "float64"
+            )
+    for column in ["user", "asset"]:
+        if column in chunk:
+            chunk[column] = chunk[column].str.lower().astype("category")
+    return chunk
+
+
+def _concat(chunks):
+    """Concatenates chunks keeping the categorical columns categorical."""
+    if not chunks:
+        return pd.DataFrame()
+    for column in ["user", "asset"]:
+        if column in chunks[0]:
+            categories = pd.api.types.union_categoricals([c[column] for c in chunks]).categories
+            for c in chunks:
+                c[column] = c[column].cat.set_categories(categories)
+    return pd.concat(chunks, ignore_index=True)
+
+
+def downsample_minmax(data, bin_seconds, columns, by="asset"):
+    """
+    Keeps, for every `bin_seconds` time bin (and every `by` group), the rows holding the
+    minimum and the maximum of each of `columns`, so spikes survive the decimation.
+    """
+    if data.empty or not bin_seconds:
+        return data
+    keys = [data["timestamp"] // bin_seconds]
+    if by in data:
+        keys.insert(0, data[by])
+    groups = data.groupby(keys, observed=True, sort=False)
+    keep = []
+    for column in columns:
+        if column in data:
+            values = data[column].astype("float64")
+            if values.notna().any():
+                by_group = values.groupby(keys, observed=True, sort=False)
+                keep += [by_group.idxmin().dropna(), by_group.idxmax().dropna()]
+    if not keep:
+        return groups.head(1)
+    rows = np.unique(np.concatenate([k.to_numpy(dtype="int64") for k in keep]))
+    return data.loc[rows]
+
+
+def downsample_chunks(chunks, bin_seconds, columns):
+    """
+    Concatenates chunks already reduced one by one by `downsample_minmax`; the bins spanning
+    two chunks are reduced once more.
+    """
+    chunks = list(chunks)
+    data = _concat(chunks)
+    if bin_seconds and len(chunks) > 1:
+        data = downsample_minmax(data, bin_seconds, columns).reset_index(drop=True)
+    return data
+
+
+def time_span(path, chunksize=CHUNKSIZE):
+    """First and last timestamp of a trace, reading only the timestamp column."""
+    lo, hi = None, None
+    for chunk in pd.read_csv(path, usecols=["timestamp"], dtype="int64", chunksize=chunksize):
+        if len(chunk):
+            lo = chunk["timestamp"].min() if lo is None else min(lo, chunk["timestamp"].min())
+            hi = chunk["timestamp"].max() if hi is None else max(hi, chunk["timestamp"].max())
+    return lo, hi
+
+
+def trace_columns(path):
+    """Key and value columns of a trace that the reader knows about."""
+    header = read_header(path)
+    value_columns = [c for c in RAY_COLUMNS + AMOUNT_COLUMNS if c in header]
+    return [c for c in ["timestamp", "user", "action", "asset"] if c in header], value_columns
+
+
+def iter_trace(path, assets=None, rays="percent", bin_seconds=None, chunksize=CHUNKSIZE):
+    """Yields the converted chunks of a trace, filtered on `assets` and downsampled per chunk."""
+    if rays not in ("exact", "percent"):
+        raise ValueError("rays must be 'exact' or 'percent'")
+    key_columns, value_columns = trace_columns(path)
+    columns = key_columns + value_columns
+    assets = None if assets is None else {a.lower() for a in assets}
+
+    for chunk in pd.read_csv(path, usecols=columns, dtype=_dtypes(columns), chunksize=chunksize):
+        if assets is not None and "asset" in chunk:
+            chunk = chunk[chunk["asset"].str.lower().isin(assets)]
+        if chunk.empty:
+            continue
+        chunk = _convert(chunk, rays)
+        yield downsample_minmax(chunk, bin_seconds, value_columns).reset_index(drop=True)
+
+
+def bin_width(lo, hi, max_points):
+    """Time bin (in seconds) splitting `[lo, hi]` in about `max_points` bins."""
+    if not max_points or lo is None:
+        return None
+    return max(int(hi - lo) // max_points, 1)
+
+
+def read_trace(path, assets=None, rays="percent", max_points=None, chunksize=CHUNKSIZE):
+    """
+    Reads a pid trace CSV chunk by chunk.
+
+    `assets` restricts the rows to these asset addresses (any case). With `max_points`, each
+    asset is reduced to about `max_points` time bins keeping the min/max of every value column.
+    """
+    bin_seconds = bin_width(*time_span(path, chunksize), max_points) if max_points else None
+    chunks = iter_trace(path, assets, rays, bin_seconds, chunksize)
+    return downsample_chunks(chunks, bin_seconds, trace_columns(path)[1])
@@ -0,0 +1,245 @@
+"""
+Parameter sweep / auto-tuning of the PI strategy gains on top of `piSimulation.py`.
+
+Every candidate is replayed against each utilization scenario (CSV traces written by
+`testPid()`) and scored on settling time, overshoot and volatility of the borrow rate.
+Candidates are split in chunks simulated in a process pool (one batched simulation per chunk)
+and each finished chunk is appended to a checkpoint file, so an interrupted sweep resumes where
+it stopped.
+
+Parameter syntax: `a,b,c` is a list of values, `lo:hi:n` is n evenly spaced values (grid) or
+a uniform range (`--random`).
+
+cmd :: python3 tests/foundry/pidTests/sweepGains.py tests/foundry/pidTests/data \
+           --kp 5e26,1e27,2e27 --ki 5e19:20e19:4 --optimal-utilization-rate 45e25,80e25
+"""
+import argparse
+import itertools
+import os
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+import piSimulation as sim
+from pidData import find_traces
+
+INT256_MIN = -(2**255)
+METRICS = ["settlingTime", "overshoot", "volatility"]
+
+_scenarios = []
+
+
+def parse_values(spec):
+    """`a,b,c` -> list of ints, `lo:hi:n` -> `(lo, hi, n)`."""
+    spec = str(spec)
+    if ":" in spec:
+        lo, hi, n = spec.split(":")
+        return (sim.parse_int(lo), sim.parse_int(hi), int(n))
+    return [sim.parse_int(v) for v in spec.split(",")]
+
+
+def _grid_axis(values):
+    if isinstance(values, tuple):
+        lo, hi, n = values
+        if n <= 1:
+            return [lo]
+        return [lo + (hi - lo) * i // (n - 1) for i in range(n)]
+    return values
+
+
+def _random_axis(values, rng):
+    if isinstance(values, tuple):
+        return rng.randint(min(values[:2]), max(values[:2]))
+    return rng.choice(values)
+
+
+def build_candidates(space, samples=None, seed=0):
+    """
+    Expands `space` (`PiParams` field -> parsed values) into a list of `PiParams` of ints.
+    A grid is the cartesian product of every axis; `samples` draws random candidates instead.
+    """
+    fields = sim.PiParams._fields
+    if samples is None:
+        axes = [_grid_axis(space[f]) for f in fields]
+        combos = itertools.product(*axes)
+    else:
+        rng = random.Random(seed)
+        combos = (tuple(_random_axis(space[f], rng) for f in fields) for _ in range(samples))
+    return [sim.PiParams(*combo) for combo in combos]
+
+
+def is_valid(params):
+    """Mirrors the constructor requirements (`VL_U0_GREATER_THAN_RAY`, non negative base rate)."""
+    if not 0 < params.optimal_utilization_rate < sim.RAY:
+        return False
+    return sim.transfer_function(INT256_MIN, sim.batch_params(params)).item(0) >= 0
+
+
+def candidate_key(params):
+    return "|".join(str(v) for v in params)
+
+
+def load_scenarios(paths, asset=sim.DAI, log=print):
+    """
+    Loads every CSV given directly or found (recursively) in the given directories. Traces
+    without any `asset` row never update the strategy and are skipped.
+    """
+    scenarios = []
+    for file in find_traces(paths):
+        trace = sim.load_trace(file, asset)
+        if not trace["update"].any():
+            log(f"Skipped {file}: no row for {asset}.")
+            continue
+        scenarios.append(
+            (
+                os.path.splitext(os.path.basename(file))[0],
+                trace["timestamp"].to_numpy(),
+                trace["utilizationRate"].to_numpy(),
+                trace["update"].to_numpy(),
+            )
+        )
+    return scenarios
+
+
+def score_rates(timestamps, borrow_rates, band=0.02):
+    """
+    Step response metrics of `(nb sets, nb rows)` borrow rates, relative to the final rate:
+    - settlingTime: fraction of the trace duration before the rate stays within `band`,
+    - overshoot: how far the rate peaks above its final value,
+    - volatility: total variation of the rate over its mean.
+    """
+    rates = borrow_rates.astype(float)
+    final = np.maximum(rates[:, -1:], 1.0)
+    duration = max(float(timestamps[-1] - timestamps[0]), 1.0)
+
+    outside = np.abs(rates - final) > band * final
+    # index of the last row outside the band, -1 when always inside.
+    last_outside = np.where(outside.any(axis=1), rates.shape[1] - 1 - np.argmax(outside[:, ::-1], axis=1), -1)
+    settle_at = np.minimum(last_outside + 1, rates.shape[1] - 1)
+    settling = np.where(last_outside < 0, 0.0, (timestamps[settle_at] - timestamps[0]) / duration)
+
+    overshoot = np.maximum(rates.max(axis=1) / final[:, 0] - 1.0, 0.0)
+    volatility = np.abs(np.diff(rates, axis=1)).sum(axis=1) / np.maximum(rates.mean(axis=1), 1.0)
+    return {"settlingTime": settling, "overshoot": overshoot, "volatility": volatility}
+
+
+def _init_worker(scenarios):
+    global _scenarios
+    _scenarios = scenarios
+
+
+def evaluate(candidates, band=0.02):
+    """Scores a chunk of candidates on every loaded scenario, averaging the metrics."""
+    params = sim.PiParams(*(list(column) for column in zip(*candidates)))
+    totals = {m: np.zeros(len(candidates)) for m in METRICS}
+    for _, timestamps, utilization_rates, updates in _scenarios:
+        rates = sim.simulate(timestamps, utilization_rates, params, updates)
+        for metric, values in score_rates(timestamps, rates["currentVariableBorrowRate"], band).items():
+            totals[metric] += values / len(_scenarios)
+    rows = pd.DataFrame({"key": [candidate_key(c) for c in candidates], **totals})
+    for field in sim.PiParams._fields:
+        rows[field] = [str(getattr(c, field)) for c in candidates]
+    return rows
+
+
+def rank(results, weights):
+    results = results.copy()
+    results["score"] = sum(results[m] * w for m, w in zip(METRICS, weights))
+    return results.sort_values("score").reset_index(drop=True)
+
+
+def read_checkpoint(path):
+    """
+    Rows of a sweep checkpoint. A last line cut short by an interrupted write is truncated
+    from the file, so the next chunks are appended after the last complete row.
+    """
+    with open(path, "rb+") as f:
+        content = f.read()
+        end = content.rfind(b"\n") + 1
+        if end < len(content):
+            print(f"Dropping a partial row at the end of {path}.")
+            f.truncate(end)
+    if not end:
+        return pd.DataFrame(columns=["key"])
+    return pd.read_csv(path, dtype={f: str for f in sim.PiParams._fields})
+
+
+def run_sweep(candidates, scenarios, checkpoint=None, workers=None, chunk_size=64, band=0.02):
+    """
+    Evaluates `candidates` in a process pool. Finished chunks are appended to `checkpoint`,
+    and candidates already present there are not simulated again.
+    """
+    done = pd.DataFrame()
+    if checkpoint and os.path.exists(checkpoint):
+        done = read_checkpoint(checkpoint)
+        done = done[done["key"].isin({candidate_key(c) for c in candidates})].drop_duplicates("key")
+        seen = set(done["key"])
+        candidates = [c for c in candidates if candidate_key(c) not in seen]
+        print(f"Resuming: {len(seen)} candidates found in {checkpoint}, {len(candidates)} left.")
+
+    chunks = [candidates[i : i + chunk_size] for i in range(0, len(candidates), chunk_size)]
+    results = [done] if len(done) else []
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(scenarios,)) as pool:
+        futures = [pool.submit(evaluate, chunk, band) for chunk in chunks]
+        for idx, future in enumerate(as_completed(futures)):
+            rows = future.result()
+            if checkpoint:
+                header = not os.path.exists(checkpoint) or not os.path.getsize(checkpoint)
+                rows.to_csv(checkpoint, mode="a", index=False, header=header)
+            results.append(rows)
+            print(f"Chunk {idx + 1}/{len(chunks)} done.")
+    return pd.concat(results, ignore_index=True) if results else pd.DataFrame()
+
+
+def main(argv=None):
+    defaults = sim.PiParams()
+    parser = argparse.ArgumentParser(description="Sweeps PI strategy gains over replayed traces.")
+    parser.add_argument("scenarios", nargs="+", help="testPid() CSV traces or directories of them")
+    parser.add_argument("--asset", default=sim.DAI)
+    for field in sim.PiParams._fields:
+        parser.add_argument(
+            "--" + field.replace("_", "-"), type=parse_values, default=[getattr(defaults, field)]
+        )
+    parser.add_argument("--random", type=int, default=None, help="random search with N samples")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--band", type=float, default=0.02, help="settling band around the final rate")
+    parser.add_argument(
+        "--weights", type=lambda s: [float(w) for w in s.split(",")], default=[1.0, 1.0, 0.1],
+        help="settlingTime,overshoot,volatility weights of the score",
+    )
+    parser.add_argument("--checkpoint", default=None, help="CSV file used to save/resume the sweep")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--chunk-size", type=int, default=64)
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    space = {f: getattr(args, f) for f in sim.PiParams._fields}
+    candidates = build_candidates(space, args.random, args.seed)
+    valid = [c for c in candidates if is_valid(c)]
+    print(f"{len(valid)} valid candidates ({len(candidates) - len(valid)} rejected by the constructor checks).")
+
+    scenarios = load_scenarios(args.scenarios, args.asset)
+    if not scenarios:
+        print("No scenario found.")
+        return 1
+    print(f"{len(scenarios)} scenarios: {', '.join(s[0] for s in scenarios)}")
+
+    results = run_sweep(valid, scenarios, args.checkpoint, args.workers, args.chunk_size, args.band)
+    if results.empty:
+        print("Nothing to rank.")
+        return 1
+    ranked = rank(results, args.weights)
+    columns = ["score"] + METRICS + [f for f in sim.PiParams._fields if len(set(ranked[f])) > 1]
+    display = ranked[columns].head(args.top).copy()
+    for field in sim.PiParams._fields:
+        if field in display:
+            display[field] = display[field].map(lambda v: f"{int(v):.4g}")
+    print(display.to_string())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
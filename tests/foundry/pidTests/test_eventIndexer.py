@@ -0,0 +1,67 @@
+import json
+import os
+
+import eventIndexer as idx
+
+RESERVE_DATA_UPDATED = "ReserveDataUpdated(address,uint256,uint256,uint256,uint256)"
+PID_LOG = "PidLog(uint256,uint256,uint256,int256,int256)"
+ASSET = "0x" + "ab" * 20
+STRATEGY = "0x" + "51" * 20
+POOL = "0x" + "9f" * 20
+
+
+def _reserve_abi(argument):
+    event = dict(idx.BUILTIN_ABI[1])
+    event["inputs"] = [dict(event["inputs"][0], name=argument)] + event["inputs"][1:]
+    return [event]
+
+
+def _artifact(out_dir, source, abi):
+    path = os.path.join(out_dir, source, source.replace(".sol", ".json"))
+    os.makedirs(os.path.dirname(path))
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"abi": abi}, f)
+
+
+def _topic(signature):
+    return "0x" + idx.keccak256(signature.encode()).hex()
+
+
+def _words(*values):
+    return "0x" + "".join((v % (1 << 256)).to_bytes(32, "big").hex() for v in values)
+
+
+def test_keccak256_vectors():
+    assert idx.keccak256(b"").hex() == "c5d2460186f7233c927e7db2dcc703c0e500b653ca82273b7bfad8045d85a470"
+    assert _topic("Transfer(address,address,uint256)") == (
+        "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef"
+    )
+    assert idx.keccak256(b"hello world").hex() == (
+        "47173285a8d7341e5e972fc677286384f802f8ef42a5ec5f03bbfa254cb01fad"
+    )
+
+
+def test_decode_reserve_data_updated_with_both_abis(tmp_path):
+    out_dir = str(tmp_path / "out")
+    # Sorted after the interface, so ReserveLogic's `asset` naming is the decoder that is kept.
+    _artifact(out_dir, "ILendingPool.sol", _reserve_abi("reserve"))
+    _artifact(out_dir, "ReserveLogic.sol", _reserve_abi("asset"))
+    db = idx.connect(str(tmp_path / "events.sqlite"))
+    decoders = idx.load_decoders(db, out_dir)
+    assert decoders[(_topic(RESERVE_DATA_UPDATED), 2)].indexed == [("asset", "address")]
+
+    tx = "0x" + "01" * 32
+    logs = [
+        idx.Log(7, 0, tx, 1700000000, STRATEGY, [_topic(PID_LOG)], _words(8 * 10**26, 2 * 10**25, 5 * 10**25, -3, 4)),
+        idx.Log(7, 1, tx, 1700000000, POOL, [_topic(RESERVE_DATA_UPDATED), "0x" + "00" * 12 + ASSET[2:]],
+                _words(2 * 10**25, 5 * 10**25, 10**27, 10**27 + 1)),
+    ]
+    strategies = {}
+    events, pid_logs, reserve_updates, unknown = idx.decode_logs(31337, logs, decoders, strategies)
+
+    assert unknown == 0 and len(events) == 2
+    assert reserve_updates == [
+        (31337, 7, 1, tx, 1700000000, POOL, ASSET, str(2 * 10**25), str(5 * 10**25), str(10**27), str(10**27 + 1))
+    ]
+    assert pid_logs[0][5:] == [STRATEGY, ASSET, str(8 * 10**26), str(2 * 10**25), str(5 * 10**25), "-3", "4"]
+    assert strategies == {(31337, STRATEGY): ASSET}
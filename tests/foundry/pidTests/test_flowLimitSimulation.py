@@ -0,0 +1,53 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("pandas")
+
+import flowLimitSimulation as flow  # noqa: E402
+import piSimulation as sim  # noqa: E402
+
+RAY = 10**27
+UTILIZATIONS = [0.2, 0.45, 0.7, 0.95, 0.99, 0.6, 0.1, 0.0, 0.3]
+STEP = 3600
+
+
+def test_float_pi_update_follows_the_exact_strategy():
+    exact = sim.simulate(
+        [STEP * (i + 1) for i in range(len(UTILIZATIONS))],
+        [int(round(u * RAY)) for u in UTILIZATIONS],
+        sim.PiParams(),
+        start_timestamp=0,
+    )
+    p = flow.PoolParams()
+    err_i = np.zeros(1)
+    for i, u in enumerate(UTILIZATIONS):
+        err_i, borrow, liquidity = flow.pi_update(err_i, np.array([u]), STEP, p)
+        assert err_i[0] == pytest.approx(exact["errI"][0, i] / RAY, rel=1e-12, abs=1e-24)
+        if u == 0:
+            # `_calculateInterestRates()` returns no rates when there are no borrowers, where
+            # `getCurrentInterestRates()` (read by piSimulation) returns the base rate.
+            assert borrow[0] == liquidity[0] == 0
+            continue
+        assert borrow[0] == pytest.approx(exact["currentVariableBorrowRate"][0, i] / RAY, rel=1e-12)
+        assert liquidity[0] == pytest.approx(exact["currentLiquidityRate"][0, i] / RAY, rel=1e-12)
+
+
+def test_runs_are_reproducible():
+    pools, market = flow.load_config(None, 2)
+    serial = flow.run(pools, market, 6, 1, seed=3, chunk=2, workers=1)
+    pooled = flow.run(pools, market, 6, 1, seed=3, chunk=2, workers=2)
+    assert serial["maxUtilization"].shape == (6, 3)
+    for name, values in serial.items():
+        np.testing.assert_array_equal(values, pooled[name])
+    other = flow.run(pools, market, 6, 1, seed=4, chunk=2, workers=1)
+    assert not np.array_equal(serial["maxUtilization"], other["maxUtilization"])
+
+
+def test_flows_stay_within_the_limits():
+    pools, market = flow.load_config(None, 3)
+    metrics = flow.run(pools, market, 20, 3, seed=0, workers=1)
+    assert (metrics["maxFlowUse"][:, 1:] <= 1 + 1e-12).all()
+    assert (metrics["minMainAvailable"] >= -1e-9).all()
+    assert ((metrics["maxUtilization"] >= 0) & (metrics["maxUtilization"] <= 1)).all()
+    table = flow.summary(metrics)
+    assert list(table.columns) == ["p50", "p90", "p99", "max", "P(>0)"]
@@ -0,0 +1,117 @@
+import os
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("pandas")
+
+import indexAccrual as acc  # noqa: E402
+from piSimulation import DAI, RAY  # noqa: E402
+
+TRACE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "pid_trace.csv")
+WBTC = "0x68f180fcce6836688e9084f035309e29bf0a2095"
+YEAR = acc.SECONDS_PER_YEAR
+
+
+def _ray_mul(a, b):
+    return 0 if a == 0 or b == 0 else (a * b + RAY // 2) // RAY
+
+
+def _compounded(rate, exp):
+    """`MathUtils.calculateCompoundedInterest()`, line by line."""
+    if exp == 0:
+        return RAY
+    exp_minus_one = exp - 1
+    exp_minus_two = exp - 2 if exp > 2 else 0
+    base_power_two = _ray_mul(rate, rate) // (YEAR * YEAR)
+    base_power_three = _ray_mul(base_power_two, rate) // YEAR
+    second_term = exp * exp_minus_one * base_power_two // 2
+    third_term = exp * exp_minus_one * exp_minus_two * base_power_three // 6
+    return RAY + rate * exp // YEAR + second_term + third_term
+
+
+def test_interest_matches_math_utils():
+    rng = random.Random(11)
+    rates = [0, 1, RAY, 3 * RAY] + [rng.randrange(0, 3 * RAY) for _ in range(300)]
+    dts = [0, 1, 2, 3] + [rng.choice([0, 1, 2, 3, 12, 3600, 86400, YEAR]) for _ in range(300)]
+    assert list(acc.compounded_interest(rates, dts)) == [_compounded(r, d) for r, d in zip(rates, dts)]
+    assert list(acc.linear_interest(rates, dts)) == [RAY + r * d // YEAR for r, d in zip(rates, dts)]
+
+
+def test_accrue_rounds_at_every_update():
+    factors = [RAY + 10**20 * k + 7 for k in range(1, 50)]
+    index, expected = RAY, []
+    for factor in factors:
+        index = _ray_mul(factor, index)
+        expected.append(index)
+    assert list(acc.accrue(factors)) == expected
+
+
+def test_intervals():
+    rows, dts = acc.intervals(np.array([0, 10, 10, 25]), cadence=8, end=30)
+    assert list(dts) == [8, 2, 6, 8, 1, 5]
+    assert list(rows) == [0, 0, 2, 2, 2, 3]
+
+
+def test_report_only_uses_the_strategy_asset():
+    logs = []
+    results = acc.report([TRACE], [None, 3600], log=logs.append)
+    assert list(results["asset"]) == [DAI, DAI]
+    assert list(results["cadence"]) == ["native", 3600]
+    # Updates at the distinct timestamps of the DAI rows only.
+    trace = [line.split(",") for line in open(TRACE).read().splitlines()[1:]]
+    dai_timestamps = sorted({int(row[0]) for row in trace if row[3] == DAI})
+    assert results["updates"].iloc[0] == len(dai_timestamps) - 1
+    assert results["days"].iloc[0] == (dai_timestamps[-1] - dai_timestamps[0]) / 86400
+    # A few days of accrual: both approximations stay close to exact compounding.
+    assert abs(results["borrowError"].iloc[0]) < 1e-6 and abs(results["liquidityError"].iloc[0]) < 1e-6
+
+    assert acc.report([TRACE], [None], asset="0x" + "00" * 20, log=logs.append).empty
+    assert "skipped" in logs[-1]
+
+
+def test_poke_rates_follow_the_pi_strategy():
+    from pidData import read_trace
+
+    import piSimulation as sim
+
+    data = read_trace(TRACE, [DAI], rays="exact").sort_values("timestamp", kind="stable").reset_index(drop=True)
+    rows, dts, starts = acc.intervals(data["timestamp"].to_numpy(), 3600, with_points=True)
+    liquidity, borrow = acc.poke_rates(data, rows, starts, sim.PiParams())
+    is_row = np.isin(starts, data["timestamp"].to_numpy())
+    assert list(borrow[is_row]) == list(data["currentVariableBorrowRate"].to_numpy()[rows[is_row]])
+    assert (~is_row).sum() > 0
+
+    # Every poke equals a replay of the DAI rows up to the previous row followed by the pokes.
+    checked = 0
+    for k in np.flatnonzero(~is_row)[:40]:
+        row = rows[k]
+        utilization = int(data["utilizationRate"].iloc[row])
+        if utilization == 0:
+            assert borrow[k] == liquidity[k] == 0
+            continue
+        pokes = [int(t) for t in starts[: k + 1] if t > data["timestamp"].iloc[row]]
+        timestamps = list(data["timestamp"].iloc[: row + 1]) + pokes
+        utilizations = list(data["utilizationRate"].iloc[: row + 1]) + [utilization] * len(pokes)
+        replay = sim.simulate(timestamps, utilizations, sim.PiParams(), start_timestamp=1700000012)
+        assert replay["errI"][0, row] == data["errI"].iloc[row]
+        assert (liquidity[k], borrow[k]) == (
+            replay["currentLiquidityRate"][0, -1],
+            replay["currentVariableBorrowRate"][0, -1],
+        )
+        checked += 1
+    assert checked > 0
+
+    # Without pokes, both models accrue the logged rates.
+    held = acc.accrual_error(data, None)
+    assert acc.accrual_error(data, None, params=sim.PiParams()) == held
+    assert acc.accrual_error(data, 3600, params=sim.PiParams()) != acc.accrual_error(data, 3600)
+
+
+def test_ray_to_longdouble_keeps_the_integer_precision():
+    # 1e-17 apart: lost through a float, kept by the extended precision.
+    low, high = 10**25, 10**25 + 10**8
+    assert low / RAY == high / RAY
+    values = acc.ray_to_longdouble([low, high, RAY])
+    assert values[1] > values[0] and values[2] == 1
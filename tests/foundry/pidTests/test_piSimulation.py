@@ -0,0 +1,137 @@
+import os
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("pandas")
+
+import piSimulation as sim  # noqa: E402
+
+TRACE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "pid_trace.csv")
+RAY = 10**27
+
+
+# ----------- scalar transcription of BasePiReserveRateStrategy -----------
+
+
+def _sdiv(a, b):
+    q = abs(a) // abs(b)
+    return -q if (a < 0) != (b < 0) else q
+
+
+def _ray_mul_int(a, b):
+    raw = a * b
+    if raw < 0:
+        return _sdiv(raw - RAY // 2, RAY)
+    return _sdiv(raw + RAY // 2, RAY) if raw > 0 else 0
+
+
+def _ray_div_int(a, b):
+    half_b = _sdiv(b, 2)
+    if a >= 0 and b > 0 or a <= 0 and b < 0:
+        return _sdiv(a * RAY + half_b, b)
+    return _sdiv(a * RAY - half_b, b)
+
+
+class ScalarStrategy:
+    def __init__(self, params, timestamp):
+        self.p = params
+        self.err_i = 0
+        self.last_timestamp = timestamp
+        self.max_err_i_amp = _ray_mul_int(params.ki, -RAY * params.max_i_time_amp)
+
+    def normalized_error(self, u):
+        u0 = self.p.optimal_utilization_rate
+        return _ray_div_int(u - u0, u0) if u < u0 else _ray_div_int(u - u0, RAY - u0)
+
+    def transfer_function(self, ce):
+        ce = max(ce, self.p.min_controller_error)
+        base = _ray_div_int(ce + RAY, 2 * RAY)
+        power = base
+        for _ in range(1, self.p.n_factor):
+            power = _ray_mul_int(power, base)
+        return _ray_mul_int(self.p.m_factor, RAY if self.p.n_factor == 0 else power)
+
+    def calculate(self, timestamp, u):
+        if u == 0:
+            self.err_i, self.last_timestamp = 0, timestamp
+            return
+        err = self.normalized_error(u)
+        self.err_i += _ray_mul_int(self.p.ki, err * (timestamp - self.last_timestamp))
+        self.err_i = max(self.err_i, self.max_err_i_amp)
+        self.last_timestamp = timestamp
+
+    def current_rates(self, u):
+        borrow = self.transfer_function(_ray_mul_int(self.p.kp, self.normalized_error(u)) + self.err_i)
+        liquidity = (borrow * u + RAY // 2) // RAY if borrow and u else 0
+        factor = 10**4 - self.p.reserve_factor
+        liquidity = (liquidity * factor + 5000) // 10**4 if liquidity and factor else 0
+        return liquidity, borrow
+
+
+def _scalar(params, timestamps, utilizations, updates):
+    strategy = ScalarStrategy(params, timestamps[0])
+    out = []
+    for timestamp, u, update in zip(timestamps, utilizations, updates):
+        if update:
+            strategy.calculate(timestamp, u)
+        out.append((*strategy.current_rates(u), strategy.err_i))
+    return out
+
+
+# ----------- tests -----------
+
+
+def test_replays_the_fixture_exactly():
+    trace = sim.load_trace(TRACE)
+    result = sim.simulate(
+        trace["timestamp"].to_numpy(), trace["utilizationRate"].to_numpy(), sim.PiParams(), trace["update"]
+    )
+    assert sim.compare(trace, result).empty
+    assert list(trace["update"]).count(True) == 19
+    result["errI"][0, 5] += 1
+    assert list(sim.compare(trace, result).index) == [5]
+
+
+def test_batch_matches_the_scalar_strategy():
+    rng = random.Random(3)
+    timestamps = [1_700_000_000]
+    for _ in range(80):
+        timestamps.append(timestamps[-1] + rng.choice([0, 1, 13, 3600, 86400, 30 * 86400]))
+    utilizations = [0 if rng.random() < 0.05 else rng.randrange(1, RAY) for _ in timestamps]
+    updates = [rng.random() < 0.8 for _ in timestamps]
+    sets = [
+        sim.PiParams(
+            min_controller_error=-rng.randrange(10**26, 10**27),
+            max_i_time_amp=rng.randrange(3600, 60 * 86400),
+            optimal_utilization_rate=rng.randrange(10**25, RAY),
+            kp=rng.randrange(10**26, 5 * 10**27),
+            ki=rng.randrange(10**18, 10**21),
+            n_factor=rng.choice([1, 2, 3]),
+            reserve_factor=rng.randrange(0, 5000),
+        )
+        for _ in range(6)
+    ]
+    batch = sim.PiParams(*(list(field) for field in zip(*sets)))
+    result = sim.simulate(timestamps, utilizations, batch, updates)
+    for k, params in enumerate(sets):
+        expected = _scalar(params, timestamps, utilizations, updates)
+        assert list(result["currentLiquidityRate"][k]) == [e[0] for e in expected]
+        assert list(result["currentVariableBorrowRate"][k]) == [e[1] for e in expected]
+        assert list(result["errI"][k]) == [e[2] for e in expected]
+
+
+@pytest.mark.parametrize("a, b", [(7, 2), (-7, 2), (7, -2), (-7, -2), (-3 * RAY // 2, 1), (RAY + 1, -3)])
+def test_signed_ray_math(a, b):
+    assert sim.ray_mul_int(a * RAY, b).item() == _ray_mul_int(a * RAY, b)
+    assert sim.ray_div_int(a, b).item() == _ray_div_int(a, b)
+    assert sim.sdiv(a, b).item() == _sdiv(a, b)
+
+
+def test_parse_int():
+    assert sim.parse_int("13e19") == 13 * 10**19
+    assert sim.parse_int("-400e24") == -400 * 10**24
+    assert sim.parse_int("1_000") == 1000
+    with pytest.raises(ValueError):
+        sim.parse_int("1.5")
@@ -0,0 +1,67 @@
+import os
+import shutil
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("pyarrow")
+
+import pidCache  # noqa: E402
+from pidData import read_trace  # noqa: E402
+from piSimulation import DAI  # noqa: E402
+
+TRACE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "pid_trace.csv")
+
+
+def _same(cached, direct):
+    cached, direct = cached.copy(), direct.copy()
+    for data in (cached, direct):
+        for column in ("user", "asset"):
+            data[column] = data[column].astype(str)
+    pd.testing.assert_frame_equal(cached, direct, check_dtype=False)
+
+
+@pytest.mark.parametrize("assets, max_points", [(None, None), (["0x" + DAI[2:].upper()], None), (None, 4)])
+def test_cached_trace_matches_the_csv_reader(tmp_path, assets, max_points):
+    manifest = pidCache.load_manifest(str(tmp_path))
+    data, digest = pidCache.load_trace(TRACE, str(tmp_path), manifest, assets, max_points)
+    assert digest == pidCache.file_digest(TRACE)
+    _same(data, read_trace(TRACE, assets, "percent", max_points))
+
+
+def test_cache_is_reused_then_rebuilt_and_pruned(tmp_path, capsys):
+    csv = str(tmp_path / "output.csv")
+    shutil.copy(TRACE, csv)
+    cache_dir = str(tmp_path / ".cache")
+
+    manifest = pidCache.load_manifest(cache_dir)
+    _, first = pidCache.load_trace(csv, cache_dir, manifest)
+    pidCache.save_manifest(cache_dir, manifest)
+    assert "Caching" in capsys.readouterr().out
+
+    manifest = pidCache.load_manifest(cache_dir)
+    _, again = pidCache.load_trace(csv, cache_dir, manifest)
+    assert again == first and "Caching" not in capsys.readouterr().out
+
+    with open(csv, "a", encoding="utf-8") as f:
+        f.write(open(TRACE).read().splitlines()[-1] + "\n")
+    data, changed = pidCache.load_trace(csv, cache_dir, manifest)
+    assert changed != first and len(data) == 25
+    pidCache.prune(cache_dir, manifest)
+    assert sorted(f for f in os.listdir(cache_dir) if f.endswith(".arrow")) == [changed + ".arrow"]
+
+
+@pytest.mark.parametrize("assets, max_points", [(None, None), ([DAI], 4)])
+def test_select_reduces_batch_by_batch(tmp_path, assets, max_points):
+    pa = pytest.importorskip("pyarrow")
+    table, _ = pidCache.cached_table(TRACE, str(tmp_path), pidCache.load_manifest(str(tmp_path)))
+    table = pa.Table.from_batches(table.to_batches(max_chunksize=5))
+    assert table.num_rows == 24 and len(table.to_batches()) == 5
+    _same(pidCache.select(table, assets, max_points), read_trace(TRACE, assets, "percent", max_points, chunksize=5))
+
+
+def test_failed_build_raises_the_real_error(tmp_path):
+    arrow_path = str(tmp_path / "missing" / "trace.arrow")
+    with pytest.raises(FileNotFoundError, match="Failed to open"):
+        pidCache._build(TRACE, arrow_path)
+    assert not os.path.exists(arrow_path + ".tmp")
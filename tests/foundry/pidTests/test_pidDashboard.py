@@ -0,0 +1,47 @@
+import os
+import shutil
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("pyarrow")
+pytest.importorskip("matplotlib")
+
+import pidDashboard as dashboard  # noqa: E402
+from piSimulation import DAI  # noqa: E402
+
+TRACE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "pid_trace.csv")
+WBTC = "0x68f180fcce6836688e9084f035309e29bf0a2095"
+
+
+@pytest.fixture
+def runs(tmp_path):
+    for name in ("a", "b"):
+        (tmp_path / name).mkdir()
+        shutil.copy(TRACE, str(tmp_path / name / "output.csv"))
+    files = [str(tmp_path / name / "output.csv") for name in ("a", "b")]
+    return dashboard.load_runs(files, str(tmp_path / ".cache"))
+
+
+def test_runs_keep_the_strategy_rows_only(runs):
+    assert sorted(runs) == ["a/output", "b/output"]
+    trace = [line.split(",") for line in open(TRACE).read().splitlines()[1:]]
+    first_dai = next(int(row[0]) for row in trace if row[3] == DAI)
+    for data in runs.values():
+        assert set(data["asset"].astype(str)) == {DAI}
+        # Elapsed from the first row of the trace (a WBTC one), not from the first DAI row.
+        assert data["elapsed"].iloc[0] == first_dai - int(trace[0][0]) > 0
+        errI = [int(row[7]) / 10**27 for row in trace if row[3] == DAI]
+        assert list(data["errI"]) == pytest.approx(errI, rel=1e-12, abs=1e-18)
+    assert dashboard.align(runs, WBTC, "currentVariableBorrowRate").empty
+    aligned = dashboard.align(runs, DAI, "currentVariableBorrowRate")
+    assert list(aligned.columns) == ["a/output", "b/output"]
+    assert (aligned["a/output"] == aligned["b/output"]).all()
+
+
+def test_one_figure_per_strategy(runs, tmp_path):
+    report = dashboard.build_report(runs, str(tmp_path / "report"), workers=1)
+    assert sorted(os.listdir(str(tmp_path / "report"))) == ["report.html", "runs_{}.png".format(DAI)]
+    with open(report, "r", encoding="utf-8") as f:
+        content = f.read()
+    assert "{} strategy".format(DAI) in content and WBTC not in content
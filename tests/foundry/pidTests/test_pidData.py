@@ -0,0 +1,54 @@
+import csv
+import os
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+import pidData  # noqa: E402
+
+TRACE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "pid_trace.csv")
+DAI = "0xda10009cbd5d07dd0cecc66161fc93d7c9000da1"
+
+
+def _rows():
+    with open(TRACE, "r", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+@pytest.mark.parametrize("chunksize", [5, 1000])
+def test_exact_and_percent_rays(chunksize):
+    rows = _rows()
+    exact = pidData.read_trace(TRACE, rays="exact", chunksize=chunksize)
+    assert list(exact["errI"]) == [int(r["errI"]) for r in rows]
+    assert list(exact["currentVariableBorrowRate"]) == [int(r["currentVariableBorrowRate"]) for r in rows]
+    assert exact["timestamp"].dtype == "int64" and exact["action"].dtype == "uint8"
+    assert exact["asset"].dtype == "category"
+
+    percent = pidData.read_trace(TRACE, chunksize=chunksize)
+    assert list(percent["utilizationRate"]) == [int(r["utilizationRate"]) / 10**25 for r in rows]
+
+
+def test_asset_filter_is_case_insensitive():
+    data = pidData.read_trace(TRACE, ["0x" + DAI[2:].upper()], chunksize=4)
+    assert len(data) == sum(r["asset"] == DAI for r in _rows())
+    assert set(data["asset"].astype(str)) == {DAI}
+
+
+def test_downsampling_keeps_the_extremes():
+    full = pidData.read_trace(TRACE)
+    for chunksize in (3, 1000):
+        small = pidData.read_trace(TRACE, max_points=3, chunksize=chunksize)
+        assert len(small) < len(full)
+        for column in ("currentVariableBorrowRate", "errI"):
+            for asset, group in full.groupby("asset", observed=True):
+                kept = small[small["asset"] == asset][column]
+                assert kept.max() == group[column].max() and kept.min() == group[column].min()
+
+
+def test_find_traces(tmp_path):
+    (tmp_path / "b").mkdir()
+    (tmp_path / ".cache").mkdir()
+    for name in ("b/2.csv", "1.csv", ".cache/x.csv", "notes.txt"):
+        (tmp_path / name).write_text("timestamp\n")
+    assert pidData.find_traces([str(tmp_path)]) == [str(tmp_path / "1.csv"), str(tmp_path / "b" / "2.csv")]
@@ -0,0 +1,76 @@
+import os
+import shutil
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+
+import piSimulation as sim  # noqa: E402
+import sweepGains as sweep  # noqa: E402
+
+TRACE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "pid_trace.csv")
+
+
+def test_scenarios_without_strategy_rows_are_skipped(tmp_path):
+    shutil.copy(TRACE, str(tmp_path / "a.csv"))
+    with open(TRACE, "r", encoding="utf-8") as f:
+        (tmp_path / "empty.csv").write_text(f.readline())
+    logs = []
+    scenarios = sweep.load_scenarios([str(tmp_path)], log=logs.append)
+    assert [s[0] for s in scenarios] == ["a"]
+    assert logs == ["Skipped {}: no row for {}.".format(tmp_path / "empty.csv", sim.DAI)]
+    assert sweep.load_scenarios([TRACE], "0x" + "00" * 20, log=logs.append) == []
+
+
+def test_candidates():
+    space = {f: [v] for f, v in sim.PiParams()._asdict().items()}
+    space["kp"] = sweep.parse_values("5e26:15e26:3")
+    space["ki"] = sweep.parse_values("13e19,26e19")
+    candidates = sweep.build_candidates(space)
+    assert [(c.kp, c.ki) for c in candidates] == [
+        (kp, ki) for kp in (5 * 10**26, 10**27, 15 * 10**26) for ki in (13 * 10**19, 26 * 10**19)
+    ]
+    assert all(sweep.is_valid(c) for c in candidates)
+    assert not sweep.is_valid(candidates[0]._replace(optimal_utilization_rate=sim.RAY))
+    assert len(sweep.build_candidates(space, samples=5, seed=1)) == 5
+
+
+def test_score_rates():
+    timestamps = np.array([0, 10, 20, 30, 40])
+    rates = np.array([[100, 150, 100, 100, 100], [100, 100, 100, 100, 100]], dtype=object)
+    scores = sweep.score_rates(timestamps, rates)
+    assert list(scores["settlingTime"]) == [0.5, 0.0]
+    assert list(scores["overshoot"]) == [0.5, 0.0]
+    assert list(scores["volatility"]) == [100 / 110, 0.0]
+
+
+def test_sweep_matches_direct_simulation():
+    scenarios = sweep.load_scenarios([TRACE])
+    candidates = [sim.PiParams(), sim.PiParams(kp=2 * 10**27)]
+    results = sweep.run_sweep(candidates, scenarios, workers=1, chunk_size=1).sort_values("kp")
+    _, timestamps, utilization_rates, updates = scenarios[0]
+    rates = sim.simulate(timestamps, utilization_rates, sim.PiParams(kp=[10**27, 2 * 10**27]), updates)
+    expected = sweep.score_rates(timestamps, rates["currentVariableBorrowRate"])
+    assert list(results["settlingTime"]) == list(expected["settlingTime"])
+    assert list(results["volatility"]) == list(expected["volatility"])
+
+
+def test_resume_drops_a_partial_checkpoint_row(tmp_path):
+    scenarios = sweep.load_scenarios([TRACE])
+    candidates = [sim.PiParams(), sim.PiParams(kp=2 * 10**27), sim.PiParams(kp=3 * 10**27)]
+    checkpoint = str(tmp_path / "sweep.csv")
+    full = sweep.run_sweep(candidates, scenarios, checkpoint, workers=1, chunk_size=1)
+    with open(checkpoint, "rb+") as f:
+        f.truncate(len(f.read()) - 10)
+
+    resumed = sweep.run_sweep(candidates, scenarios, checkpoint, workers=1, chunk_size=1)
+    assert len(sweep.read_checkpoint(checkpoint)) == 3
+    columns = ["key"] + sweep.METRICS
+    expected = full[columns].sort_values("key").reset_index(drop=True)
+    pd.testing.assert_frame_equal(resumed[columns].sort_values("key").reset_index(drop=True), expected)
+
+    with open(checkpoint, "wb") as f:
+        f.write(b"key,settl")
+    assert len(sweep.run_sweep(candidates[:1], scenarios, checkpoint, workers=1)) == 1
+    assert list(sweep.read_checkpoint(checkpoint)["key"]) == [sweep.candidate_key(candidates[0])]